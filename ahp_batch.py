@@ -0,0 +1,75 @@
+# =============================================================================
+# AHP 마스터 배치 분석 CLI
+# - 폴더 안의 설문 엑셀 파일들을 브라우저 없이 병렬로 분석하고 결과 엑셀을 저장합니다.
+#   예) python ahp_batch.py ./surveys -o ./results --cr 0.1 --method geometric
+# =============================================================================
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ahp_core import load_workbook_frames, analyze_hierarchy
+from ahp_export import export_result_workbook
+from ahp_stream import analyze_workbook_streaming, STREAM_CHUNK_ROWS
+
+def find_workbooks(input_dir):
+    paths = []
+    for pattern in ("*.xlsx", "*.xls"):
+        paths.extend(glob.glob(os.path.join(input_dir, pattern)))
+    # 엑셀 임시 잠금 파일(~$...)과 이전 실행 결과 파일은 제외
+    return sorted(p for p in paths if not os.path.basename(p).startswith("~$") and not p.endswith("_Result.xlsx"))
+
+def analyze_file(path, output_dir, cr_threshold, max_iter, method, float32=False, chunk_rows=None):
+    started = time.time()
+    if chunk_rows:
+        # 대용량 파일: 청크 단위 스트리밍 분석 (응답자별 상세 결과는 임시 파일에 보관)
+        result = analyze_workbook_streaming(path, cr_threshold, max_iter, method, chunk_rows=chunk_rows, float32=float32)
+    else:
+        frames = load_workbook_frames(path)
+        result = analyze_hierarchy(frames, cr_threshold, max_iter, method, parallel=False, float32=float32)
+    out_name = f"{os.path.splitext(os.path.basename(path))[0]}_Result.xlsx"
+    out_path = os.path.join(output_dir, out_name)
+    export_result_workbook(result, out_path)
+    excluded = sum(len(df) for df in result['total_excl_df_list'])
+    return out_path, len(result['main_results']), excluded, time.time() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AHP 마스터 배치 분석: 폴더 안의 설문 엑셀 파일을 일괄 분석합니다.")
+    parser.add_argument("input_dir", help="설문 엑셀(.xlsx/.xls) 파일이 있는 폴더")
+    parser.add_argument("-o", "--output-dir", default=None, help="결과 파일 저장 폴더 (기본값: 입력 폴더)")
+    parser.add_argument("--cr", type=float, default=0.1, help="일관성 비율(CR) 임계값 (기본값: 0.1)")
+    parser.add_argument("--max-iter", type=int, default=500, help="최대 보정 반복 횟수 (기본값: 500)")
+    parser.add_argument("--method", choices=["geometric", "arithmetic", "eigenvector"], default="geometric", help="가중치/평균 산출 방식")
+    parser.add_argument("--float32", action="store_true", help="응답자별 결과 배열을 float32 로 보관하여 메모리 사용량을 줄임")
+    parser.add_argument("--stream", action="store_true", help="대용량 파일을 청크 단위로 읽어 메모리 사용량을 일정하게 유지하며 분석")
+    parser.add_argument("--chunk-rows", type=int, default=STREAM_CHUNK_ROWS, help=f"--stream 사용 시 한 번에 읽을 행 수 (기본값: {STREAM_CHUNK_ROWS})")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) - 1), help="동시에 분석할 파일 수")
+    args = parser.parse_args(argv)
+
+    output_dir = args.output_dir or args.input_dir
+    os.makedirs(output_dir, exist_ok=True)
+    paths = find_workbooks(args.input_dir)
+    if not paths:
+        print(f"분석할 엑셀 파일이 없습니다: {args.input_dir}", file=sys.stderr)
+        return 1
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(paths)))) as pool:
+        futures = {pool.submit(analyze_file, p, output_dir, args.cr, args.max_iter, args.method, args.float32,
+                               args.chunk_rows if args.stream else None): p for p in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                out_path, n_resp, n_excl, elapsed = future.result()
+                print(f"[완료] {os.path.basename(path)} -> {out_path} (응답자 {n_resp}명, 제외 {n_excl}건, {elapsed:.1f}초)")
+            except Exception as e:
+                failures += 1
+                print(f"[오류] {os.path.basename(path)}: {e}", file=sys.stderr)
+
+    print(f"총 {len(paths)}개 파일 중 {len(paths) - failures}개 분석 완료")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# =============================================================================
+# 콜드 스타트 최적화 유틸리티
+# - 무거운 라이브러리를 실제 사용 시점에 import 하는 지연 로더
+# - 프로세스 단위 import/부팅 소요 시간 기록 (Streamlit 재실행(rerun)과 무관하게 유지됨)
+# =============================================================================
+import importlib
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BOOT_TIMINGS = {}
+_timings_lock = threading.Lock()
+
+def record_timing(name, seconds, overwrite=False):
+    with _timings_lock:
+        if overwrite or name not in BOOT_TIMINGS:
+            BOOT_TIMINGS[name] = seconds
+
+class LazyModule:
+    """속성에 처음 접근할 때 모듈을 import 하고, 최초 import 시간을 BOOT_TIMINGS 에 기록합니다."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            already_loaded = self._name in sys.modules
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            if not already_loaded:
+                record_timing(f"import {self._name} (lazy)", time.perf_counter() - started)
+        return getattr(self._module, attr)
+
+def format_boot_report():
+    with _timings_lock:
+        items = list(BOOT_TIMINGS.items())
+    return ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in items)
+
+def log_boot_report(prefix="boot"):
+    logger.info("%s: %s", prefix, format_boot_report())
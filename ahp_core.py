@@ -0,0 +1,1325 @@
+# =============================================================================
+# AHP 분석 엔진 (Streamlit 비의존 모듈)
+# - 화면(UI) 부수효과 없이 import 하여 배치 작업/CLI 에서 재사용할 수 있도록 app.py 에서 분리
+# =============================================================================
+import io
+import os
+import json
+import time
+import pickle
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from multiprocessing.pool import MaybeEncodingError
+
+import numpy as np
+import pandas as pd
+from scipy.stats import gmean, t as t_dist, f as f_dist, studentized_range
+
+# -----------------------------------------------------------------------------
+# Saaty(1980) AHP Functions
+# -----------------------------------------------------------------------------
+# [최적화 추가] 실행 중에 만들어지는 캐시 파일은 소스 폴더가 아닌 사용자별 캐시 폴더에 저장
+# - 환경 변수 AHP_CACHE_DIR 로 위치를 바꿀 수 있음 (기본값: $XDG_CACHE_HOME/ahp-master 또는 ~/.cache/ahp-master)
+# - 폴더를 만들 수 없으면 (읽기 전용 설치 등) 임시 폴더를 사용
+CACHE_DIR_ENV = "AHP_CACHE_DIR"
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    for path in (os.environ.get(CACHE_DIR_ENV) or os.path.join(base, "ahp-master"),
+                 os.path.join(tempfile.gettempdir(), "ahp-master")):
+        try:
+            os.makedirs(path, exist_ok=True)
+            return path
+        except OSError:
+            continue
+    return tempfile.gettempdir()
+
+def cache_path(name):
+    return os.path.join(cache_dir(), name)
+
+# [신규] n > 10 인 행렬의 무작위 일관성 지수(RI)
+# - n = 11~20 은 아래 estimate_random_index(n, seed=n) (표본 1,000,000개)로 미리 계산한 값을 사용
+# - 그보다 큰 n 만 몬테카를로로 추정하여 캐시 폴더의 파일에 저장 (프로세스 내에서는 잠금으로 한 번만 계산)
+RI_CACHE_NAME = "ri_cache.json"
+RI_CACHE_VERSION = 1
+SAATY_SCALE = np.array([1/9, 1/8, 1/7, 1/6, 1/5, 1/4, 1/3, 1/2, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+RI_TABLE = {1: 0.00, 2: 0.00, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49,
+            11: 1.5135, 12: 1.5364, 13: 1.5547, 14: 1.5707, 15: 1.5838,
+            16: 1.5951, 17: 1.6055, 18: 1.6145, 19: 1.6220, 20: 1.6289}
+_ri_memo = {}
+_ri_lock = threading.Lock()
+
+def estimate_random_index(n, n_samples=1_000_000, chunk_size=50_000, seed=None):
+    """Saaty 척도(1/9~9)에서 무작위로 생성한 역수 행렬들의 평균 CI로 RI를 추정합니다."""
+    rng = np.random.default_rng(seed)
+    iu, ju = np.triu_indices(n, k=1)
+    ci_sum = 0.0
+    done = 0
+    while done < n_samples:
+        size = min(chunk_size, n_samples - done)
+        vals = rng.choice(SAATY_SCALE, size=(size, len(iu)))
+        matrices = np.tile(np.eye(n), (size, 1, 1))
+        matrices[:, iu, ju] = vals
+        matrices[:, ju, iu] = 1.0 / vals
+        _, lambda_max = power_iteration_batch(matrices, tol=1e-7)
+        ci_sum += ((lambda_max - n) / (n - 1)).sum()
+        done += size
+    return ci_sum / n_samples
+
+def load_ri_cache(path=None):
+    path = path or cache_path(RI_CACHE_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != RI_CACHE_VERSION:
+            return {}
+        return {int(k): float(v) for k, v in data.get("values", {}).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_ri_cache(values, path=None):
+    path = path or cache_path(RI_CACHE_NAME)
+    payload = {"version": RI_CACHE_VERSION, "values": {str(k): v for k, v in sorted(values.items())}}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=1)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def get_ri(n):
+    if n in RI_TABLE:
+        return RI_TABLE[n]
+    if n in _ri_memo:
+        return _ri_memo[n]
+    with _ri_lock:
+        if n not in _ri_memo:
+            cached = load_ri_cache()
+            if n not in cached:
+                cached[n] = round(estimate_random_index(n), 4)
+                save_ri_cache(cached)
+            _ri_memo.update(cached)
+    return _ri_memo[n]
+
+# [최적화 추가] 기하평균 벡터에서 출발하는 배치 거듭제곱법(Power Iteration)으로 주고유벡터/최대고유값 산출
+def power_iteration_batch(matrices, tol=1e-10, max_iter=100):
+    geom_means = gmean(matrices, axis=2)
+    weights = geom_means / geom_means.sum(axis=1, keepdims=True)
+    lambda_max = np.full(weights.shape[0], float(weights.shape[1]))
+    active = np.ones(weights.shape[0], dtype=bool)
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0: break
+        aw = np.einsum('rij,rj->ri', matrices[idx], weights[idx])
+        lambda_max[idx] = aw.sum(axis=1)
+        new_w = aw / lambda_max[idx][:, None]
+        delta = np.abs(new_w - weights[idx]).max(axis=1)
+        weights[idx] = new_w
+        active[idx] = delta > tol
+    return weights, lambda_max
+
+def calculate_weights(matrix, method='geometric'):
+    if method == 'eigenvector':
+        weights, _ = power_iteration_batch(matrix[np.newaxis])
+        return weights[0]
+    if method == 'arithmetic':
+        col_sum = matrix.sum(axis=0)
+        col_sum[col_sum == 0] = 1
+        normalized_matrix = matrix / col_sum
+        weights = normalized_matrix.mean(axis=1)
+    else:
+        geom_means = gmean(matrix, axis=1)
+        weights = geom_means / geom_means.sum()
+    return weights
+
+def calculate_consistency(matrix, method='geometric'):
+    n = matrix.shape[0]
+    if n <= 2: return 0.0, 0.0, n
+    weights = calculate_weights(matrix, method)
+    weighted_sum = matrix.dot(weights)
+    weights_safe = weights.copy()
+    weights_safe[weights_safe == 0] = 1e-10
+    lambda_values = weighted_sum / weights_safe
+    lambda_max = lambda_values.mean()
+    ci = (lambda_max - n) / (n - 1)
+    ri = get_ri(n)
+    cr = ci / ri if ri > 0 else 0.0
+    return cr, ci, lambda_max
+
+def improve_consistency(matrix, threshold, min_val, max_val, max_iter=500, learning_rate=0.4, method='geometric', allow_even=False):
+    current_matrix = matrix.copy()
+    n = current_matrix.shape[0]
+    cr, ci, _ = calculate_consistency(current_matrix, method)
+    iterations = 0
+    if cr <= threshold: return current_matrix, cr, iterations, False
+    
+    triu_indices = np.triu_indices(n, k=1)
+    
+    for it in range(max_iter):
+        if cr <= threshold: break
+        
+        w = calculate_weights(current_matrix, method)
+        consistent_matrix = np.outer(w, 1/w)
+        
+        new_matrix = (current_matrix * (1 - learning_rate)) + (consistent_matrix * learning_rate)
+        np.fill_diagonal(new_matrix, 1.0)
+        
+        vals = new_matrix[triu_indices]
+        
+        temp_raw = np.where(vals == 1.0, 1.0, 
+                   np.where(vals > 1.0, -np.round(vals), 
+                   np.round(1.0/vals)))
+        
+        temp_raw = np.clip(temp_raw, min_val, max_val)
+        
+        abs_raw = np.abs(temp_raw)
+        signs = np.sign(temp_raw)
+        
+        if not allow_even:
+            abs_raw = np.where((abs_raw % 2 == 0) & (abs_raw != 0), np.maximum(1, abs_raw - 1), abs_raw)
+            
+        temp_raw = np.where(temp_raw == 0, 1, (signs * abs_raw)).astype(int)
+        
+        final_vals = np.where(temp_raw == 0, 1.0,
+                     np.where(temp_raw < 0, np.abs(temp_raw).astype(float),
+                     np.where(temp_raw == 1, 1.0, 1.0 / temp_raw)))
+        
+        new_matrix[triu_indices] = final_vals
+        new_matrix.T[triu_indices] = 1.0 / final_vals
+        
+        current_matrix = new_matrix
+        cr, ci, _ = calculate_consistency(current_matrix, method)
+        iterations += 1
+        
+    was_corrected = iterations > 0
+    return current_matrix, cr, iterations, was_corrected
+
+# [최적화 추가] 응답자 전체를 (R, n, n) 행렬 묶음으로 한 번에 계산하는 배치 연산 함수
+def build_matrix_stack(values, n):
+    values = np.asarray(values, dtype=float)
+    iu, ju = np.triu_indices(n, k=1)
+    m = min(len(iu), values.shape[1])
+    iu, ju = iu[:m], ju[:m]
+    vals = values[:, :m]
+    with np.errstate(divide='ignore'):
+        ahp_vals = np.where(vals == 0, 1.0,
+                   np.where(vals < 0, np.abs(vals),
+                   np.where(vals == 1, 1.0, 1.0 / vals)))
+    matrices = np.tile(np.eye(n), (values.shape[0], 1, 1))
+    matrices[:, iu, ju] = ahp_vals
+    matrices[:, ju, iu] = 1.0 / ahp_vals
+    return matrices
+
+def calculate_weights_batch(matrices, method='geometric'):
+    if method == 'eigenvector':
+        weights, _ = power_iteration_batch(matrices)
+        return weights
+    if method == 'arithmetic':
+        col_sum = matrices.sum(axis=1, keepdims=True)
+        col_sum[col_sum == 0] = 1
+        normalized = matrices / col_sum
+        weights = normalized.mean(axis=2)
+    else:
+        geom_means = gmean(matrices, axis=2)
+        weights = geom_means / geom_means.sum(axis=1, keepdims=True)
+    return weights
+
+def calculate_consistency_batch(matrices, method='geometric'):
+    r_count, n = matrices.shape[0], matrices.shape[1]
+    if n <= 2:
+        return np.zeros(r_count), np.zeros(r_count), np.full(r_count, float(n))
+    weights = calculate_weights_batch(matrices, method)
+    weighted_sum = np.einsum('rij,rj->ri', matrices, weights)
+    weights_safe = np.where(weights == 0, 1e-10, weights)
+    lambda_max = (weighted_sum / weights_safe).mean(axis=1)
+    ci = (lambda_max - n) / (n - 1)
+    ri = get_ri(n)
+    cr = ci / ri if ri > 0 else np.zeros(r_count)
+    return cr, ci, lambda_max
+
+# [최적화 추가] 응답자 행렬 묶음 전체를 한 번에 보정 (수렴한 행렬은 마스크로 연산에서 제외)
+def improve_consistency_batch(matrices, threshold, min_val, max_val, max_iter=500, learning_rate=0.4, method='geometric', allow_even=False):
+    current = matrices.copy()
+    r_count, n = current.shape[0], current.shape[1]
+    cr, _, _ = calculate_consistency_batch(current, method)
+    cr = np.array(cr, dtype=float)
+    iterations = np.zeros(r_count, dtype=int)
+    active = ~(cr <= threshold)
+
+    triu_indices = np.triu_indices(n, k=1)
+    diag = np.arange(n)
+
+    for it in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0: break
+
+        sub = current[idx]
+        w = calculate_weights_batch(sub, method)
+        consistent = w[:, :, None] * (1 / w)[:, None, :]
+
+        new = (sub * (1 - learning_rate)) + (consistent * learning_rate)
+        new[:, diag, diag] = 1.0
+
+        vals = new[:, triu_indices[0], triu_indices[1]]
+
+        temp_raw = np.where(vals == 1.0, 1.0,
+                   np.where(vals > 1.0, -np.round(vals),
+                   np.round(1.0/vals)))
+
+        temp_raw = np.clip(temp_raw, min_val, max_val)
+
+        abs_raw = np.abs(temp_raw)
+        signs = np.sign(temp_raw)
+
+        if not allow_even:
+            abs_raw = np.where((abs_raw % 2 == 0) & (abs_raw != 0), np.maximum(1, abs_raw - 1), abs_raw)
+
+        temp_raw = np.where(temp_raw == 0, 1, (signs * abs_raw)).astype(int)
+
+        with np.errstate(divide='ignore'):
+            final_vals = np.where(temp_raw == 0, 1.0,
+                         np.where(temp_raw < 0, np.abs(temp_raw).astype(float),
+                         np.where(temp_raw == 1, 1.0, 1.0 / temp_raw)))
+
+        new[:, triu_indices[0], triu_indices[1]] = final_vals
+        new[:, triu_indices[1], triu_indices[0]] = 1.0 / final_vals
+
+        current[idx] = new
+        sub_cr, _, _ = calculate_consistency_batch(new, method)
+        cr[idx] = sub_cr
+        iterations[idx] += 1
+        active[idx] = ~(sub_cr <= threshold)
+
+    was_corrected = iterations > 0
+    return current, cr, iterations, was_corrected
+
+def parse_input_value(val):
+    if val == 0: return 1.0
+    elif val < 0: return abs(val)
+    elif val == 1: return 1.0
+    else: return 1.0 / val
+
+def infer_factors_from_columns(cols):
+    m = len(cols)
+    delta = 1 + 8 * m
+    n = int((1 + np.sqrt(delta)) / 2)
+    extracted_factors = []
+    seen = set()
+    for c in cols:
+        parts = str(c).split('_')
+        for p in parts:
+            p_str = p.strip()
+            if p_str not in seen:
+                seen.add(p_str)
+                extracted_factors.append(p_str)
+    if len(extracted_factors) == n:
+        factors = extracted_factors 
+    else:
+        factors = [f"F{i+1}" for i in range(n)]
+    return factors, n
+
+# [최적화 추가] 다중비교 보정 (p-value 1차원 배열, NaN 은 보정 대상에서 제외)
+def adjust_pvalues(p_values, correction=None):
+    p = np.asarray(p_values, dtype=float)
+    if correction is None:
+        return p
+    out = np.full_like(p, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    m = valid.size
+    if m == 0:
+        return out
+    pv = p[valid]
+    if correction == 'bonferroni':
+        adj = pv * m
+    elif correction == 'holm':
+        order = np.argsort(pv)
+        adj_sorted = np.maximum.accumulate(pv[order] * (m - np.arange(m)))
+        adj = np.empty(m)
+        adj[order] = adj_sorted
+    elif correction == 'fdr_bh':
+        order = np.argsort(pv)[::-1]
+        adj_sorted = np.minimum.accumulate(pv[order] * m / np.arange(m, 0, -1))
+        adj = np.empty(m)
+        adj[order] = adj_sorted
+    else:
+        raise ValueError(f"지원하지 않는 다중비교 보정 방식입니다: {correction}")
+    out[valid] = np.minimum(adj, 1.0)
+    return out
+
+# [최적화 추가] 대응표본 t-검정을 상삼각 쌍 전체에 대해 한 번에 계산하고 대칭으로 채운 float 행렬 반환
+# correction: None, 'bonferroni', 'holm', 'fdr_bh'
+def calculate_pairwise_ttest(df, factors, correction=None):
+    n = len(factors)
+    weight_cols = [f"Weight_{f}" for f in factors]
+    available = [c in df.columns for c in weight_cols]
+    iu, ju = np.triu_indices(n, k=1)
+    if n > 1 and len(df) > 1:
+        weights = df[[c for c, ok in zip(weight_cols, available) if ok]].reindex(columns=weight_cols).to_numpy(dtype=float)
+        count, mean, m2 = paired_difference_moments(weights)
+    else:
+        count, mean, m2 = np.zeros(len(iu)), np.full(len(iu), np.nan), np.full(len(iu), np.nan)
+    return pairwise_ttest_from_moments(factors, count, mean, m2, correction)
+
+# [최적화 추가] 대응표본 t-검정에 필요한 충분통계량(쌍별 차이의 개수/평균/편차제곱합)
+# - 청크 단위로 계산한 값을 merge_moments 로 합치면 전체 데이터로 한 번에 계산한 것과 같음
+def paired_difference_moments(weights):
+    n = weights.shape[1]
+    iu, ju = np.triu_indices(n, k=1)
+    diffs = weights[:, iu] - weights[:, ju]
+    # nan_policy='omit' 과 동일하게 쌍별로 결측 응답을 제외
+    valid = ~np.isnan(diffs)
+    count = valid.sum(axis=0).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(valid, diffs, 0.0).sum(axis=0) / count
+        m2 = np.where(valid, (diffs - mean) ** 2, 0.0).sum(axis=0)
+    return count, mean, m2
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """두 부분집합의 (개수, 평균, 편차제곱합)을 합칩니다 (Chan 의 병렬 분산 공식)."""
+    count = count_a + count_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.nan_to_num(mean_b) - np.nan_to_num(mean_a)
+        mean = np.where(count > 0, (count_a * np.nan_to_num(mean_a) + count_b * np.nan_to_num(mean_b)) / count, np.nan)
+        m2 = np.nan_to_num(m2_a) + np.nan_to_num(m2_b) + np.where(count > 0, delta ** 2 * count_a * count_b / count, 0.0)
+    return count, mean, m2
+
+def pairwise_ttest_from_moments(factors, count, mean, m2, correction=None):
+    n = len(factors)
+    p_matrix = np.full((n, n), np.nan)
+    np.fill_diagonal(p_matrix, 1.0)
+    iu, ju = np.triu_indices(n, k=1)
+    if n > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = m2 / (count - 1)
+            t_stat = mean / np.sqrt(var / count)
+        dof = count - 1
+        p_upper = np.where(dof > 0, 2.0 * t_dist.sf(np.abs(t_stat), np.maximum(dof, 1)), np.nan)
+        p_upper = adjust_pvalues(p_upper, correction)
+        p_matrix[iu, ju] = p_upper
+        p_matrix[ju, iu] = p_upper
+    return pd.DataFrame(p_matrix, index=factors, columns=factors)
+
+# [최적화 추가] 시트 1개의 응답자별 분석 결과를 열 단위 배열로 보관하는 경량 컨테이너
+# - 기존: 응답자마다 n×n 행렬 객체(Matrix_Object) + Raw_Orig_*/Raw_Final_* 넓은 열을 가진 object DataFrame
+# - 변경: 원 응답/보정 판단값은 (R, n(n-1)/2) 상삼각 배열 하나씩, 가중치/CI/CR 은 타입이 지정된 배열로 보관
+# - float32=True 이면 실수 배열을 float32 로 저장 (계산은 float64 로 수행한 뒤 저장 시에만 변환)
+# - 화면/엑셀에 필요한 DataFrame 은 frame() 으로 필요할 때 만들어 사용
+class SheetResult:
+    def __init__(self, ids, types, comp_cols, factors, orig_raw, orig_ci, orig_cr,
+                 final_tri, final_ci, final_cr, iterations, corrected, weights, float32=False):
+        real = np.float32 if float32 else np.float64
+        self.ids = np.asarray(ids)
+        self.types = np.asarray(types)
+        self.comp_cols = list(comp_cols)
+        self.factors = list(factors)
+        self.orig_raw = orig_raw
+        self.orig_ci = np.asarray(orig_ci, dtype=real)
+        self.orig_cr = np.asarray(orig_cr, dtype=real)
+        self.final_tri = np.ascontiguousarray(final_tri, dtype=real)
+        self.final_ci = np.asarray(final_ci, dtype=real)
+        self.final_cr = np.asarray(final_cr, dtype=real)
+        self.iterations = np.asarray(iterations, dtype=np.int32)
+        self.corrected = np.asarray(corrected, dtype=bool)
+        self.weights = np.ascontiguousarray(weights, dtype=real)
+
+    @classmethod
+    def empty_result(cls, comp_cols, factors, float32=False):
+        n, m = len(factors), len(comp_cols)
+        return cls(np.empty(0, dtype=object), np.empty(0, dtype=object), comp_cols, factors, np.empty((0, m)),
+                   np.empty(0), np.empty(0), np.empty((0, m)), np.empty(0), np.empty(0),
+                   np.empty(0, dtype=np.int32), np.empty(0, dtype=bool), np.empty((0, n)), float32=float32)
+
+    @classmethod
+    def from_frame(cls, res_df, factors, comp_cols, float32=False):
+        """기존 방식(행 단위 dict → DataFrame)의 결과를 컨테이너로 변환합니다."""
+        if res_df.empty:
+            return cls.empty_result(comp_cols, factors, float32=float32)
+        n = len(factors)
+        iu, ju = np.triu_indices(n, k=1)
+        matrices = np.stack(res_df['Matrix_Object'].values)
+        return cls(res_df['ID'].values, res_df['Type'].values, comp_cols, factors,
+                   _stack_columns(res_df, [f"Raw_Orig_{c}" for c in comp_cols]),
+                   res_df['Original_CI'].values, res_df['Original_CR'].values, matrices[:, iu, ju],
+                   res_df['Final_CI'].values, res_df['Final_CR'].values,
+                   res_df['Iterations'].values, res_df['Corrected'].values,
+                   res_df[[f"Weight_{f}" for f in factors]].values, float32=float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def empty(self):
+        return len(self.ids) == 0
+
+    @property
+    def nbytes(self):
+        arrays = (self.ids, self.types, self.orig_raw, self.orig_ci, self.orig_cr, self.final_tri,
+                  self.final_ci, self.final_cr, self.iterations, self.corrected, self.weights)
+        return int(sum(a.nbytes for a in arrays))
+
+    def matrices(self):
+        """보정 후 판단행렬 (R, n, n) 을 상삼각 배열에서 복원합니다 (하삼각은 역수)."""
+        n = len(self.factors)
+        iu, ju = np.triu_indices(n, k=1)
+        tri = self.final_tri.astype(np.float64)
+        mats = np.tile(np.eye(n), (len(tri), 1, 1))
+        mats[:, iu, ju] = tri
+        mats[:, ju, iu] = 1.0 / tri
+        return mats
+
+    def final_raw(self):
+        """보정 후 판단값을 설문 척도(정수, 음수는 왼쪽 항목 우세)로 환산합니다."""
+        tri = self.final_tri.astype(np.float64)
+        with np.errstate(divide='ignore'):
+            return np.where(tri == 1.0, 1, np.where(tri > 1.0, -np.round(tri), np.round(1.0 / tri))).astype(int)
+
+    def weight_frame(self):
+        return pd.DataFrame(self.weights, columns=[f"Weight_{f}" for f in self.factors])
+
+    def frame(self, include_raw=True):
+        """화면/엑셀용 DataFrame (ID, Type, Raw_Orig_*, CI/CR, Raw_Final_*, Iterations, Corrected, Weight_*)."""
+        cols = {"ID": self.ids, "Type": self.types}
+        if include_raw:
+            for k, col_name in enumerate(self.comp_cols):
+                cols[f"Raw_Orig_{col_name}"] = self.orig_raw[:, k]
+        cols["Original_CI"] = self.orig_ci
+        cols["Original_CR"] = self.orig_cr
+        if include_raw:
+            final_raw = self.final_raw()
+            for k, col_name in enumerate(self.comp_cols):
+                cols[f"Raw_Final_{col_name}"] = final_raw[:, k]
+        cols["Final_CI"] = self.final_ci
+        cols["Final_CR"] = self.final_cr
+        cols["Iterations"] = self.iterations
+        cols["Corrected"] = self.corrected
+        for f_idx, f_name in enumerate(self.factors):
+            cols[f"Weight_{f_name}"] = self.weights[:, f_idx]
+        frame = pd.DataFrame(cols)
+        if include_raw and self.orig_raw.dtype == object:
+            frame = frame.infer_objects()
+        return frame
+
+    def iter_frames(self):
+        """엑셀 상세 시트 기록용 DataFrame 조각들 (메모리 보관 결과는 한 조각)."""
+        yield self.frame()
+
+    def cr_frame(self):
+        return pd.DataFrame({"ID": self.ids, "Type": self.types, "Final_CR": self.final_cr})
+
+def _stack_columns(df, columns):
+    # 열들의 dtype 이 모두 같으면 그 dtype 의 2차원 배열로, 섞여 있으면 원래 값을 보존하는 object 배열로 묶음
+    if len(columns) == 0:
+        return np.empty((len(df), 0))
+    dtypes = set(df[c].dtype for c in columns)
+    return df[list(columns)].to_numpy(dtype=dtypes.pop() if len(dtypes) == 1 else object)
+
+def process_single_sheet(df, cr_threshold, max_iter, method='geometric', batched=True, use_cache=True, float32=False):
+    if batched:
+        return process_single_sheet_batched(df, cr_threshold, max_iter, method, use_cache=use_cache, float32=float32)
+    comp_cols = df.columns[2:]
+    factors, n = infer_factors_from_columns(comp_cols)
+    
+    all_comp_values = df[comp_cols].values.flatten()
+    sheet_min = int(np.min(all_comp_values))
+    sheet_max = int(np.max(all_comp_values))
+    
+    has_even = np.any((np.abs(all_comp_values) % 2 == 0) & (np.abs(all_comp_values) > 1))
+    
+    results_list = []
+    excluded_list = []
+    excluded_count = 0
+    for idx, row in df.iterrows():
+        respondent_id = row.iloc[0]
+        respondent_type = row.iloc[1]
+        matrix = np.eye(n)
+        
+        raw_values = []
+        col_idx = 0
+        for i in range(n):
+            for j in range(i + 1, n):
+                if col_idx < len(comp_cols):
+                    raw_val = row[comp_cols[col_idx]]
+                    raw_values.append(raw_val)
+                    ahp_val = parse_input_value(raw_val)
+                    matrix[i, j] = ahp_val
+                    matrix[j, i] = 1.0 / ahp_val
+                    col_idx += 1
+        
+        orig_cr, orig_ci, _ = calculate_consistency(matrix, method)
+        final_matrix = matrix.copy()
+        final_cr = orig_cr
+        iterations = 0
+        corrected_flag = False
+        if orig_cr > cr_threshold:
+            final_matrix, final_cr, iterations, corrected_flag = improve_consistency(
+                matrix, cr_threshold, sheet_min, sheet_max, max_iter=max_iter, method=method, allow_even=has_even
+            )
+        
+        if final_cr > cr_threshold:
+            excluded_count += 1
+            ex_res = {"ID": respondent_id, "Type": respondent_type}
+            for k, col_name in enumerate(comp_cols):
+                ex_res[col_name] = raw_values[k]
+            ex_res["CR"] = final_cr
+            excluded_list.append(ex_res)
+            continue
+
+        final_raw_values = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                val = final_matrix[i, j]
+                if val == 1.0: final_raw_val = 1
+                elif val > 1.0: final_raw_val = -int(round(val)) 
+                else: final_raw_val = int(round(1.0/val)) 
+                final_raw_values.append(final_raw_val)
+
+        _, final_ci, _ = calculate_consistency(final_matrix, method)
+        final_weights = calculate_weights(final_matrix, method)
+        
+        res = {
+            "ID": respondent_id,
+            "Type": respondent_type
+        }
+        
+        for k, col_name in enumerate(comp_cols):
+            res[f"Raw_Orig_{col_name}"] = raw_values[k]
+        
+        res["Original_CI"] = orig_ci
+        res["Original_CR"] = orig_cr
+        
+        for k, col_name in enumerate(comp_cols):
+            res[f"Raw_Final_{col_name}"] = final_raw_values[k]
+            
+        res["Final_CI"] = final_ci
+        res["Final_CR"] = final_cr
+        
+        res["Iterations"] = iterations
+        res["Corrected"] = corrected_flag
+        res["Matrix_Object"] = final_matrix 
+        
+        for f_idx, f_name in enumerate(factors):
+            res[f"Weight_{f_name}"] = final_weights[f_idx]
+            
+        results_list.append(res)
+        
+    results_df = pd.DataFrame(results_list)
+    excluded_df = pd.DataFrame(excluded_list)
+    return SheetResult.from_frame(results_df, factors, comp_cols, float32=float32), factors, excluded_count, excluded_df
+
+# [최적화 추가] 응답자별 보정 결과 캐시 (원본 응답 벡터 + 분석 조건의 해시를 키로 사용, 재업로드 시 변경된 행만 보정)
+# - 파일은 캐시 폴더(cache_dir)에 저장
+# - 조회할 때마다 last_access 를 갱신하면 읽기만 하는 작업 프로세스들도 쓰기 잠금을 다투게 되므로,
+#   적중한 키는 메모리에 모아 두었다가 다음 저장(put) 때 같은 트랜잭션으로 반영 (너무 많이 쌓이면 한 번에 반영)
+RESPONDENT_CACHE_NAME = "respondent_cache.db"
+RESPONDENT_CACHE_VERSION = 1
+RESPONDENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONDENT_CACHE_TOUCH_BATCH = 5000
+_pending_touches = {}
+_touch_lock = threading.Lock()
+
+def _respondent_cache_conn():
+    conn = sqlite3.connect(cache_path(RESPONDENT_CACHE_NAME), timeout=30)
+    conn.execute('''CREATE TABLE IF NOT EXISTS correction_cache
+                    (key TEXT PRIMARY KEY, payload BLOB, size INTEGER, last_access REAL)''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON correction_cache(last_access)")
+    return conn
+
+def _flush_touches(cursor):
+    with _touch_lock:
+        touches = list(_pending_touches.items())
+        _pending_touches.clear()
+    cursor.executemany("UPDATE correction_cache SET last_access=? WHERE key=?", [(t, k) for k, t in touches])
+
+def correction_cache_keys(raw_block, cr_threshold, max_iter, method, min_val, max_val, allow_even):
+    prefix = f"v{RESPONDENT_CACHE_VERSION}|{float(cr_threshold)!r}|{int(max_iter)}|{method}|{int(min_val)}|{int(max_val)}|{bool(allow_even)}|".encode()
+    rows = np.ascontiguousarray(raw_block, dtype=np.float64)
+    return [hashlib.sha256(prefix + row.tobytes()).hexdigest() for row in rows]
+
+def correction_cache_get(keys):
+    found = {}
+    if not keys: return found
+    try:
+        conn = _respondent_cache_conn()
+        c = conn.cursor()
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            c.execute(f"SELECT key, payload FROM correction_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for key, payload in c.fetchall():
+                found[key] = np.frombuffer(payload, dtype=np.float64)
+        if found:
+            now = time.time()
+            with _touch_lock:
+                _pending_touches.update(dict.fromkeys(found, now))
+                flush = len(_pending_touches) >= RESPONDENT_CACHE_TOUCH_BATCH
+            if flush:
+                _flush_touches(c)
+                conn.commit()
+        conn.close()
+    except sqlite3.Error:
+        return {}
+    return found
+
+def correction_cache_put(entries, max_bytes=RESPONDENT_CACHE_MAX_BYTES):
+    if not entries: return
+    try:
+        conn = _respondent_cache_conn()
+        c = conn.cursor()
+        now = time.time()
+        _flush_touches(c)
+        c.executemany("INSERT OR REPLACE INTO correction_cache (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                      [(k, v.tobytes(), v.nbytes, now) for k, v in entries.items()])
+        # 용량 초과 시 가장 오래 사용되지 않은 항목부터 삭제 (LRU), 한도의 90%까지 비움
+        c.execute("SELECT COALESCE(SUM(size), 0) FROM correction_cache")
+        total = c.fetchone()[0]
+        if total > max_bytes:
+            to_free = total - int(max_bytes * 0.9)
+            victims = []
+            for key, size in c.execute("SELECT key, size FROM correction_cache ORDER BY last_access ASC").fetchall():
+                if to_free <= 0: break
+                victims.append((key,))
+                to_free -= size
+            c.executemany("DELETE FROM correction_cache WHERE key=?", victims)
+        conn.commit()
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+def improve_consistency_cached(matrices, raw_block, threshold, min_val, max_val, max_iter=500, method='geometric', allow_even=False):
+    r_count, n = matrices.shape[0], matrices.shape[1]
+    iu, ju = np.triu_indices(n, k=1)
+    keys = correction_cache_keys(raw_block, threshold, max_iter, method, min_val, max_val, allow_even)
+    hits = correction_cache_get(keys)
+
+    final_matrices = matrices.copy()
+    final_cr = np.zeros(r_count)
+    iterations = np.zeros(r_count, dtype=int)
+    corrected = np.zeros(r_count, dtype=bool)
+
+    hit_rows = np.array([k in hits for k in keys], dtype=bool)
+    if hit_rows.any():
+        payloads = np.stack([hits[k] for k in keys if k in hits])
+        final_tri = payloads[:, :len(iu)]
+        hit_mats = np.tile(np.eye(n), (len(payloads), 1, 1))
+        hit_mats[:, iu, ju] = final_tri
+        hit_mats[:, ju, iu] = 1.0 / final_tri
+        final_matrices[hit_rows] = hit_mats
+        final_cr[hit_rows] = payloads[:, -3]
+        iterations[hit_rows] = payloads[:, -2].astype(int)
+        corrected[hit_rows] = payloads[:, -1].astype(bool)
+
+    miss_rows = np.flatnonzero(~hit_rows)
+    if miss_rows.size:
+        miss_mats, miss_cr, miss_it, miss_corr = improve_consistency_batch(
+            matrices[miss_rows], threshold, min_val, max_val, max_iter=max_iter, method=method, allow_even=allow_even
+        )
+        final_matrices[miss_rows] = miss_mats
+        final_cr[miss_rows] = miss_cr
+        iterations[miss_rows] = miss_it
+        corrected[miss_rows] = miss_corr
+        new_entries = {}
+        for pos, r in enumerate(miss_rows):
+            new_entries[keys[r]] = np.concatenate([miss_mats[pos][iu, ju], [miss_cr[pos], miss_it[pos], miss_corr[pos]]]).astype(np.float64)
+        correction_cache_put(new_entries)
+
+    return final_matrices, final_cr, iterations, corrected
+
+# [최적화 추가] iterrows 루프 대신 전체 응답을 (R, n, n) 배열로 한 번에 분산 배치하여 계산
+def sheet_scale_bounds(values):
+    """응답값 블록의 (최솟값, 최댓값, 짝수 척도 사용 여부)를 반환합니다."""
+    all_comp_values = np.asarray(values).flatten()
+    sheet_min = int(np.min(all_comp_values))
+    sheet_max = int(np.max(all_comp_values))
+    has_even = bool(np.any((np.abs(all_comp_values) % 2 == 0) & (np.abs(all_comp_values) > 1)))
+    return sheet_min, sheet_max, has_even
+
+def process_single_sheet_batched(df, cr_threshold, max_iter, method='geometric', use_cache=True, float32=False, scale=None):
+    comp_cols = df.columns[2:]
+    factors, n = infer_factors_from_columns(comp_cols)
+
+    # 보정 범위(척도 최솟값/최댓값, 짝수 척도 사용 여부)는 시트 전체 기준
+    # (청크 단위 스트리밍 분석에서는 1차 스캔으로 구한 값을 scale 로 전달)
+    sheet_min, sheet_max, has_even = scale if scale is not None else sheet_scale_bounds(df[comp_cols].values)
+
+    # [최적화 추가] 동일한 응답 패턴은 한 번만 계산한 뒤 응답자별로 다시 펼침
+    raw_block = np.asarray(df[comp_cols].values, dtype=float)
+    unique_block, inverse = np.unique(raw_block, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    u_matrices = build_matrix_stack(unique_block, n)
+    u_orig_cr, u_orig_ci, _ = calculate_consistency_batch(u_matrices, method)
+
+    u_final_matrices = u_matrices.copy()
+    u_final_cr = u_orig_cr.copy()
+    u_iterations = np.zeros(len(unique_block), dtype=int)
+    u_corrected = np.zeros(len(unique_block), dtype=bool)
+    to_fix = np.flatnonzero(u_orig_cr > cr_threshold)
+    if to_fix.size and use_cache:
+        u_final_matrices[to_fix], u_final_cr[to_fix], u_iterations[to_fix], u_corrected[to_fix] = improve_consistency_cached(
+            u_matrices[to_fix], unique_block[to_fix], cr_threshold, sheet_min, sheet_max, max_iter=max_iter, method=method, allow_even=has_even
+        )
+    elif to_fix.size:
+        u_final_matrices[to_fix], u_final_cr[to_fix], u_iterations[to_fix], u_corrected[to_fix] = improve_consistency_batch(
+            u_matrices[to_fix], cr_threshold, sheet_min, sheet_max, max_iter=max_iter, method=method, allow_even=has_even
+        )
+    _, u_final_ci, _ = calculate_consistency_batch(u_final_matrices, method)
+    u_final_weights = calculate_weights_batch(u_final_matrices, method)
+
+    orig_cr, orig_ci = u_orig_cr[inverse], u_orig_ci[inverse]
+    final_cr = u_final_cr[inverse]
+    iterations, corrected = u_iterations[inverse], u_corrected[inverse]
+
+    keep = final_cr <= cr_threshold
+    excluded_count = int((~keep).sum())
+
+    ids = df.iloc[:, 0].values
+    types = df.iloc[:, 1].values
+
+    if excluded_count:
+        ex_cols = {"ID": ids[~keep], "Type": types[~keep]}
+        for col_name in comp_cols:
+            ex_cols[col_name] = df[col_name].values[~keep]
+        ex_cols["CR"] = final_cr[~keep]
+        excluded_df = pd.DataFrame(ex_cols)
+    else:
+        excluded_df = pd.DataFrame()
+
+    if not keep.any():
+        return SheetResult.empty_result(comp_cols, factors, float32=float32), factors, excluded_count, excluded_df
+
+    kept_inverse = inverse[keep]
+    iu, ju = np.triu_indices(n, k=1)
+    results = SheetResult(
+        ids[keep], types[keep], comp_cols, factors, _stack_columns(df, comp_cols)[keep],
+        orig_ci[keep], orig_cr[keep], u_final_matrices[:, iu, ju][kept_inverse],
+        u_final_ci[kept_inverse], final_cr[keep], iterations[keep], corrected[keep],
+        u_final_weights[kept_inverse], float32=float32,
+    )
+    return results, factors, excluded_count, excluded_df
+
+# [최적화 추가] 그룹별 가중치·집계 판단행렬(AIJ)·그룹 CR 을 한 번의 그룹 패스로 계산
+# - 기하평균은 로그 영역 합(log-sum)을 그룹별로 누적한 뒤 exp(합 / 개수) 로 구함
+# - 그룹 행렬들의 일관성은 calculate_consistency_batch 로 한 번에 계산
+# - 누적(accumulate)과 마무리(finalize)를 나누어 청크 단위 스트리밍 분석에서도 같은 합계를 이어서 누적
+def accumulate_group_judgments(weights, matrices, codes, n_groups, method='geometric'):
+    counts = np.bincount(codes, minlength=n_groups).astype(float)
+    n = weights.shape[1]
+    w_sum = np.zeros((n_groups, n))
+    m_sum = np.zeros((n_groups, n, n))
+    if method == 'arithmetic':
+        np.add.at(w_sum, codes, weights)
+        np.add.at(m_sum, codes, matrices)
+    else:
+        with np.errstate(divide='ignore'):
+            log_w, log_m = np.log(weights), np.log(matrices)
+        np.add.at(w_sum, codes, log_w)
+        np.add.at(m_sum, codes, log_m)
+    return w_sum, m_sum, counts
+
+def finalize_group_judgments(w_sum, m_sum, counts, method='geometric'):
+    if method == 'arithmetic':
+        group_w = w_sum / counts[:, None]
+        group_m = m_sum / counts[:, None, None]
+    else:
+        group_w = np.exp(w_sum / counts[:, None])
+        group_m = np.exp(m_sum / counts[:, None, None])
+    group_w = group_w / group_w.sum(axis=1, keepdims=True)
+    group_cr, group_ci, _ = calculate_consistency_batch(group_m, method)
+    return group_w, group_m, np.asarray(group_cr, dtype=float), np.asarray(group_ci, dtype=float), counts.astype(int)
+
+def aggregate_group_judgments(weights, matrices, codes, n_groups, method='geometric'):
+    w_sum, m_sum, counts = accumulate_group_judgments(weights, matrices, codes, n_groups, method)
+    return finalize_group_judgments(w_sum, m_sum, counts, method)
+
+def summarize_groups(results, method='geometric'):
+    """응답 유형(Type)별 집계 결과를 {그룹명: {'weights', 'matrix', 'cr', 'ci', 'count'}} 로 반환합니다."""
+    if results.empty:
+        return {}
+    codes, names = pd.factorize(pd.Series(results.types).astype(str), sort=True)
+    weights = results.weights.astype(np.float64)
+    group_w, group_m, group_cr, group_ci, counts = aggregate_group_judgments(weights, results.matrices(), codes, len(names), method)
+    return {
+        str(name): {'weights': group_w[g], 'matrix': group_m[g], 'cr': float(group_cr[g]), 'ci': float(group_ci[g]), 'count': int(counts[g])}
+        for g, name in enumerate(names)
+    }
+
+# [최적화 추가] 시트 1개 단위의 분석 작업 (프로세스 풀에서 병렬 실행되는 단위)
+def analyze_sheet(df, cr_threshold, max_iter, method='geometric', float32=False):
+    results, facts, excl_count, excl_df = process_single_sheet(df, cr_threshold, max_iter, method, float32=float32)
+    sig_df = calculate_pairwise_ttest(results.weight_frame(), facts)
+    weights = results.weights.astype(np.float64)
+    # 전체 집계는 모든 응답자를 하나의 그룹으로 보는 경우와 같음
+    all_w, all_m, all_cr, all_ci, _ = aggregate_group_judgments(weights, results.matrices(), np.zeros(len(results), dtype=np.intp), 1, method)
+    cr_final_avg = float(np.mean(results.final_cr, dtype=np.float64)) if len(results) else np.nan
+    return {
+        'weights': all_w[0], 'factors': facts, 'cr': cr_final_avg,
+        'results': results, 'group_matrix': all_m[0], 'group_cr': float(all_cr[0]), 'group_ci': float(all_ci[0]), 'sig_df': sig_df,
+        'groups': summarize_groups(results, method),
+        'excluded_count': excl_count, 'excluded_df': excl_df
+    }
+
+# [최적화 추가] 시트 병렬 분석용 프로세스 풀
+# - Streamlit 서버에서는 DB writer, outbox 워커, 결과 엑셀 생성 스레드 등이 잠금을 잡은 채 실행 중이므로
+#   fork 로 복제하면 작업 프로세스가 잠금을 물려받아 멈출 수 있음 → forkserver(없으면 spawn) 방식의 깨끗한 프로세스 사용
+# - 프로세스 시작 비용이 크므로 풀은 처음 필요할 때 한 번 만들어 재사용
+# - 결과를 ANALYSIS_POOL_TIMEOUT 초 안에 받지 못하면 풀을 종료하고 현재 프로세스에서 직접 분석
+ANALYSIS_POOL_TIMEOUT = 600.0
+_pool_lock = threading.Lock()
+_pool = None
+
+def _pool_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _pool_context().Pool(processes=workers)
+        return _pool
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.terminate()
+
+def _analyze_sheet_task(df, cr_threshold, max_iter, method, float32, ri_values):
+    # 작업 프로세스는 부모의 RI 계산 결과를 물려받지 않으므로 전달받은 값을 사용
+    _ri_memo.update(ri_values)
+    return analyze_sheet(df, cr_threshold, max_iter, method, float32)
+
+def analyze_sheets(frames, cr_threshold, max_iter, method='geometric', parallel=True, max_workers=None, float32=False, timeout=ANALYSIS_POOL_TIMEOUT):
+    """여러 시트를 서로 독립적으로 분석합니다. parallel=True 이면 제한된 크기의 프로세스 풀에서 병렬 실행합니다.
+    풀을 만들 수 없거나, 작업 전달(pickle)에 실패하거나, 시간 제한을 넘기면 현재 프로세스에서 순서대로 분석합니다.
+    시트 분석 중 발생한 예외는 그대로 전달됩니다."""
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) - 1)
+    workers = min(max_workers, len(frames))
+    if parallel and workers > 1:
+        # 표에 없는 크기의 RI 는 부모 프로세스에서 한 번만 계산하여 작업 프로세스에 넘겨 줌
+        ri_values = {}
+        for df in frames:
+            n = infer_factors_from_columns(df.columns[2:])[1]
+            ri_values[n] = get_ri(n)
+        try:
+            pool = _get_pool(max_workers)
+        except OSError:
+            pool = None
+        if pool is not None:
+            deadline = time.monotonic() + timeout
+            try:
+                pending = [pool.apply_async(_analyze_sheet_task, (df, cr_threshold, max_iter, method, float32, ri_values)) for df in frames]
+                return [r.get(max(0.0, deadline - time.monotonic())) for r in pending]
+            except multiprocessing.TimeoutError:
+                _discard_pool(pool)
+            except (pickle.PicklingError, MaybeEncodingError):
+                pass
+    return [analyze_sheet(df, cr_threshold, max_iter, method, float32) for df in frames]
+
+def create_sample_excel():
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        main_cols = ["ID", "Type", "거버넌스_계획타당성", "거버넌스_실현가능성", "거버넌스_사업효과", 
+                      "계획타당성_실현가능성", "계획타당성_사업효과", "실현가능성_사업효과"]
+        main_data = [
+            [1, "전문가", 5, -5, 5, 5, -5, 5],               
+            [2, "전문가", 7, 7, -7, -7, 2, -2],       
+            [3, "일반", -5, 5, 5, -5, 5, 5],
+            [4, "일반", 3, -3, 3, -3, 3, -3],
+            [5, "공무원", 9, -9, 9, -9, 9, -9]
+        ]
+        df_main = pd.DataFrame(main_data, columns=main_cols)
+        df_main.to_excel(writer, sheet_name="Main_Criteria", index=False)
+        
+        inconsistent_pattern = [
+            [1, "전문가", 5, -5, 5],
+            [2, "전문가", 7, -7, 7],
+            [3, "일반", 3, -3, 3],
+            [4, "일반", 9, -9, 9],
+            [5, "공무원", 4, -4, 4]
+        ]
+        sub1_cols = ["ID", "Type", "행정지원_지역공동체", "행정지원_총괄사업관리자", "지역공동체_총괄사업관리자"]
+        pd.DataFrame(inconsistent_pattern, columns=sub1_cols).to_excel(writer, sheet_name="거버넌스", index=False)
+        sub2_cols = ["ID", "Type", "현안적정성_대안적정성", "현안적정성_목표구체성", "대안적정성_목표구체성"]
+        pd.DataFrame(inconsistent_pattern, columns=sub2_cols).to_excel(writer, sheet_name="계획타당성", index=False)
+        sub3_cols = ["ID", "Type", "부지확보_사업구체화", "부지확보_사업비적정성", "사업구체화_사업비적정성"]
+        pd.DataFrame(inconsistent_pattern, columns=sub3_cols).to_excel(writer, sheet_name="실현가능성", index=False)
+        sub4_cols = ["ID", "Type", "경제적효과_사회적효과", "경제적효과_성과관리", "사회적효과_성과관리"]
+        pd.DataFrame(inconsistent_pattern, columns=sub4_cols).to_excel(writer, sheet_name="사업효과", index=False)
+    output.seek(0)
+    return output
+
+# [최적화 추가] 요인 × 집단 격자의 그룹 합/제곱합으로 모든 요인의 일원분산분석(F)을 한 번에 계산하고,
+# Tukey HSD 는 스튜던트화 범위 분포의 임계값으로 직접 판정 (statsmodels 요약표 파싱 제거)
+_tukey_crit_memo = {}
+
+def _tukey_critical_value(k, dof, alpha=0.05):
+    key = (int(k), int(dof), alpha)
+    if key not in _tukey_crit_memo:
+        _tukey_crit_memo[key] = float(studentized_range.ppf(1 - alpha, k, dof)) if dof > 0 else np.nan
+    return _tukey_crit_memo[key]
+
+def calculate_anova_and_posthoc(full_data, alpha=0.05):
+    factor_codes, factor_names = pd.factorize(full_data['Factor'])
+    group_codes, group_names = pd.factorize(full_data['Type'], sort=True)
+    values = full_data['Global_Weight'].to_numpy(dtype=float)
+    n_f, n_g = len(factor_names), len(group_names)
+
+    cell = factor_codes * n_g + group_codes
+    counts = np.bincount(cell, minlength=n_f * n_g).reshape(n_f, n_g).astype(float)
+    sums = np.bincount(cell, weights=values, minlength=n_f * n_g).reshape(n_f, n_g)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        # 집단 내 제곱합은 편차를 직접 누적하여 계산 (sum(x^2) - sum(x)^2/n 의 자릿수 손실 방지)
+        within_sq = np.bincount(cell, weights=(values - means.ravel()[cell]) ** 2, minlength=n_f * n_g).reshape(n_f, n_g)
+    return anova_from_cell_moments(factor_names, group_names, counts, sums, within_sq, alpha)
+
+def anova_from_cell_moments(factor_names, group_names, counts, sums, within_sq, alpha=0.05):
+    """요인×그룹 셀별 (개수, 합, 편차제곱합) 만으로 일원배치 ANOVA 와 Tukey HSD 사후검정을 수행합니다."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        present = counts > 0
+        k = present.sum(axis=1)
+        n_total = counts.sum(axis=1)
+        grand_mean = sums.sum(axis=1) / n_total
+        ss_between = np.where(present, counts * (np.where(present, means, 0.0) - grand_mean[:, None]) ** 2, 0.0).sum(axis=1)
+        ss_within = np.where(present, within_sq, 0.0).sum(axis=1)
+        df_between = k - 1
+        df_within = n_total - k
+        ms_within = ss_within / df_within
+        f_stats = (ss_between / df_between) / ms_within
+        p_vals = f_dist.sf(f_stats, df_between, df_within)
+
+    results = []
+    for fi, factor in enumerate(factor_names):
+        if k[fi] < 2:
+            continue
+        f_stat, p_val = f_stats[fi], p_vals[fi]
+        row = {
+            "요인": factor,
+            "F-값": f_stat,
+            "P-Value": p_val,
+            "유의성": "유의함" if p_val < alpha else "유의하지 않음",
+            "사후검정(Tukey HSD)": ""
+        }
+
+        if p_val < alpha:
+            try:
+                g_idx = np.flatnonzero(present[fi])
+                gi, gj = np.triu_indices(len(g_idx), k=1)
+                a_idx, b_idx = g_idx[gi], g_idx[gj]
+                mean_diff = means[fi, b_idx] - means[fi, a_idx]
+                std_err = np.sqrt(ms_within[fi] / 2.0 * (1.0 / counts[fi, a_idx] + 1.0 / counts[fi, b_idx]))
+                reject = np.abs(mean_diff) > _tukey_critical_value(k[fi], df_within[fi], alpha) * std_err
+                if reject.any():
+                    pairs_str = [f"{group_names[x]} vs {group_names[y]}" for x, y in zip(a_idx[reject], b_idx[reject])]
+                    row["사후검정(Tukey HSD)"] = ", ".join(pairs_str) + " 차이 있음"
+                else:
+                    row["사후검정(Tukey HSD)"] = "집단 간 구체적 차이 발견 못함"
+            except Exception:
+                row["사후검정(Tukey HSD)"] = "계산 오류"
+
+        results.append(row)
+
+    return pd.DataFrame(results)
+
+# [최적화 추가] 계층 분석 결과 메모리 캐시 (업로드 내용 해시 + 분석 조건을 키로 사용)
+# - 프로세스 단위로 유지되어 Streamlit 재실행/다른 세션에서도 재사용
+# - 항목 크기(DataFrame/배열/bytes)를 추정하여 전체 바이트 예산을 넘으면 가장 오래 사용하지 않은 항목부터 제거
+# - 제거된 항목 중 임시 파일을 가진 결과(스트리밍 분석의 SpooledSheetResult)는 release() 로 파일을 바로 삭제
+ANALYSIS_CACHE_MAX_BYTES = 512 * 1024 * 1024
+_analysis_cache = OrderedDict()
+_analysis_cache_sizes = {}
+_analysis_cache_lock = threading.Lock()
+
+def estimate_nbytes(obj):
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if hasattr(obj, 'nbytes'):
+        # SheetResult 등 자체 크기를 보고하는 결과 컨테이너
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v) for v in obj)
+    return 64
+
+def release_cached_value(obj):
+    """캐시에서 제거된 값 안의 release() 를 가진 객체(임시 파일 보관 결과 등)를 정리합니다.
+    결과 엑셀을 아직 만드는 중이면 끝난 뒤에 정리합니다."""
+    if isinstance(obj, dict):
+        future = obj.get('export_future')
+        if future is not None and not future.done():
+            future.add_done_callback(lambda _: release_cached_value(obj))
+            return
+        for v in obj.values():
+            release_cached_value(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            release_cached_value(v)
+    elif hasattr(obj, 'release'):
+        obj.release()
+
+def analysis_cache_key(content_hash, cr_threshold, max_iter, method):
+    return (content_hash, float(cr_threshold), int(max_iter), method)
+
+def analysis_cache_get(key):
+    with _analysis_cache_lock:
+        value = _analysis_cache.get(key)
+        if value is not None:
+            _analysis_cache.move_to_end(key)
+        return value
+
+def analysis_cache_put(key, value, max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+    size = estimate_nbytes(value)
+    if size > max_bytes:
+        return False
+    evicted = []
+    with _analysis_cache_lock:
+        if key in _analysis_cache:
+            old_value = _analysis_cache.pop(key)
+            if old_value is not value:
+                evicted.append(old_value)
+        _analysis_cache[key] = value
+        _analysis_cache_sizes[key] = size
+        total = sum(_analysis_cache_sizes.values())
+        while total > max_bytes and len(_analysis_cache) > 1:
+            old_key, old_value = _analysis_cache.popitem(last=False)
+            total -= _analysis_cache_sizes.pop(old_key)
+            evicted.append(old_value)
+    for old_value in evicted:
+        release_cached_value(old_value)
+    return True
+
+def analysis_cache_stats():
+    with _analysis_cache_lock:
+        return {'entries': len(_analysis_cache), 'bytes': sum(_analysis_cache_sizes.values())}
+
+# -----------------------------------------------------------------------------
+# 계층 전체(대분류 + 세부항목 시트) 분석 파이프라인
+# -----------------------------------------------------------------------------
+def load_workbook_frames(source):
+    excel_obj = pd.ExcelFile(source)
+    return {sn: excel_obj.parse(sn) for sn in excel_obj.sheet_names}
+
+def _open_read_only_workbook(source):
+    try:
+        from openpyxl import load_workbook
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        return load_workbook(source, read_only=True, data_only=True)
+    except Exception:
+        return None
+
+def _count_data_rows(ws, limit):
+    ws.reset_dimensions()
+    last_data_row = 0
+    for idx, row in enumerate(ws.iter_rows(values_only=True)):
+        if any(v is not None for v in row):
+            # 첫 행은 헤더, 중간의 빈 행은 pandas 와 동일하게 행 수에 포함
+            last_data_row = idx
+            if last_data_row > limit:
+                break
+    return last_data_row
+
+# [최적화 추가] 무료 사용자 표본 수 제한 확인용 경량 probe
+# - openpyxl 읽기 전용 모드로 행을 스트리밍하며, 데이터 행이 limit 를 넘는 순간 즉시 중단 (pandas 로 적재하지 않음)
+# - 시트 dimension 메타데이터는 작성 프로그램에 따라 부정확할 수 있어 reset_dimensions() 후 실제 행을 기준으로 판단
+# - 반환값: {시트명: 확인된 데이터 행 수(limit+1 이면 초과)} / xlsx 가 아니어서 확인할 수 없으면 None
+def probe_sheet_row_counts(source, limit):
+    wb = _open_read_only_workbook(source)
+    if wb is None:
+        return None
+    try:
+        return {ws.title: _count_data_rows(ws, limit) for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+def workbook_within_row_limit(source, limit):
+    """모든 시트의 데이터 행 수가 limit 이하이면 True, 초과하면 False, 확인할 수 없으면 None 을 반환합니다."""
+    counts = probe_sheet_row_counts(source, limit)
+    if counts is None:
+        return None
+    return all(c <= limit for c in counts.values())
+
+# [최적화 추가] 스트리밍 분석 대상(대용량 파일) 판별
+# - dimension 메타데이터상 threshold 행 이하인 시트는 행을 읽지 않고 바로 통과 (일반 업로드는 XML 앞부분만 읽고 끝남)
+# - 메타데이터가 threshold 를 넘거나 없는 시트(A1 로만 기록하는 작성 프로그램 포함)만 threshold+1 행까지 읽어 실제로 확인
+# - xlsx 가 아니면 False (기존과 같이 메모리 적재 경로로 분석)
+def workbook_needs_streaming(source, threshold):
+    """데이터 행이 threshold 를 넘는 시트가 있으면 True 를 반환합니다."""
+    wb = _open_read_only_workbook(source)
+    if wb is None:
+        return False
+    try:
+        for ws in wb.worksheets:
+            max_row, max_col = ws.max_row, ws.max_column
+            if max_row is not None and (max_row, max_col) != (1, 1) and max_row - 1 <= threshold:
+                continue
+            if _count_data_rows(ws, threshold) > threshold:
+                return True
+        return False
+    finally:
+        wb.close()
+
+# [최적화 추가] 응답자별 전역 가중치(대분류 가중치 × 세부항목 가중치)를 ID 인덱스 조인으로 한 번에 계산
+# - 기존: 응답자 × 대분류마다 ID 불리언 필터링 (O(응답자 × 요인 × 행))
+# - 결과(long format: ID, Type, Factor, Global_Weight)는 ANOVA, 레이더/산점도, 상세 데이터 탭에서 공통으로 사용
+def build_individual_global_weights(main_results, main_factors, sub_results_storage):
+    columns = ["ID", "Type", "Factor", "Global_Weight"]
+    if main_results.empty:
+        return pd.DataFrame(columns=columns)
+    # 동일 ID가 여러 번 응답한 경우 기존과 동일하게 첫 행만 사용
+    main_first = ~pd.Index(main_results.ids).duplicated(keep='first')
+    ids = main_results.ids[main_first]
+    types = pd.Series(main_results.types[main_first]).astype(str).values
+    main_w = main_results.weights[main_first].astype(np.float64)
+
+    weight_blocks, present_blocks, factor_labels = [], [], []
+    for f_idx, mf in enumerate(main_factors):
+        sub_info = sub_results_storage[mf]
+        sub_factors = sub_info['factors']
+        sub_results = sub_info['results']
+        if sub_results.empty:
+            sub_w = np.full((len(ids), len(sub_factors)), np.nan)
+            present = np.zeros(len(ids), dtype=bool)
+        else:
+            sub_first = ~pd.Index(sub_results.ids).duplicated(keep='first')
+            pos = pd.Index(sub_results.ids[sub_first]).get_indexer(ids)
+            present = pos >= 0
+            sub_w = np.full((len(ids), len(sub_factors)), np.nan)
+            sub_w[present] = sub_results.weights[sub_first][pos[present]]
+        weight_blocks.append(main_w[:, f_idx][:, None] * sub_w)
+        present_blocks.append(np.repeat(present[:, None], len(sub_factors), axis=1))
+        factor_labels.extend(sub_factors)
+
+    if not factor_labels:
+        return pd.DataFrame(columns=columns)
+    # (응답자, 전체 세부항목) 행렬을 행 우선으로 펼치면 기존 루프와 같은 ID → 대분류 → 세부항목 순서가 됨
+    global_w = np.hstack(weight_blocks)
+    present = np.hstack(present_blocks).ravel()
+    n_cols = global_w.shape[1]
+    return pd.DataFrame({
+        "ID": np.repeat(ids, n_cols)[present],
+        "Type": np.repeat(types, n_cols)[present],
+        "Factor": np.tile(np.asarray(factor_labels, dtype=object), len(ids))[present],
+        "Global_Weight": global_w.ravel()[present],
+    }).reset_index(drop=True)
+
+def collect_hierarchy_sheets(sheet_names, sheet_infos):
+    """시트별 분석 결과를 대분류 정보, 세부항목 시트 저장소, 시트별 제외 응답 목록으로 정리합니다."""
+    main_info = sheet_infos[0]
+    main_factors = main_info['factors']
+    sub_results_storage = {}
+    total_excl_df_list = [main_info['excluded_df']]
+    for i, sub_sheet_name in enumerate(sheet_names[1:]):
+        parent_factor = main_factors[i]
+        sub_info = sheet_infos[i + 1]
+        sub_excl_df = sub_info.pop('excluded_df')
+        sub_info.pop('excluded_count')
+        sub_results_storage[parent_factor] = sub_info
+        if not sub_excl_df.empty:
+            sub_excl_df['Sheet'] = sub_sheet_name
+            total_excl_df_list.append(sub_excl_df)
+    return main_info, sub_results_storage, total_excl_df_list
+
+def analyze_hierarchy(sheet_frames, cr_threshold, max_iter, method='geometric', parallel=True, float32=False):
+    """첫 시트를 대분류, 나머지 시트를 대분류 순서대로의 세부항목으로 보고 계층 전체를 분석합니다."""
+    sheet_names = list(sheet_frames.keys())
+    sheet_infos = analyze_sheets([sheet_frames[sn] for sn in sheet_names], cr_threshold, max_iter, method, parallel=parallel, float32=float32)
+    main_info, sub_results_storage, total_excl_df_list = collect_hierarchy_sheets(sheet_names, sheet_infos)
+    main_results = main_info['results']
+
+    indiv_df = build_individual_global_weights(main_results, main_info['factors'], sub_results_storage)
+
+    anova_df = pd.DataFrame()
+    if not indiv_df.empty and len(indiv_df['Type'].unique()) >= 2:
+        anova_df = calculate_anova_and_posthoc(indiv_df)
+
+    unique_groups = sorted(pd.Series(main_results.types).astype(str).unique())
+    result = assemble_hierarchy_result(method, main_info, sub_results_storage, unique_groups)
+    result.update({'total_excl_df_list': total_excl_df_list, 'indiv_df': indiv_df, 'anova_df': anova_df})
+    return result
+
+def assemble_hierarchy_result(method, main_info, sub_results_storage, unique_groups):
+    """대분류/세부항목 집계 결과로 종합·그룹별 결과표와 그룹 비교표를 만듭니다."""
+    main_results, main_factors = main_info['results'], main_info['factors']
+    group_main_weights = main_info['weights']
+    main_cr_final_avg = main_info['cr']
+
+    summary_rows = []
+    for idx, main_f in enumerate(main_factors):
+        m_weight = group_main_weights[idx]
+        sub_info = sub_results_storage[main_f]
+        for s_idx, sub_f in enumerate(sub_info['factors']):
+            s_weight = sub_info['weights'][s_idx]
+            global_w = m_weight * s_weight
+            summary_rows.append({
+                "대분류": main_f, "대분류 가중치": m_weight, "중분류": sub_f, "중분류 가중치": s_weight,
+                "Global Weight": global_w, "CR(대분류)": main_cr_final_avg, "CR(중분류)": sub_info['cr']
+            })
+
+    final_df = pd.DataFrame(summary_rows)
+    final_df['Global Rank'] = final_df['Global Weight'].rank(ascending=False, method='min').astype(int)
+    cols_order = ["대분류", "대분류 가중치", "중분류", "중분류 가중치", "Global Weight", "Global Rank", "CR(대분류)", "CR(중분류)"]
+    final_df = final_df[cols_order]
+
+    group_analysis_results = {}
+    group_full_dfs = {}
+
+    main_groups = main_info['groups']
+    for grp in unique_groups:
+        g_main = main_groups.get(grp)
+        if g_main is None: continue
+        g_main_w, g_main_cr = g_main['weights'], g_main['cr']
+
+        grp_rows = []
+        for idx, main_f in enumerate(main_factors):
+            m_w = g_main_w[idx]
+            g_sub = sub_results_storage[main_f]['groups'].get(grp)
+            if g_sub is None: continue
+            g_sub_w, g_sub_cr = g_sub['weights'], g_sub['cr']
+            for s_idx, sf in enumerate(sub_results_storage[main_f]['factors']):
+                grp_rows.append({
+                    "대분류": main_f, "대분류 가중치": m_w, "중분류": sf, "중분류 가중치": g_sub_w[s_idx],
+                    "Global Weight": m_w * g_sub_w[s_idx], "CR(대분류)": g_main_cr, "CR(중분류)": g_sub_cr
+                })
+        g_df = pd.DataFrame(grp_rows)
+        if not g_df.empty:
+            g_df['Global Rank'] = g_df['Global Weight'].rank(ascending=False, method='min').astype(int)
+            group_full_dfs[grp] = g_df[cols_order]
+            group_analysis_results[grp] = group_full_dfs[grp][['중분류', 'Global Weight']]
+
+    comparison_df = final_df[['중분류', 'Global Weight']].copy()
+    comparison_df.rename(columns={'Global Weight': 'Overall'}, inplace=True)
+    for grp, df_res in group_analysis_results.items():
+        temp_df = df_res.rename(columns={'Global Weight': grp})
+        comparison_df = comparison_df.merge(temp_df, on='중분류', how='left')
+
+    return {
+        'method': method,
+        'main_results': main_results, 'main_factors': main_factors,
+        'main_excluded': main_info['excluded_count'], 'main_sig_df': main_info['sig_df'],
+        'group_main_weights': group_main_weights, 'main_cr_final_avg': main_cr_final_avg,
+        'main_group_matrix': main_info['group_matrix'], 'main_grp_cr': main_info['group_cr'],
+        'main_groups': main_groups,
+        'sub_results_storage': sub_results_storage,
+        'final_df': final_df, 'unique_groups': unique_groups, 'group_full_dfs': group_full_dfs,
+        'group_analysis_results': group_analysis_results, 'comparison_df': comparison_df,
+    }
@@ -0,0 +1,184 @@
+# =============================================================================
+# users.db 데이터 접근 계층 (Streamlit 비의존 모듈)
+# [최적화 추가] 함수마다 sqlite3.connect/close 하던 방식을 대체
+# - WAL 저널 모드 + 튜닝된 PRAGMA: 읽기는 쓰기를 기다리지 않고, 쓰기는 fsync 횟수를 줄임
+# - 읽기: 재사용 가능한 연결 풀에서 빌려 쓰고 반납 (Streamlit 은 재실행마다 새 스레드에서 실행되므로
+#   스레드 로컬 연결 대신 스레드 간에 돌려 쓰는 풀을 사용)
+# - 쓰기: 전용 writer 스레드 1개가 큐에 쌓인 작은 쓰기들을 한 트랜잭션으로 묶어 순서대로 처리
+#   (작업마다 SAVEPOINT 를 두어 한 작업의 실패가 같은 묶음의 다른 작업에 영향을 주지 않음)
+# - 큐 대기/쓰기 잠금 대기/트랜잭션 시간을 누적하여 db_stats() 로 제공
+# =============================================================================
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+DB_PATH = "users.db"
+READ_POOL_SIZE = 8
+WRITE_BATCH_MAX = 64
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=67108864",
+)
+
+_read_pool = queue.LifoQueue()
+_write_queue = queue.Queue()
+_writer_lock = threading.Lock()
+_writer_thread = None
+_stats_lock = threading.Lock()
+_stats = {
+    "connections": 0, "reads": 0, "writes": 0, "write_errors": 0, "batches": 0,
+    "queue_wait_total": 0.0, "queue_wait_max": 0.0,
+    "lock_wait_total": 0.0, "lock_wait_max": 0.0,
+    "txn_total": 0.0, "txn_max": 0.0,
+}
+
+def _connect(path=DB_PATH):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    with _stats_lock:
+        _stats["connections"] += 1
+    return conn
+
+@contextmanager
+def read_connection():
+    """읽기용 연결을 풀에서 빌려 줍니다 (autocommit 모드이므로 읽기 트랜잭션을 오래 잡지 않음)."""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        if _read_pool.qsize() < READ_POOL_SIZE:
+            _read_pool.put(conn)
+        else:
+            conn.close()
+        with _stats_lock:
+            _stats["reads"] += 1
+
+def fetch_one(sql, params=()):
+    with read_connection() as conn:
+        return conn.execute(sql, params).fetchone()
+
+def fetch_all(sql, params=()):
+    with read_connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def read_frame(sql, params=()):
+    import pandas as pd
+    with read_connection() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def _record_wait(prefix, seconds):
+    _stats[f"{prefix}_total"] += seconds
+    _stats[f"{prefix}_max"] = max(_stats[f"{prefix}_max"], seconds)
+
+def _run_batch(conn, batch):
+    started = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    locked = time.perf_counter()
+    outcomes = []
+    for job, future, _ in batch:
+        conn.execute("SAVEPOINT job")
+        try:
+            outcomes.append((future, job(conn), None))
+            conn.execute("RELEASE SAVEPOINT job")
+        except Exception as e:
+            conn.execute("ROLLBACK TO SAVEPOINT job")
+            conn.execute("RELEASE SAVEPOINT job")
+            outcomes.append((future, None, e))
+    try:
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        conn.execute("ROLLBACK")
+        outcomes = [(future, None, e) for future, _, _ in outcomes]
+    finished = time.perf_counter()
+    with _stats_lock:
+        _stats["batches"] += 1
+        _stats["writes"] += len(batch)
+        _stats["write_errors"] += sum(1 for _, _, err in outcomes if err is not None)
+        for _, _, enqueued in batch:
+            _record_wait("queue_wait", started - enqueued)
+        _record_wait("lock_wait", locked - started)
+        _record_wait("txn", finished - started)
+    # 결과는 커밋 이후에 전달하여 호출 측이 곧바로 다시 읽어도 변경 내용이 보이도록 함
+    for future, value, err in outcomes:
+        if err is None:
+            future.set_result(value)
+        else:
+            future.set_exception(err)
+
+def _writer_loop():
+    conn = _connect()
+    while True:
+        batch = [_write_queue.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _run_batch(conn, batch)
+        except Exception as e:
+            # 트랜잭션 시작/복구 자체가 실패한 경우: 아직 결과를 받지 못한 작업에 오류를 전달하고 연결을 새로 염
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = _connect()
+
+def _ensure_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="ahp-db-writer", daemon=True)
+            _writer_thread.start()
+
+def submit_write(job):
+    """job(conn) 을 writer 큐에 넣고 Future 를 반환합니다. job 은 같은 트랜잭션 안에서 실행됩니다."""
+    _ensure_writer()
+    future = Future()
+    _write_queue.put((job, future, time.perf_counter()))
+    return future
+
+def write(job, wait=True):
+    future = submit_write(job)
+    return future.result() if wait else future
+
+def execute_write(sql, params=(), wait=True):
+    """쓰기 SQL 한 문장을 실행하고 (lastrowid, rowcount) 를 반환합니다."""
+    def job(conn):
+        cur = conn.execute(sql, params)
+        return cur.lastrowid, cur.rowcount
+    return write(job, wait=wait)
+
+def executemany_write(sql, rows, wait=True):
+    return write(lambda conn: conn.executemany(sql, rows).rowcount, wait=wait)
+
+def db_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["queue_depth"] = _write_queue.qsize()
+    stats["pooled_readers"] = _read_pool.qsize()
+    return stats
+
+def format_db_stats():
+    s = db_stats()
+    writes, batches = s["writes"], s["batches"]
+    avg = lambda key, count: (s[f"{key}_total"] / count * 1000) if count else 0.0
+    return (f"writes={writes} batches={batches} (avg {writes / batches if batches else 0:.1f}/txn) errors={s['write_errors']} "
+            f"queue_wait avg={avg('queue_wait', writes):.1f}ms max={s['queue_wait_max'] * 1000:.1f}ms, "
+            f"lock_wait avg={avg('lock_wait', batches):.1f}ms max={s['lock_wait_max'] * 1000:.1f}ms, "
+            f"txn avg={avg('txn', batches):.1f}ms, reads={s['reads']} connections={s['connections']} queue={s['queue_depth']}")
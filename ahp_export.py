@@ -0,0 +1,385 @@
+# =============================================================================
+# AHP 분석 결과 엑셀(xlsx) 내보내기 (Streamlit 비의존 모듈)
+# [최적화 추가] xlsxwriter constant_memory 모드로 행 순서대로 스트리밍 기록하고 결과는 임시 파일에 저장
+# - 한 행을 다 쓰면 디스크로 내려가므로 응답자 수가 늘어도 메모리 사용량이 거의 늘지 않음
+# - 셀 서식은 열 단위로 미리 계산하고 값은 DataFrame 을 한 번에 파이썬 리스트로 변환하여 기록
+# - constant_memory 모드에서는 이미 내려간 행을 다시 쓸 수 없으므로 모든 표는 위에서 아래로 한 번만 기록
+# =============================================================================
+import math
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+def _excel_value(val):
+    # pandas.to_excel 과 동일하게 결측값은 빈 셀, 무한대는 문자열로 기록
+    if val is None:
+        return None
+    if isinstance(val, float):
+        if math.isnan(val):
+            return None
+        if math.isinf(val):
+            return 'inf' if val > 0 else '-inf'
+    return val
+
+FRAME_ROW_BLOCK = 5_000
+
+def _frame_rows(df, block=FRAME_ROW_BLOCK):
+    # 파이썬 객체로의 변환은 block 행씩 나누어 수행 (대용량 표 전체를 한 번에 object 리스트로 만들지 않음)
+    if not len(df.columns):
+        return
+    for start in range(0, len(df), block):
+        yield from df.iloc[start:start + block].astype(object).to_numpy().tolist()
+
+def _write_row_cells(ws, row, start_col, values, fmts):
+    for c, (val, fmt) in enumerate(zip(values, fmts), start=start_col):
+        val = _excel_value(val)
+        if val is None:
+            ws.write_blank(row, c, None, fmt)
+        else:
+            ws.write(row, c, val, fmt)
+
+def write_frame(ws, start_row, df, header_fmt=None, body_fmts=None):
+    """DataFrame 을 머리글 + 본문 순서로 한 행씩 기록하고 다음 빈 행 번호를 반환합니다."""
+    ws.write_row(start_row, 0, list(df.columns), header_fmt)
+    if body_fmts is None:
+        body_fmts = [None] * len(df.columns)
+    for r_idx, values in enumerate(_frame_rows(df)):
+        _write_row_cells(ws, start_row + 1 + r_idx, 0, values, body_fmts)
+    return start_row + 1 + len(df)
+
+def write_custom_ahp_table(workbook, worksheet, df, title_text, start_row, formats, excluded_df=None):
+    header_fmt = formats['header']
+    merge_fmt = formats['merge']
+    body_fmt = formats['body']
+    num_fmt = formats['num']
+    sum_row_fmt = formats['sum_row']
+
+    if excluded_df is not None:
+        worksheet.write(start_row, 0, f"※ 분석 제외 사례수: {len(excluded_df)}건", formats['excl_count'])
+        start_row += 1
+        if not excluded_df.empty:
+            worksheet.write(start_row, 0, "▶ 제외된 응답 데이터 (보정 실패)", formats['bold'])
+            start_row += 1
+            write_frame(worksheet, start_row, excluded_df)
+            start_row += len(excluded_df) + 2
+
+    worksheet.merge_range(start_row, 0, start_row, 6, title_text, formats['title'])
+    start_row += 1
+
+    headers = ["대분류", "가중치(a)", "중분류", "가중치(b)", "종합 가중치(a x b)", "종합 순위", "비고"]
+    worksheet.write_row(start_row, 0, headers, header_fmt)
+    start_row += 1
+
+    current_row = start_row
+    sum_blanks = ["", "", ""]
+    for main_c, sub_df in df.groupby('대분류', sort=False):
+        first = sub_df.iloc[0]
+        merge_span = len(sub_df) + 2
+        block_start = current_row
+        sub_rows = sub_df[['중분류', '중분류 가중치', 'Global Weight', 'Global Rank']].astype(object).to_numpy().tolist()
+
+        # 대분류/가중치 열의 세로 병합은 아직 내려가지 않은 블록 첫 행에서 등록
+        # constant_memory 모드의 merge_range() 는 서식을 주면 나머지 행에 서식 있는 빈 셀을 채우며 그 행들로 넘어가
+        # 첫 행의 다른 셀이 유실되므로, 서식 없이 호출하여 (서식 없는 빈 셀은 기록되지 않음) 병합 영역만 등록
+        worksheet.merge_range(block_start, 0, block_start + merge_span - 1, 0, main_c)
+        worksheet.merge_range(block_start, 1, block_start + merge_span - 1, 1, first['대분류 가중치'])
+
+        # 병합 영역의 값/서식은 첫 행에 값을, 나머지 행에 같은 서식의 빈 셀을 행 순서대로 기록
+        for i, (sub_name, sub_w, global_w, rank) in enumerate(sub_rows):
+            if i == 0:
+                worksheet.write(current_row, 0, main_c, merge_fmt)
+                worksheet.write(current_row, 1, first['대분류 가중치'], num_fmt)
+            else:
+                worksheet.write_blank(current_row, 0, None, merge_fmt)
+                worksheet.write_blank(current_row, 1, None, num_fmt)
+            worksheet.write(current_row, 2, sub_name, body_fmt)
+            worksheet.write(current_row, 3, sub_w, num_fmt)
+            worksheet.write(current_row, 4, global_w, num_fmt)
+            worksheet.write(current_row, 5, rank, body_fmt)
+            worksheet.write(current_row, 6, "", body_fmt)
+            current_row += 1
+
+        for label, val, val_fmt in (("합계", sub_df['중분류 가중치'].sum(), formats['sum_val']),
+                                    ("일관성 비율(CR)", first['CR(중분류)'], formats['num_sum'])):
+            if current_row == block_start:
+                worksheet.write(current_row, 0, main_c, merge_fmt)
+                worksheet.write(current_row, 1, first['대분류 가중치'], num_fmt)
+            else:
+                worksheet.write_blank(current_row, 0, None, merge_fmt)
+                worksheet.write_blank(current_row, 1, None, num_fmt)
+            worksheet.write(current_row, 2, label, sum_row_fmt)
+            worksheet.write(current_row, 3, val, val_fmt)
+            worksheet.write_row(current_row, 4, sum_blanks, sum_row_fmt)
+            current_row += 1
+
+    worksheet.write(current_row, 0, "합계", sum_row_fmt)
+    worksheet.write(current_row, 1, 1, formats['sum_val'])
+    worksheet.write(current_row, 2, "합계", sum_row_fmt)
+    worksheet.write_blank(current_row, 3, "", sum_row_fmt)
+    worksheet.write(current_row, 4, 1, formats['sum_val'])
+    worksheet.write_blank(current_row, 5, "", sum_row_fmt)
+    worksheet.write_blank(current_row, 6, "", sum_row_fmt)
+
+    worksheet.set_column('A:A', 15)
+    worksheet.set_column('B:B', 12)
+    worksheet.set_column('C:C', 25)
+    worksheet.set_column('D:F', 12)
+    return current_row + 2
+
+def add_borders_to_data(worksheet, start_row, start_col, df, border_fmt, has_header=True, has_index=False):
+    rows = len(df) + (1 if has_header else 0)
+    cols = len(df.columns) + (1 if has_index else 0)
+    worksheet.conditional_format(start_row, start_col, start_row+rows-1, start_col+cols-1,
+                                  {'type': 'formula', 'criteria': '=TRUE', 'format': border_fmt})
+
+def _write_matrix(ws, start_row, matrix, labels, formats):
+    n = len(labels)
+    matrix_df = pd.DataFrame(matrix, index=labels, columns=labels)
+    ws.write_row(start_row, 1, list(labels))
+    values = np.asarray(matrix, dtype=float).tolist()
+    for r in range(n):
+        row = start_row + 1 + r
+        ws.write(row, 0, labels[r])
+        for c in range(n):
+            if r == c:
+                ws.write_number(row, c + 1, 1, formats['diagonal'])
+            else:
+                _write_row_cells(ws, row, c + 1, [values[r][c]], [formats['float']])
+    add_borders_to_data(ws, start_row, 0, matrix_df, formats['border'], has_header=True, has_index=True)
+    return start_row + n + 3
+
+def write_detailed_sheet(workbook, sheet_name, matrix_data, detail_data_df, matrix_title, row_labels, formats, group_matrices=None, sheet_excl_count=0):
+    ws = workbook.add_worksheet(sheet_name)
+    s_row_det = 0
+
+    ws.write(s_row_det, 0, f"분석 제외 사례수: {sheet_excl_count}건", formats['excl_count'])
+    s_row_det += 1
+
+    ws.write_string(s_row_det, 0, matrix_title)
+    s_row_det += 1
+    s_row_det = _write_matrix(ws, s_row_det, matrix_data, row_labels, formats)
+
+    if group_matrices:
+        for g_name, g_mat in group_matrices.items():
+            ws.write_string(s_row_det, 0, f"] 그룹 종합 행렬: {g_name}")
+            s_row_det += 1
+            s_row_det = _write_matrix(ws, s_row_det, g_mat, row_labels, formats)
+
+    # 상세 데이터는 DataFrame 하나 또는 (스트리밍 분석 결과처럼) 같은 열 구성의 DataFrame 조각들의 iterable
+    chunks = [detail_data_df] if isinstance(detail_data_df, pd.DataFrame) else detail_data_df
+    row = s_row_det + 1
+    for chunk_idx, chunk in enumerate(chunks):
+        # 열별 서식을 미리 결정 (CR 열은 0.1 초과 시 노란색, 실수형 열은 소수점 3자리, 그 외는 가운데 정렬)
+        columns = list(chunk.columns)
+        if chunk_idx == 0:
+            ws.write_row(s_row_det, 0, columns, formats['header'])
+        static_fmts = [formats['num'] if chunk[col_name].dtype.kind == 'f' else None for col_name in columns]
+        cr_cols = [(columns.index(c), c) for c in ('Original_CR', 'Final_CR') if c in columns]
+        cr_flags = {c_idx: (chunk[c].to_numpy(dtype=float) > 0.1) for c_idx, c in cr_cols}
+
+        for r_idx, values in enumerate(_frame_rows(chunk)):
+            fmts = []
+            for c_idx, val in enumerate(values):
+                if c_idx in cr_flags and cr_flags[c_idx][r_idx]:
+                    fmts.append(formats['yellow'])
+                elif static_fmts[c_idx] is not None or isinstance(val, float):
+                    fmts.append(formats['num'])
+                else:
+                    fmts.append(formats['body'])
+            _write_row_cells(ws, row, 0, values, fmts)
+            row += 1
+
+def write_group_comparison(workbook, comparison_df, anova_df, formats):
+    ws_comp = workbook.add_worksheet('Group_Comparison')
+    s_row = 1
+    ws_comp.write_string(s_row, 0, "그룹 간 비교(일원배치 분산분석: ANOVA)", formats['title'])
+    s_row += 1
+
+    if not anova_df.empty:
+        anova_for_merge = anova_df.rename(columns={'요인': '중분류'})
+        integrated_df = comparison_df.merge(anova_for_merge, on='중분류', how='left')
+    else:
+        integrated_df = comparison_df
+
+    ws_comp.write_row(s_row, 0, list(integrated_df.columns))
+    for r_idx, values in enumerate(_frame_rows(integrated_df)):
+        row = s_row + 1 + r_idx
+        _write_row_cells(ws_comp, row, 0, values[:1], [None])
+        for c, val in enumerate(values[1:], start=1):
+            val = _excel_value(val)
+            if val is None:
+                continue
+            if isinstance(val, (int, float)):
+                ws_comp.write_number(row, c, val, formats['num_3'])
+            else:
+                ws_comp.write(row, c, val, formats['border'])
+    add_borders_to_data(ws_comp, s_row, 0, integrated_df, formats['border'])
+
+    guide_start_row = s_row + len(integrated_df) + 3
+    bold_fmt = formats['guide_title']
+    text_fmt = formats['guide_text']
+    ws_comp.set_column('A:G', 20) 
+    ws_comp.merge_range(guide_start_row, 0, guide_start_row, 6, "※ 그룹 간 중요도의 차이가 있지만 통계적으로 유의하지 않게 나타나는 이유", bold_fmt)
+
+    guide_content = [
+        ("1. 그룹 내 편차(분산)가 너무 큰 경우", "ANOVA는 '그룹 간의 차이'와 '그룹 내의 차이'를 비교합니다.\n\n■ 원리: 그룹 간 평균 차이가 크더라도, 각 그룹 내부 데이터들이 서로 들쭉날쭉(분산이 큼)하다면 통계적으로는 '이 차이가 우연히 발생했을 가능성이 높다'고 판단합니다.\n■ 분석: 현재 데이터에서 평균값의 절대적인 차이는 커 보일 수 있지만, 각 그룹(A~D)에 속한 개별 응답자들의 값들이 평균에서 멀리 떨어져 있다면 F-값이 낮아지고 P-Value는 올라가게 됩니다."),
+        ("2. 표본 크기(Sample Size)의 부족", "통계적 유의성은 표본의 수에 매우 민감합니다.\n\n■ 현상: 각 그룹의 데이터 개수(표본수)가 너무 적다면(예: 그룹당 3~5개 미만) 아무리 평균 차이가 커도 통계적 힘(Power)이 부족하여 유의미한 차이를 찾아내지 못합니다.\n■ 확인 사항: 현재 분석에 사용된 각 그룹의 n수(표본수)가 충분한지 검토가 필요합니다."),
+        ("3. 데이터의 단위(Scale)와 변동성", "표에 나타난 수치들이 대부분 0.1 미만 혹은 0.2 수준의 매우 작은 소수점 단위입니다.\n\n■ 분석: 수치 자체가 작기 때문에 시각적으로는 0.05와 0.15가 3배 차이로 커 보일 수 있지만, 실제 계산 과정에서 발생하는 표준오차(Standard Error) 범위 안에 해당 수치들이 포함되어 있다면 통계적으로는 '측정 오차 범위 내의 흔들림'으로 간주됩니다.")
+    ]
+
+
+    current_row_comp = guide_start_row + 1
+    for title, body in guide_content:
+        ws_comp.set_row(current_row_comp, 25)
+        ws_comp.merge_range(current_row_comp, 0, current_row_comp, 6, title, bold_fmt)
+        ws_comp.set_row(current_row_comp + 1, 120)
+        ws_comp.merge_range(current_row_comp + 1, 0, current_row_comp + 1, 6, body, text_fmt)
+        current_row_comp += 2
+
+def write_theory_sheet(workbook):
+    theory_ws = workbook.add_worksheet("Consistency_Theory")
+    theory_title_fmt = workbook.add_format({'bold': True, 'font_size': 14, 'font_name': 'NanumGothic'})
+    theory_body_fmt = workbook.add_format({'text_wrap': True, 'valign': 'top', 'font_name': 'NanumGothic'})
+    theory_text = [
+        ["의사결정론적 관점에서의 AHP 일관성 보정 원리 및 학술적 근거"],
+        [""],
+        ["1. 서론: 계층분석과정(AHP)의 일관성 문제"],
+        ["Saaty(1980)에 의해 제안된 계층분석과정(Analytic Hierarchy Process, AHP)은 인간의 주관적 판단을 정량화하는 강력한 다기준 의사결정 도구이다. 그러나 의사결정자의 인지적 한계로 인해 쌍대비교 행렬에서 이행성(Transitivity)이 결여된 비일관적 판단이 발생할 수 있다. 본 시스템은 이러한 비일관성을 수학적으로 교정하여 분석의 신뢰성을 확보한다."],
+        [""],
+        ["2. 보정 알고리즘: 반복 수렴 조정법(Iterative Adjustment Method)"],
+        ["본 시스템에 적용된 보정 로직은 '반복적 선형 결합 수렴법'에 근거한다. 비일관적 행렬 A가 주어졌을 때, 일관성 비율(Consistency Ratio, CR)이 임계값(0.1 또는 0.2)을 초과할 경우 다음과 같은 프로세스를 수행한다."],
+        ["    가. 고유벡터법(Eigenvector Method) 또는 기하평균법을 통해 현재 행렬의 가중치 벡터 w를 도출한다."],
+        ["    나. 가중치 벡터 w를 기반으로 완벽한 일관성을 가진 행렬 W = [wi/wj]를 생성한다. 이를 '이상적 일관 행렬'이라 정의한다."],
+        ["    다. 원본 행렬 A와 이상적 행렬 W를 특정 학습률(Learning Rate, α=0.4)에 따라 선형 결합(Linear Combination)한다: A_new = (1-α)A + αW."],
+        ["    라. 교정된 행렬 A_new의 역수성(Reciprocity)을 재설정하고, CR이 임계값 이하로 수렴할 때까지 위 과정을 최대 500회 반복한다."],
+        [""],
+        ["3. 학술적 근거 및 효과"],
+        ["첫째, 최소 판단 왜곡의 원리(Principle of Minimal Distortion): Cao et al.(2008)에 따르면, 원본 행렬과 일관 행렬의 가중 평균을 이용한 조정은 의사결정자의 원래 선호 경향성을 최대한 보존하면서 수학적 일관성만을 선택적으로 향상시키는 효과가 입증되었다."],
+        ["둘째, 수렴 안정성: 반복적 조정 프로세스는 행렬의 최대 고유값(λmax)을 차원 수 n에 수렴하게 함으로써 일관성 지수(CI)를 통계적으로 유의미한 수준으로 감소시킨다."],
+        ["셋째, 실무적 유용성: 설문 응답자에게 재설문을 요구하기 어려운 연구 환경에서, 본 보정법은 데이터의 대푯값을 훼손하지 않는 범위 내에서 분석의 논리적 타당성을 부여하는 학술적 대안으로 활용된다."],
+        [""],
+        ["본 시스템의 분석 결과는 위와 같은 엄밀한 수치적 보정을 거쳐 산출되었으므로, 학술 연구 및 정책 의사결정의 기초 자료로 활용하기에 적합한 신뢰도를 보유함을 확인한다."]
+    ]
+    theory_ws.set_column('A:A', 100)
+    for r_idx, row_content in enumerate(theory_text):
+        fmt = theory_title_fmt if r_idx == 0 else theory_body_fmt
+        theory_ws.write(r_idx, 0, row_content[0], fmt)
+
+def _make_formats(workbook):
+    return {
+        'header': workbook.add_format({'bold': True, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#000000', 'font_color': '#FFFFFF', 'border': 1}),
+        'merge': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1}),
+        'body': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1}),
+        'num': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1, 'num_format': '0.000'}),
+        'sum_row': workbook.add_format({'bold': True, 'bg_color': '#D3D3D3', 'align': 'center', 'valign': 'vcenter', 'border': 1}),
+        'sum_val': workbook.add_format({'num_format': '0', 'bg_color': '#D3D3D3', 'border': 1, 'align':'center'}),
+        'num_sum': workbook.add_format({'num_format': '0.000', 'bg_color': '#D3D3D3', 'border': 1, 'align':'center'}),
+        'yellow': workbook.add_format({'bg_color': 'yellow', 'border': 1, 'align': 'center', 'num_format': '0.000'}),
+        'border': workbook.add_format({'border': 1}),
+        'float': workbook.add_format({'num_format': '0.000', 'align': 'center', 'valign': 'vcenter', 'border': 1}),
+        'diagonal': workbook.add_format({'num_format': '0', 'align': 'center', 'valign': 'vcenter', 'bg_color': '#E7E6E6', 'border': 1}),
+        'num_3': workbook.add_format({'num_format': '0.000', 'border': 1, 'align': 'center'}),
+        'title': workbook.add_format({'bold': True, 'font_size': 12}),
+        'bold': workbook.add_format({'bold': True}),
+        'excl_count': workbook.add_format({'bold': True, 'font_color': 'red'}),
+        'guide_title': workbook.add_format({'bold': True, 'font_size': 11, 'valign': 'vcenter', 'align': 'left', 'bg_color': '#F2F2F2', 'border': 1}),
+        'guide_text': workbook.add_format({'font_size': 10, 'text_wrap': True, 'valign': 'top', 'align': 'left', 'border': 1}),
+    }
+
+def export_result_workbook(result, path, tmpdir=None, progress=None):
+    """analyze_hierarchy() 결과를 서식이 적용된 결과 엑셀 파일로 path 에 스트리밍 기록합니다.
+    progress(완료 단계 수, 전체 단계 수) 콜백이 주어지면 시트를 하나 마칠 때마다 호출합니다."""
+    final_df = result['final_df']
+    unique_groups = result['unique_groups']
+    group_full_dfs = result['group_full_dfs']
+    total_excl_df_list = result['total_excl_df_list']
+    main_results = result['main_results']
+    main_groups = result['main_groups']
+    sub_results_storage = result['sub_results_storage']
+
+    total_steps = 4 + len(sub_results_storage)
+    done_steps = [0]
+    def step():
+        done_steps[0] += 1
+        if progress is not None:
+            progress(done_steps[0], total_steps)
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'tmpdir': tmpdir})
+    try:
+        formats = _make_formats(workbook)
+
+        summary_ws = workbook.add_worksheet('종합분석')
+        total_excluded_df = pd.concat(total_excl_df_list, ignore_index=True)
+        current_row = write_custom_ahp_table(workbook, summary_ws, final_df, "1) 전체_종합결과", 1, formats, excluded_df=total_excluded_df)
+        for grp in unique_groups:
+            if grp in group_full_dfs:
+                current_row = write_custom_ahp_table(workbook, summary_ws, group_full_dfs[grp], f"▶ [그룹: {grp}] 분석 결과", current_row, formats)
+        step()
+
+        if len(unique_groups) >= 1:
+            write_group_comparison(workbook, result['comparison_df'], result['anova_df'], formats)
+        step()
+
+        # 그룹별 집계 행렬은 분석 단계(summarize_groups)에서 계산된 값을 그대로 사용
+        main_group_mats = {grp: main_groups[grp]['matrix'] for grp in unique_groups if grp in main_groups}
+        out_main = main_results.iter_frames()
+        write_detailed_sheet(workbook, 'Result_Main', result['main_group_matrix'], out_main, "[1] 전체 종합 행렬", result['main_factors'], formats,
+                             group_matrices=main_group_mats, sheet_excl_count=result['main_excluded'])
+        step()
+        for mf, info in sub_results_storage.items():
+            safe_name = f"Result_{mf}"[:31]
+            sub_grp_mats = {grp: info['groups'][grp]['matrix'] for grp in unique_groups if grp in info['groups']}
+            out_sub = info['results'].iter_frames()
+
+            sub_excl_val = 0
+            for df_ex in total_excl_df_list:
+                if 'Sheet' in df_ex.columns and not df_ex.empty:
+                     if df_ex['Sheet'].iloc[0] == mf or (mf in df_ex['Sheet'].unique()):
+                          sub_excl_val = len(df_ex[df_ex['Sheet'] == mf])
+
+            write_detailed_sheet(workbook, safe_name, info['group_matrix'], out_sub, "[1] 전체 종합 행렬", info['factors'], formats,
+                                 group_matrices=sub_grp_mats, sheet_excl_count=sub_excl_val)
+            step()
+
+        write_theory_sheet(workbook)
+    finally:
+        workbook.close()
+    step()
+    return path
+
+def build_result_workbook(result, progress=None):
+    """결과 엑셀을 임시 파일에 스트리밍으로 만든 뒤 bytes 로 반환합니다 (다운로드/DB 저장용)."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        export_result_workbook(result, path, progress=progress)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+# [최적화 추가] 결과 엑셀은 분석 직후가 아니라 필요할 때(다운로드 요청, 정식 사용자 결과 보관)만 백그라운드에서 생성
+# - entry: 분석 결과 캐시 항목(dict). 생성 작업(Future)과 진행률을 항목에 보관하여 재실행/다른 세션과 공유
+_export_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ahp-export")
+_export_lock = threading.Lock()
+
+def ensure_result_export(entry):
+    """결과 엑셀 생성 작업이 없거나 실패했다면 새로 시작하고, 진행 중/완료된 Future 를 반환합니다."""
+    with _export_lock:
+        future = entry.get('export_future')
+        if future is None or (future.done() and future.exception() is not None):
+            progress_state = {'done': 0, 'total': 1}
+            entry['export_progress'] = progress_state
+            future = _export_executor.submit(build_result_workbook, entry['result'],
+                                             lambda done, total: progress_state.update(done=done, total=total))
+            entry['export_future'] = future
+        return future
+
+def export_progress(entry):
+    state = entry.get('export_progress') or {'done': 0, 'total': 1}
+    return min(1.0, state['done'] / max(state['total'], 1))
@@ -0,0 +1,209 @@
+# =============================================================================
+# 오프라인 테스트용 구글 시트 가짜 클라이언트 (gspread 의 사용 부분만 메모리로 흉내)
+# - outbox 워커/동기화 로직을 네트워크와 서비스 계정 없이 확인할 때 사용
+#   예) client = FakeSheetsClient(); worker = SheetsOutboxWorker(lambda: client.open_by_key("test"))
+# - fail_next(n) 으로 다음 n 번의 API 호출을 실패시켜 재시도/백오프 동작을 확인할 수 있음
+# - 읽기 결과는 gspread 와 같이 문자열로 반환
+# =============================================================================
+import threading
+
+class WorksheetNotFound(Exception):
+    pass
+
+class APIError(Exception):
+    pass
+
+class FakeCell:
+    def __init__(self, row, col, value):
+        self.row = row
+        self.col = col
+        self.value = value
+
+def _parse_a1(a1):
+    letters = "".join(ch for ch in a1 if ch.isalpha())
+    col = 0
+    for ch in letters.upper():
+        col = col * 26 + (ord(ch) - 64)
+    return int(a1[len(letters):]), col
+
+def _as_text(value):
+    return "" if value is None else str(value)
+
+class FakeWorksheet:
+    def __init__(self, client, title, rows=None):
+        self._client = client
+        self.title = title
+        self.rows = [list(r) for r in (rows or [])]
+
+    def _cell(self, row, col):
+        if row <= len(self.rows) and col <= len(self.rows[row - 1]):
+            return self.rows[row - 1][col - 1]
+        return None
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        line = self.rows[row - 1]
+        while len(line) < col:
+            line.append(None)
+        line[col - 1] = value
+
+    # --- 읽기 ---
+    def get_all_values(self):
+        self._client._hit("get_all_values")
+        width = max((len(r) for r in self.rows), default=0)
+        return [[_as_text(v) for v in r] + [""] * (width - len(r)) for r in self.rows]
+
+    def get_all_records(self):
+        values = self.get_all_values()
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, r)) for r in values[1:]]
+
+    @property
+    def row_count(self):
+        return max(1000, len(self.rows))
+
+    def get(self, range_name):
+        self._client._hit("get")
+        start, _, end = range_name.partition(":")
+        row, col = _parse_a1(start)
+        end_col = _parse_a1(end + "1")[1] if end else col
+        values = []
+        for line in self.rows[row - 1:]:
+            cells = [_as_text(v) for v in line[col - 1:end_col]]
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def batch_get(self, ranges):
+        self._client._hit("batch_get")
+        result = []
+        for a1 in ranges:
+            row, col = _parse_a1(a1.split(":")[0])
+            value = _as_text(self._cell(row, col))
+            result.append([[value]] if value != "" else [])
+        return result
+
+    def row_values(self, row):
+        self._client._hit("row_values")
+        values = [_as_text(v) for v in (self.rows[row - 1] if row <= len(self.rows) else [])]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def col_values(self, col):
+        self._client._hit("col_values")
+        values = [_as_text(r[col - 1]) if col <= len(r) else "" for r in self.rows]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def cell(self, row, col):
+        self._client._hit("cell")
+        return FakeCell(row, col, _as_text(self._cell(row, col)))
+
+    def find(self, query):
+        self._client._hit("find")
+        for r, line in enumerate(self.rows, start=1):
+            for c, value in enumerate(line, start=1):
+                if _as_text(value) == str(query):
+                    return FakeCell(r, c, _as_text(value))
+        return None
+
+    # --- 쓰기 ---
+    def append_row(self, values, **kwargs):
+        self._client._hit("append_row")
+        self.rows.append(list(values))
+
+    def append_rows(self, values, **kwargs):
+        self._client._hit("append_rows")
+        start = len(self.rows) + 1
+        self.rows.extend(list(v) for v in values)
+        # gspread 와 같이 추가된 범위를 담은 응답을 반환
+        return {"updates": {"updatedRange": f"{self.title}!A{start}:A{len(self.rows)}", "updatedRows": len(values)}}
+
+    def update_cell(self, row, col, value):
+        self._client._hit("update_cell")
+        self._set(row, col, value)
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self._client._hit("update")
+        start = range_name.split(":")[0]
+        row, col = _parse_a1(start)
+        for r_off, line in enumerate(values):
+            for c_off, value in enumerate(line):
+                self._set(row + r_off, col + c_off, value)
+
+    def batch_update(self, data, **kwargs):
+        self._client._hit("batch_update")
+        for item in data:
+            row, col = _parse_a1(item["range"].split(":")[0])
+            for r_off, line in enumerate(item["values"]):
+                for c_off, value in enumerate(line):
+                    self._set(row + r_off, col + c_off, value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._client._hit("delete_rows")
+        end_index = end_index or start_index
+        del self.rows[start_index - 1:end_index]
+
+class FakeSpreadsheet:
+    def __init__(self, client, key):
+        self._client = client
+        self.id = key
+        self._sheets = [FakeWorksheet(client, "Sheet1")]
+
+    @property
+    def sheet1(self):
+        return self._sheets[0]
+
+    def worksheets(self):
+        return list(self._sheets)
+
+    def worksheet(self, title):
+        self._client._hit("worksheet")
+        for ws in self._sheets:
+            if ws.title == title:
+                return ws
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=None, cols=None):
+        self._client._hit("add_worksheet")
+        ws = FakeWorksheet(self._client, title)
+        self._sheets.append(ws)
+        return ws
+
+class FakeSheetsClient:
+    """gspread.Client 대용. open_by_key 로 같은 키에 대해 항상 같은 가짜 스프레드시트를 반환합니다."""
+
+    def __init__(self):
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._failure_exc = APIError
+        self.calls = []
+
+    def open_by_key(self, key):
+        self._hit("open_by_key")
+        with self._lock:
+            if key not in self._spreadsheets:
+                self._spreadsheets[key] = FakeSpreadsheet(self, key)
+            return self._spreadsheets[key]
+
+    def fail_next(self, n=1, exc=APIError):
+        """다음 n 번의 API 호출이 exc 예외로 실패하도록 설정합니다."""
+        with self._lock:
+            self._failures = n
+            self._failure_exc = exc
+
+    def _hit(self, name):
+        with self._lock:
+            self.calls.append(name)
+            if self._failures > 0:
+                self._failures -= 1
+                raise self._failure_exc(f"injected failure: {name}")
@@ -0,0 +1,327 @@
+# =============================================================================
+# 구글 시트 미러링용 write-behind outbox (Streamlit 비의존 모듈)
+# [최적화 추가] 변경 작업마다 인증 → 스프레드시트 열기 → 새 스레드로 API 호출하던 방식을 대체
+# - 변경 내용은 users.db 의 sheets_outbox 테이블에 먼저 기록 (DB 변경과 같은 트랜잭션에 넣을 수 있음)
+#   → 앱이 재시작되어도 전송되지 않은 변경은 남아 있다가 다시 전송됨
+# - 백그라운드 워커 1개가 오래된 순서대로 읽어, 같은 시트의 연속된 추가는 append_rows 한 번,
+#   연속된 셀 갱신은 batch_update 한 번으로 묶어 전송
+# - API 호출은 토큰 버킷으로 분당 호출 수를 제한하고, 실패 시 지수 백오프로 재시도
+#   (순서 보장을 위해 가장 오래된 작업이 재시도 대기 중이면 뒤의 작업도 함께 기다림)
+# - 대기 건수(queue depth)와 가장 오래된 미전송 작업의 지연(lag)을 outbox_stats() 로 제공
+# =============================================================================
+import json
+import random
+import threading
+import time
+
+from ahp_db import execute_write, fetch_all, fetch_one, write
+from ahp_sheets import ROW_INDEX_CHECK_INTERVAL, SheetRowIndex, is_worksheet_not_found
+
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BASE_DELAY = 2.0
+OUTBOX_MAX_DELAY = 300.0
+OUTBOX_POLL_INTERVAL = 5.0
+# 구글 시트 API 쓰기 한도(사용자당 분당 60회)보다 약간 낮게 유지
+SHEETS_CALLS_PER_MINUTE = 50
+SHEETS_BURST = 10
+
+OUTBOX_SCHEMA = '''CREATE TABLE IF NOT EXISTS sheets_outbox
+                   (id INTEGER PRIMARY KEY AUTOINCREMENT, sheet TEXT, op TEXT, payload TEXT, created_at REAL,
+                    attempts INTEGER DEFAULT 0, next_attempt_at REAL DEFAULT 0, last_error TEXT, dead INTEGER DEFAULT 0)'''
+
+def create_outbox_schema(conn):
+    conn.execute(OUTBOX_SCHEMA)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON sheets_outbox(dead, id)")
+
+def enqueue(sheet, op, payload, conn=None):
+    """시트 변경 작업을 outbox 에 기록합니다. sheet=None 은 첫 번째 시트(sheet1)를 뜻합니다.
+    op: 'append' {row, header} / 'update' {key, cells: {열 번호: 값}, header} / 'delete' {key}
+    conn 이 주어지면 (ahp_db.write 작업 안에서) 호출 측 트랜잭션에 함께 기록합니다."""
+    params = (sheet, op, json.dumps(payload, ensure_ascii=False), time.time())
+    sql = "INSERT INTO sheets_outbox (sheet, op, payload, created_at) VALUES (?, ?, ?, ?)"
+    if conn is not None:
+        conn.execute(sql, params)
+    else:
+        execute_write(sql, params)
+        wake_outbox_worker()
+
+def enqueue_append(sheet, row, header=None, conn=None):
+    enqueue(sheet, "append", {"row": row, "header": header}, conn=conn)
+
+def enqueue_update(sheet, key, cells, header=None, conn=None):
+    enqueue(sheet, "update", {"key": str(key), "cells": {str(c): v for c, v in cells.items()}, "header": header}, conn=conn)
+
+def enqueue_delete(sheet, key, conn=None):
+    enqueue(sheet, "delete", {"key": str(key)}, conn=conn)
+
+class TokenBucket:
+    """초당 rate 개씩 채워지고 최대 capacity 개까지 쌓이는 토큰 버킷 (API 호출 한도 조절용)."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """토큰을 얻을 때까지 기다리고, 기다린 시간(초)을 반환합니다."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+def _a1(row, col):
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f"{letters}{row}"
+
+class SheetsOutboxWorker:
+    """outbox 를 순서대로 읽어 구글 시트에 반영하는 백그라운드 워커.
+    spreadsheet_factory() 는 gspread Spreadsheet (또는 같은 인터페이스의 가짜 객체)를 반환해야 합니다.
+    on_error(exc) 가 주어지면 전송 실패 시 호출합니다 (공유 핸들 캐시 무효화 등)."""
+
+    def __init__(self, spreadsheet_factory, bucket=None, batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 base_delay=OUTBOX_BASE_DELAY, max_delay=OUTBOX_MAX_DELAY, poll_interval=OUTBOX_POLL_INTERVAL, on_error=None,
+                 row_check_interval=ROW_INDEX_CHECK_INTERVAL):
+        self.spreadsheet_factory = spreadsheet_factory
+        self.on_error = on_error
+        self.bucket = bucket or TokenBucket(SHEETS_CALLS_PER_MINUTE / 60.0, SHEETS_BURST)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.row_check_interval = row_check_interval
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._row_index = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"sent": 0, "api_calls": 0, "throttle_wait": 0.0, "failures": 0, "dead": 0,
+                      "last_error": None, "last_success_at": None}
+
+    # --- 스레드 제어 ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ahp-sheets-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                wait = self.poll_interval
+            if wait is None:
+                wait = self.poll_interval
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+
+    # --- 처리 ---
+    def run_once(self):
+        """대기 중인 작업을 한 묶음 처리합니다. 다음 처리까지 기다릴 시간(초)을 반환합니다 (0 이면 곧바로 다시 처리)."""
+        rows = fetch_all("SELECT id, sheet, op, payload, attempts, next_attempt_at FROM sheets_outbox "
+                         "WHERE dead=0 ORDER BY id LIMIT ?", (self.batch_size,))
+        if not rows:
+            return None
+        now = time.time()
+        due = []
+        for row in rows:
+            if row[5] > now:
+                break
+            due.append(row)
+        if not due:
+            return min(rows[0][5] - now, self.poll_interval)
+
+        done_ids = []
+        for run in self._runs(due):
+            try:
+                self._apply(run)
+            except Exception as e:
+                self._record_failure(run, e)
+                break
+            done_ids.extend(r[0] for r in run)
+        if done_ids:
+            execute_write(f"DELETE FROM sheets_outbox WHERE id IN ({','.join('?' * len(done_ids))})", done_ids)
+            self.stats["sent"] += len(done_ids)
+            self.stats["last_success_at"] = time.time()
+        # 모두 처리했고 더 남은 작업이 없으면 새 작업(wake) 또는 폴링 주기까지 대기, 그 외에는 곧바로 다음 처리
+        return None if len(done_ids) == len(due) == len(rows) < self.batch_size else 0
+
+    @staticmethod
+    def _runs(rows):
+        # 같은 시트의 연속된 append / update 는 한 번의 API 호출로 묶음 (delete 는 행 번호가 바뀌므로 하나씩)
+        run = []
+        for row in rows:
+            if run and (row[1] != run[-1][1] or row[2] != run[-1][2] or row[2] == "delete"):
+                yield run
+                run = []
+            run.append(row)
+        if run:
+            yield run
+
+    def _record_failure(self, run, exc):
+        self.stats["failures"] += 1
+        self.stats["last_error"] = f"{type(exc).__name__}: {exc}"
+        # 인증/연결 문제일 수 있으므로 다음 시도에서 스프레드시트/시트 핸들을 다시 얻음
+        if self.on_error is not None:
+            self.on_error(exc)
+        self._spreadsheet = None
+        self._worksheets.clear()
+        self._row_index.clear()
+        attempts = run[0][4] + 1
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1))) * random.uniform(0.8, 1.2)
+        ids = [r[0] for r in run]
+        dead = 1 if attempts >= self.max_attempts else 0
+        if dead:
+            self.stats["dead"] += len(ids)
+        def _mark(conn):
+            conn.executemany("UPDATE sheets_outbox SET attempts=?, next_attempt_at=?, last_error=?, dead=? WHERE id=?",
+                             [(attempts, time.time() + delay, self.stats["last_error"], dead, i) for i in ids])
+        write(_mark)
+
+    def _call(self, fn, *args, **kwargs):
+        self.stats["throttle_wait"] += self.bucket.acquire()
+        self.stats["api_calls"] += 1
+        return fn(*args, **kwargs)
+
+    def _get_spreadsheet(self):
+        if self._spreadsheet is None:
+            self._spreadsheet = self.spreadsheet_factory()
+            if self._spreadsheet is None:
+                raise RuntimeError("구글 시트에 연결할 수 없습니다.")
+        return self._spreadsheet
+
+    def _worksheet(self, sheet, header=None, create=True):
+        ws = self._worksheets.get(sheet)
+        if ws is not None:
+            return ws
+        spreadsheet = self._get_spreadsheet()
+        if sheet is None:
+            ws = spreadsheet.sheet1
+        else:
+            try:
+                ws = self._call(spreadsheet.worksheet, sheet)
+            except Exception as e:
+                if not is_worksheet_not_found(e):
+                    raise
+                if not create:
+                    return None
+                ws = self._call(spreadsheet.add_worksheet, title=sheet, rows="1000", cols="10")
+        if header:
+            self._ensure_header(ws, header)
+        self._worksheets[sheet] = ws
+        return ws
+
+    def _ensure_header(self, ws, header):
+        # 헤더 행이 비어 있으면 전체 헤더를 기록하고, 일부 열 이름만 없으면 해당 열에만 기록 (None 항목은 확인하지 않음)
+        existing = self._call(ws.row_values, 1)
+        if not existing and all(h is not None for h in header):
+            self._call(ws.append_row, header)
+            return
+        missing = [{"range": _a1(1, i + 1), "values": [[h]]} for i, h in enumerate(header) if h is not None and h not in existing]
+        if missing:
+            self._call(ws.batch_update, missing)
+
+    def _index(self, sheet):
+        # A열(키) 값 → 행 번호 (시트별로 유지하며 추가/삭제 시 직접 갱신)
+        index = self._row_index.get(sheet)
+        if index is None:
+            index = self._row_index[sheet] = SheetRowIndex(check_interval=self.row_check_interval)
+        return index
+
+
+    def _apply(self, run):
+        sheet, op = run[0][1], run[0][2]
+        payloads = [json.loads(r[3]) for r in run]
+        # 갱신/삭제할 행이 있을 수 없는 시트는 새로 만들지 않음
+        ws = self._worksheet(sheet, payloads[0].get("header"), create=op == "append")
+        if ws is None:
+            return
+        if op == "append":
+            response = self._call(ws.append_rows, [p["row"] for p in payloads])
+            self._index(sheet).appended([p["row"][0] if p["row"] else "" for p in payloads], response)
+        elif op == "update":
+            data = []
+            rows = self._index(sheet).locate_many(ws, [p["key"] for p in payloads], call=self._call)
+            for p in payloads:
+                row_num = rows[p["key"]]
+                if row_num is None:
+                    continue  # 시트에 없는 행은 기존과 같이 건너뜀
+                data.extend({"range": _a1(row_num, int(col)), "values": [[value]]} for col, value in p["cells"].items())
+            if data:
+                self._call(ws.batch_update, data)
+        elif op == "delete":
+            key = payloads[0]["key"]
+            index = self._index(sheet)
+            # 행 삭제는 되돌릴 수 없으므로 대상 행의 A열을 항상 확인
+            row_num = index.locate_many(ws, [key], call=self._call, verify=True)[key]
+            if row_num is not None:
+                self._call(ws.delete_rows, row_num)
+                index.deleted(row_num)
+        else:
+            raise ValueError(f"알 수 없는 outbox 작업: {op}")
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_outbox_worker(spreadsheet_factory, **kwargs):
+    """프로세스당 하나의 outbox 워커를 시작합니다 (이미 실행 중이면 그대로 반환)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            write(create_outbox_schema)
+            _worker = SheetsOutboxWorker(spreadsheet_factory, **kwargs)
+        return _worker.start()
+
+def wake_outbox_worker():
+    if _worker is not None:
+        _worker.wake()
+
+def pending_delete_keys(sheet):
+    """아직 시트에 반영되지 않은 삭제 작업의 키 집합 (시트 → DB 동기화가 삭제된 행을 되살리지 않도록 사용)."""
+    rows = fetch_all("SELECT payload FROM sheets_outbox WHERE op='delete' AND dead=0 AND sheet IS ?", (sheet,))
+    return {json.loads(payload)["key"] for (payload,) in rows}
+
+def outbox_stats():
+    pending, oldest = fetch_one("SELECT COUNT(*), MIN(created_at) FROM sheets_outbox WHERE dead=0")
+    dead = fetch_one("SELECT COUNT(*) FROM sheets_outbox WHERE dead=1")[0]
+    stats = {"queue_depth": pending, "lag_seconds": (time.time() - oldest) if oldest else 0.0, "dead_letters": dead}
+    if _worker is not None:
+        stats.update({k: v for k, v in _worker.stats.items() if k != "dead"})
+    return stats
+
+def format_outbox_stats():
+    s = outbox_stats()
+    text = f"queue={s['queue_depth']} lag={s['lag_seconds']:.0f}s dead={s['dead_letters']}"
+    if "sent" in s:
+        text += f" sent={s['sent']} api_calls={s['api_calls']} throttled={s['throttle_wait']:.1f}s failures={s['failures']}"
+        if s["last_error"]:
+            text += f" last_error={s['last_error']}"
+    return text
@@ -0,0 +1,235 @@
+# =============================================================================
+# 구글 시트 연결 핸들 캐시 (Streamlit 비의존 모듈)
+# [최적화 추가] 시트 작업마다 서비스 계정 키 파싱 → Credentials 생성 → authorize → open_by_key 를 반복하던 방식을 대체
+# - 인증된 클라이언트(액세스 토큰 포함)와 스프레드시트/워크시트 핸들을 프로세스 전체에서 재사용
+#   (gspread 클라이언트는 토큰이 만료되면 스스로 갱신하므로 재인증이 필요 없음)
+# - 인증 오류(401/403, 토큰 갱신 실패)가 보고되면 모든 핸들을 버리고 다음 호출에서 다시 인증
+# - 시트를 찾지 못하는 오류(400/404)는 워크시트 핸들만 버림 (시트 삭제/이름 변경 대응)
+# - SheetRowIndex: 행마다 find() 로 시트 전체를 검색하던 방식 대신 A열 키 → 행 번호 색인을 유지
+# =============================================================================
+import threading
+import time
+
+AUTH_ERROR_STATUS = (401, 403)
+STALE_HANDLE_STATUS = (400, 404)
+AUTH_ERROR_NAMES = ("RefreshError", "TransportError", "DefaultCredentialsError")
+
+def _status_code(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) or getattr(exc, "code", None)
+
+def is_auth_error(exc):
+    return type(exc).__name__ in AUTH_ERROR_NAMES or _status_code(exc) in AUTH_ERROR_STATUS
+
+def is_worksheet_not_found(exc):
+    # gspread 를 import 하지 않고도 판별 (가짜 클라이언트도 같은 이름의 예외를 사용)
+    return type(exc).__name__ == "WorksheetNotFound"
+
+class SheetsHandleCache:
+    """client_factory() 로 만든 인증 클라이언트와 spreadsheet_id 의 스프레드시트/워크시트 핸들을 캐시합니다.
+    client_factory 가 None 을 반환하면 (설정 누락 등) 캐시하지 않고 다음 호출에서 다시 시도합니다."""
+
+    def __init__(self, client_factory, spreadsheet_id):
+        self.client_factory = client_factory
+        self.spreadsheet_id = spreadsheet_id
+        self._lock = threading.RLock()
+        self._client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self.stats = {"authorizations": 0, "opens": 0, "worksheet_lookups": 0, "hits": 0, "invalidations": 0}
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+                if self._client is not None:
+                    self.stats["authorizations"] += 1
+            return self._client
+
+    def spreadsheet(self):
+        with self._lock:
+            if self._spreadsheet is not None:
+                self.stats["hits"] += 1
+                return self._spreadsheet
+            client = self.client()
+            if client is None:
+                raise RuntimeError("구글 시트 클라이언트를 만들 수 없습니다.")
+            spreadsheet_id = self.spreadsheet_id() if callable(self.spreadsheet_id) else self.spreadsheet_id
+            try:
+                self._spreadsheet = client.open_by_key(spreadsheet_id)
+            except Exception as e:
+                self.report_error(e)
+                raise
+            self.stats["opens"] += 1
+            return self._spreadsheet
+
+    def worksheet(self, title, create_header=None):
+        """이름으로 워크시트 핸들을 반환합니다. create_header 가 주어지면 시트가 없을 때 만들고 헤더를 기록합니다."""
+        with self._lock:
+            ws = self._worksheets.get(title)
+            if ws is not None:
+                self.stats["hits"] += 1
+                return ws
+            spreadsheet = self.spreadsheet()
+            self.stats["worksheet_lookups"] += 1
+            try:
+                ws = spreadsheet.worksheet(title)
+            except Exception as e:
+                if create_header is None or not is_worksheet_not_found(e):
+                    self.report_error(e)
+                    raise
+                ws = spreadsheet.add_worksheet(title=title, rows="1000", cols="10")
+                ws.append_row(create_header)
+            self._worksheets[title] = ws
+            return ws
+
+    def sheet1(self):
+        return self.spreadsheet().sheet1
+
+    def invalidate(self, worksheets_only=False):
+        with self._lock:
+            self._worksheets.clear()
+            if not worksheets_only:
+                self._client = None
+                self._spreadsheet = None
+            self.stats["invalidations"] += 1
+
+    def report_error(self, exc):
+        """시트 호출에서 발생한 예외를 알려 주면, 인증/핸들 문제인 경우 캐시를 무효화합니다."""
+        if is_auth_error(exc):
+            self.invalidate()
+        elif _status_code(exc) in STALE_HANDLE_STATUS:
+            self.invalidate(worksheets_only=True)
+
+ROW_INDEX_TTL = 600.0
+# 색인의 행 번호를 시트의 A열과 대조하는 주기 (이 사이의 갱신은 색인의 행에 바로 기록)
+ROW_INDEX_CHECK_INTERVAL = 60.0
+
+def _updated_start_row(response):
+    # append_rows 응답의 updates.updatedRange (예: "Community_Posts!A12:J13") 에서 시작 행 번호를 얻음
+    try:
+        updated = response["updates"]["updatedRange"].split("!")[-1].split(":")[0]
+        return int("".join(ch for ch in updated if ch.isdigit()))
+    except (TypeError, KeyError, ValueError, AttributeError):
+        return None
+
+class SheetRowIndex:
+    """A열 키 → 시트 행 번호 색인. 열 1개를 한 번 읽어 만들고, 추가/삭제 시 직접 갱신합니다.
+    ttl 초가 지나거나 찾는 키가 없으면 다음 조회 때 다시 읽어 검증합니다 (다른 곳에서 시트를 편집한 경우 대응).
+    check_interval 초마다 쓰기 대상 행의 A열을 대조하여 어긋난 색인을 찾아냅니다 (locate_many 참고)."""
+
+    def __init__(self, ttl=ROW_INDEX_TTL, check_interval=ROW_INDEX_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._rows = None
+        self._size = 0
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._verified_miss = set()
+        self.stats = {"builds": 0, "hits": 0, "misses": 0, "checks": 0, "stale": 0}
+
+    def invalidate(self):
+        self._rows = None
+
+    def _build(self, ws, call, keep_misses=False):
+        rows = {}
+        values = call(ws.col_values, 1)
+        for r, value in enumerate(values, start=1):
+            rows.setdefault(str(value), r)
+        self._rows = rows
+        self._size = len(values)
+        self._checked_at = time.monotonic()
+        if not keep_misses:
+            self._built_at = time.monotonic()
+            self._verified_miss = set()
+        self.stats["builds"] += 1
+
+    def lookup(self, ws, key, call=lambda fn, *a: fn(*a)):
+        """key 의 행 번호를 반환합니다 (없으면 None). call 로 API 호출을 감쌀 수 있습니다 (호출 한도 조절 등)."""
+        key = str(key)
+        if self._rows is None or time.monotonic() - self._built_at > self.ttl:
+            self._build(ws, call)
+        row = self._rows.get(key)
+        if row is None and key not in self._verified_miss:
+            # 색인 이후 다른 곳에서 추가된 행일 수 있으므로 한 번 다시 읽어 확인
+            self._build(ws, call, keep_misses=True)
+            row = self._rows.get(key)
+            if row is None:
+                self._verified_miss.add(key)
+        self.stats["hits" if row is not None else "misses"] += 1
+        return row
+
+    def locate_many(self, ws, keys, call=lambda fn, *a: fn(*a), verify=False):
+        """여러 키의 행 번호를 {키: 행 번호 또는 None} 으로 반환합니다.
+        색인은 자신의 추가/삭제로 직접 갱신되므로 평소에는 그대로 사용하고 (쓰기마다 A열을 읽지 않음),
+        check_interval 초가 지났거나 verify=True 이면 (행 삭제처럼 되돌릴 수 없는 쓰기) 대상 행들의 A열을 한 번에 읽어 대조하여
+        하나라도 다르면 (다른 곳에서 행 삭제/정렬 등) 색인을 다시 만들어 찾습니다."""
+        builds = self.stats["builds"]
+        rows = {key: self.lookup(ws, key, call) for key in dict.fromkeys(str(k) for k in keys)}
+        if self.stats["builds"] != builds:
+            # 이번 조회 중에 색인을 새로 읽었으면 그 결과로 확정 (추가 확인 불필요)
+            return {key: self._rows.get(key) for key in rows}
+        targets = [(key, row) for key, row in rows.items() if row is not None]
+        if not targets or not (verify or time.monotonic() - self._checked_at >= self.check_interval):
+            return rows
+        self.stats["checks"] += 1
+        self._checked_at = time.monotonic()
+        values = call(ws.batch_get, [f"A{row}" for _, row in targets])
+        for (key, _), value in zip(targets, values):
+            if str(value[0][0] if value and value[0] else "") != key:
+                self.stats["stale"] += 1
+                self._build(ws, call)
+                return {key: self._rows.get(key) for key in rows}
+        return rows
+
+    def appended(self, keys, response=None):
+        """append_rows 로 추가된 행의 키를 반영합니다 (응답에서 시작 행을 알 수 없으면 색인을 버림)."""
+        if self._rows is None:
+            return
+        start = _updated_start_row(response)
+        if start is None:
+            self.invalidate()
+            return
+        for offset, key in enumerate(keys):
+            key = str(key)
+            self._rows.setdefault(key, start + offset)
+            self._verified_miss.discard(key)
+        self._size = max(self._size, start + len(keys) - 1)
+
+    def deleted(self, row):
+        """row 행이 삭제되었음을 반영합니다 (아래 행 번호를 하나씩 당김)."""
+        if self._rows is None:
+            return
+        self._rows = {k: (r - 1 if r > row else r) for k, r in self._rows.items() if r != row}
+        self._size = max(0, self._size - 1)
+
+def _column_letter(col):
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def fetch_rows_after(ws, width, last_row=None, last_key=None, header_rows=1):
+    """워터마크 이후에 추가된 행만 읽습니다 (rows, start_row) — rows 는 width 열로 맞춘 문자열 목록.
+    워터마크는 마지막으로 읽은 행 번호(last_row)와 그 행의 A열 값(last_key)입니다.
+    - 해당 행의 A열이 그대로면 바로 다음 행부터 읽음 (셀 1개 확인)
+    - 중간 행 삭제 등으로 어긋났으면 A열에서 last_key 를 찾아 그 다음 행부터 읽음
+    - last_key 가 없어졌거나 워터마크가 없으면 처음부터 읽음"""
+    start = header_rows + 1
+    if last_row and last_key is not None:
+        if last_row <= getattr(ws, "row_count", last_row) and str(ws.cell(last_row, 1).value) == last_key:
+            start = last_row + 1
+        else:
+            keys = ws.col_values(1)
+            if last_key in keys[header_rows:]:
+                start = keys.index(last_key, header_rows) + 2
+    row_count = getattr(ws, "row_count", None)
+    if row_count is not None and start > row_count:
+        return [], start
+    values = ws.get(f"A{start}:{_column_letter(width)}") or []
+    rows = [[str(v) for v in row] + [""] * (width - len(row)) for row in values]
+    # 뒤쪽의 빈 행은 아직 데이터가 아니므로 워터마크에 포함하지 않음
+    while rows and not any(rows[-1]):
+        rows.pop()
+    return rows, start
@@ -0,0 +1,357 @@
+# =============================================================================
+# 대용량 응답 파일용 청크 단위 스트리밍 분석 (Streamlit 비의존 모듈)
+# - 엑셀을 openpyxl 읽기 전용 모드로 chunk_rows 행씩 읽어 청크마다 가중치/보정을 계산하고
+#   그룹별 로그 합(AIJ 판단행렬 / AIP 가중치), 개수, CR 합계 등 누적값에만 더함
+# - 시트마다 2번 읽음: 1차 스캔으로 보정 범위(척도 최솟값/최댓값, 짝수 척도)와 열 dtype 을 구하고,
+#   2차에서 같은 범위로 청크를 분석 → 메모리 전체 분석(analyze_hierarchy)과 같은 결과
+# - 응답자별 상세 결과는 청크마다 임시 파일로 내려 두었다가 엑셀 상세 시트를 쓸 때 다시 읽음
+# - 메모리에 남는 것은 청크 1개 + 누적값 + 대분류 응답자별 가중치(ID 조인용) + CR 분포 표본뿐
+# =============================================================================
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from ahp_core import (
+    SheetResult, infer_factors_from_columns, process_single_sheet_batched, sheet_scale_bounds,
+    accumulate_group_judgments, finalize_group_judgments, paired_difference_moments, merge_moments,
+    pairwise_ttest_from_moments, anova_from_cell_moments, collect_hierarchy_sheets, assemble_hierarchy_result,
+)
+
+STREAM_CHUNK_ROWS = 20_000
+# 시트당 데이터 행이 이 값을 넘는 업로드 파일은 스트리밍 분석 사용
+STREAM_ROW_THRESHOLD = 50_000
+CR_SAMPLE_SIZE = 5_000
+
+def open_workbook_stream(source):
+    from openpyxl import load_workbook
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return load_workbook(source, read_only=True, data_only=True)
+
+def iter_sheet_chunks(ws, chunk_rows=STREAM_CHUNK_ROWS, dtypes=None):
+    """시트를 첫 행을 헤더로 하는 DataFrame 조각으로 나누어 읽습니다 (빈 행은 건너뜀)."""
+    ws.reset_dimensions()
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    header = list(header)
+    while header and header[-1] is None:
+        header.pop()
+    columns = [h if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+    width = len(columns)
+
+    def make_frame(buf):
+        chunk = pd.DataFrame(buf, columns=columns)
+        return chunk.astype(dtypes) if dtypes else chunk
+
+    buf = []
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if all(v is None for v in row):
+            continue
+        buf.append(row)
+        if len(buf) >= chunk_rows:
+            yield make_frame(buf)
+            buf = []
+    if buf:
+        yield make_frame(buf)
+
+def scan_sheet(ws, chunk_rows=STREAM_CHUNK_ROWS):
+    """1차 스캔: 행 수, 보정 범위(최솟값, 최댓값, 짝수 척도 여부), 비교 열의 시트 전체 dtype 을 구합니다."""
+    n_rows, bounds, dtypes, columns = 0, None, {}, None
+    for chunk in iter_sheet_chunks(ws, chunk_rows):
+        columns = list(chunk.columns)
+        comp_cols = columns[2:]
+        n_rows += len(chunk)
+        c_min, c_max, c_even = sheet_scale_bounds(chunk[comp_cols].values)
+        bounds = (c_min, c_max, c_even) if bounds is None else (min(bounds[0], c_min), max(bounds[1], c_max), bounds[2] or c_even)
+        for col in comp_cols:
+            dtypes[col] = chunk[col].dtype if col not in dtypes else np.result_type(dtypes[col], chunk[col].dtype)
+    return {'columns': columns, 'rows': n_rows, 'scale': bounds, 'dtypes': dtypes}
+
+class SpooledSheetResult:
+    """청크별 SheetResult 를 임시 파일에 보관하는 결과 컨테이너 (SheetResult 와 같은 조회 인터페이스)."""
+
+    def __init__(self, comp_cols, factors, float32=False, spool_dir=None, sample_size=CR_SAMPLE_SIZE, seed=0):
+        self.comp_cols = list(comp_cols)
+        self.factors = list(factors)
+        self.float32 = float32
+        self._dir = tempfile.mkdtemp(prefix="ahp_stream_", dir=spool_dir)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+        self._paths = []
+        self._spool_bytes = 0
+        self._len = 0
+        # CR 분포도용 균등 표본: 행마다 난수 키를 붙이고 키가 가장 작은 sample_size 개만 유지
+        self._rng = np.random.default_rng(seed)
+        self._sample_size = sample_size
+        self._sample = pd.DataFrame({"ID": [], "Type": [], "Final_CR": [], "_key": [], "_row": []})
+
+    def append(self, chunk):
+        path = os.path.join(self._dir, f"chunk_{len(self._paths):05d}.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._paths.append(path)
+        self._spool_bytes += os.path.getsize(path)
+        cr = chunk.cr_frame()
+        cr["_key"] = self._rng.random(len(cr))
+        cr["_row"] = np.arange(self._len, self._len + len(cr))
+        self._sample = pd.concat([self._sample, cr], ignore_index=True).nsmallest(self._sample_size, "_key")
+        self._len += len(chunk)
+
+    def iter_chunks(self):
+        for path in self._paths:
+            with open(path, "rb") as f:
+                yield pickle.load(f)
+
+    def iter_frames(self):
+        if not self._paths:
+            yield SheetResult.empty_result(self.comp_cols, self.factors, float32=self.float32).frame()
+        for chunk in self.iter_chunks():
+            yield chunk.frame()
+
+    def cr_frame(self):
+        return self._sample.sort_values("_row").drop(columns=["_key", "_row"]).reset_index(drop=True)
+
+    def close(self):
+        self._finalizer()
+
+    def release(self):
+        """분석 결과 캐시에서 제거될 때 호출됩니다 (임시 파일을 GC 를 기다리지 않고 바로 삭제)."""
+        self.close()
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def empty(self):
+        return self._len == 0
+
+    @property
+    def spool_nbytes(self):
+        return self._spool_bytes
+
+    @property
+    def nbytes(self):
+        # 캐시 예산 계산에는 메모리의 CR 표본과 함께 디스크에 보관 중인 청크 파일 크기도 포함
+        return int(self._sample.memory_usage(index=True, deep=True).sum()) + self._spool_bytes
+
+class SheetAccumulator:
+    """시트 1개의 청크 결과를 누적하여 analyze_sheet 와 같은 형태의 결과를 만듭니다."""
+
+    def __init__(self, factors, method='geometric'):
+        n = len(factors)
+        n_pairs = n * (n - 1) // 2
+        self.factors = list(factors)
+        self.method = method
+        self.group_names = []
+        self._group_index = {}
+        self.w_sum = np.zeros((0, n))
+        self.m_sum = np.zeros((0, n, n))
+        self.counts = np.zeros(0)
+        self.pair_moments = (np.zeros(n_pairs), np.full(n_pairs, np.nan), np.zeros(n_pairs))
+        self.cr_sum = 0.0
+        self.cr_count = 0
+        self.excluded_count = 0
+        self.excluded_frames = []
+
+    def _group_codes(self, types):
+        names = pd.Series(types).astype(str).values
+        for name in pd.unique(names):
+            if name not in self._group_index:
+                self._group_index[name] = len(self.group_names)
+                self.group_names.append(name)
+        return pd.Index(self.group_names).get_indexer(names).astype(np.intp)
+
+    def add(self, chunk, excluded_count, excluded_df):
+        self.excluded_count += excluded_count
+        if not excluded_df.empty:
+            self.excluded_frames.append(excluded_df)
+        if chunk.empty:
+            return
+        codes = self._group_codes(chunk.types)
+        n_groups = len(self.group_names)
+        weights = chunk.weights.astype(np.float64)
+        w_sum, m_sum, counts = accumulate_group_judgments(weights, chunk.matrices(), codes, n_groups, self.method)
+        grow = n_groups - len(self.counts)
+        if grow:
+            n = len(self.factors)
+            self.w_sum = np.concatenate([self.w_sum, np.zeros((grow, n))])
+            self.m_sum = np.concatenate([self.m_sum, np.zeros((grow, n, n))])
+            self.counts = np.concatenate([self.counts, np.zeros(grow)])
+        self.w_sum += w_sum
+        self.m_sum += m_sum
+        self.counts += counts
+        if len(self.factors) > 1:
+            self.pair_moments = merge_moments(*self.pair_moments, *paired_difference_moments(weights))
+        self.cr_sum += float(np.sum(chunk.final_cr, dtype=np.float64))
+        self.cr_count += len(chunk)
+
+    def info(self, results):
+        order = np.argsort(np.asarray(self.group_names, dtype=object)) if self.group_names else np.zeros(0, dtype=np.intp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            all_w, all_m, all_cr, all_ci, _ = finalize_group_judgments(
+                self.w_sum.sum(axis=0)[None], self.m_sum.sum(axis=0)[None], np.array([self.counts.sum()]), self.method)
+            groups = {}
+            if len(order):
+                group_w, group_m, group_cr, group_ci, counts = finalize_group_judgments(
+                    self.w_sum[order], self.m_sum[order], self.counts[order], self.method)
+                for g, idx in enumerate(order):
+                    groups[self.group_names[idx]] = {'weights': group_w[g], 'matrix': group_m[g], 'cr': float(group_cr[g]),
+                                                     'ci': float(group_ci[g]), 'count': int(counts[g])}
+        count, mean, m2 = self.pair_moments
+        excluded_df = pd.concat(self.excluded_frames, ignore_index=True) if self.excluded_frames else pd.DataFrame()
+        return {
+            'weights': all_w[0], 'factors': self.factors, 'cr': self.cr_sum / self.cr_count if self.cr_count else np.nan,
+            'results': results, 'group_matrix': all_m[0], 'group_cr': float(all_cr[0]), 'group_ci': float(all_ci[0]),
+            'sig_df': pairwise_ttest_from_moments(self.factors, count, mean, m2),
+            'groups': groups, 'excluded_count': self.excluded_count, 'excluded_df': excluded_df,
+        }
+
+class IndividualWeightStats:
+    """응답자별 전역 가중치(대분류 × 세부항목)의 요인×그룹별 (개수, 평균, 편차제곱합)을 누적합니다.
+    응답자별 long format 테이블(indiv_df)을 만들지 않고 ANOVA/Tukey 와 시각화 요약에 필요한 값만 유지합니다."""
+
+    def __init__(self, main_results, main_factors, unique_groups):
+        ids, types, weights = [], [], []
+        for chunk in main_results.iter_chunks():
+            ids.append(chunk.ids)
+            types.append(pd.Series(chunk.types).astype(str).values)
+            weights.append(chunk.weights.astype(np.float64))
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=object)
+        # 동일 ID가 여러 번 응답한 경우 메모리 분석과 동일하게 첫 행만 사용
+        first = ~pd.Index(ids).duplicated(keep='first')
+        self.main_index = pd.Index(ids[first])
+        self.main_weights = np.concatenate(weights)[first] if weights else np.empty((0, len(main_factors)))
+        group_lookup = {g: i for i, g in enumerate(unique_groups)}
+        self.main_codes = np.array([group_lookup[t] for t in np.concatenate(types)[first]], dtype=np.intp) if types else np.empty(0, dtype=np.intp)
+        self.main_factors = list(main_factors)
+        self.group_names = list(unique_groups)
+        self.factor_names = []
+        self._factor_index = {}
+        self.moments = None
+
+    def add_sub_sheet(self, parent_factor, sub_factors, sub_results):
+        f_idx = self.main_factors.index(parent_factor)
+        codes = []
+        for sf in sub_factors:
+            if sf not in self._factor_index:
+                self._factor_index[sf] = len(self.factor_names)
+                self.factor_names.append(sf)
+            codes.append(self._factor_index[sf])
+        codes = np.asarray(codes, dtype=np.intp)
+        n_f, n_g = len(self.factor_names), len(self.group_names)
+        self._grow(n_f, n_g)
+        seen = np.zeros(len(self.main_index), dtype=bool)
+        for chunk in sub_results.iter_chunks():
+            pos = self.main_index.get_indexer(chunk.ids)
+            take = (pos >= 0) & ~pd.Index(chunk.ids).duplicated(keep='first')
+            take[take] = ~seen[pos[take]]
+            pos = pos[take]
+            if not len(pos):
+                continue
+            seen[pos] = True
+            values = self.main_weights[pos, f_idx][:, None] * chunk.weights[take].astype(np.float64)
+            cell = (codes[None, :] * n_g + self.main_codes[pos][:, None]).ravel()
+            values = values.ravel()
+            counts = np.bincount(cell, minlength=n_f * n_g).reshape(n_f, n_g).astype(float)
+            sums = np.bincount(cell, weights=values, minlength=n_f * n_g).reshape(n_f, n_g)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                means = sums / counts
+                m2 = np.bincount(cell, weights=(values - means.ravel()[cell]) ** 2, minlength=n_f * n_g).reshape(n_f, n_g)
+            self.moments = merge_moments(*self.moments, counts, means, m2)
+
+    def _grow(self, n_f, n_g):
+        if self.moments is None:
+            self.moments = (np.zeros((0, n_g)), np.zeros((0, n_g)), np.zeros((0, n_g)))
+        grow = n_f - self.moments[0].shape[0]
+        if grow:
+            self.moments = tuple(np.concatenate([m, np.zeros((grow, n_g))]) for m in self.moments)
+
+    def anova(self, alpha=0.05):
+        if self.moments is None or len(self.group_names) < 2:
+            return pd.DataFrame()
+        counts, means, m2 = self.moments
+        present_groups = (counts.sum(axis=0) > 0).sum()
+        if counts.sum() == 0 or present_groups < 2:
+            return pd.DataFrame()
+        sums = np.where(counts > 0, counts * np.nan_to_num(means), 0.0)
+        return anova_from_cell_moments(pd.Index(self.factor_names), pd.Index(self.group_names), counts, sums, m2, alpha)
+
+    def cell_frame(self):
+        """요인×그룹별 전역 가중치 요약 (Type, Factor, Count, Global_Weight(평균), SD)."""
+        rows = []
+        if self.moments is not None:
+            counts, means, m2 = self.moments
+            for fi, factor in enumerate(self.factor_names):
+                for gi, grp in enumerate(self.group_names):
+                    if counts[fi, gi] > 0:
+                        sd = np.sqrt(m2[fi, gi] / (counts[fi, gi] - 1)) if counts[fi, gi] > 1 else np.nan
+                        rows.append({"Type": grp, "Factor": factor, "Count": int(counts[fi, gi]), "Global_Weight": means[fi, gi], "SD": sd})
+        frame = pd.DataFrame(rows, columns=["Type", "Factor", "Count", "Global_Weight", "SD"])
+        return frame.sort_values(["Type", "Factor"]).reset_index(drop=True)
+
+    def factor_frame(self):
+        """요인별 전체 응답자 전역 가중치의 평균/표준편차 (Factor, Weight_Mean, Weight_SD)."""
+        rows = []
+        if self.moments is not None:
+            counts, means, m2 = self.moments
+            for fi, factor in enumerate(self.factor_names):
+                total = (np.zeros(1), np.full(1, np.nan), np.zeros(1))
+                for gi in range(len(self.group_names)):
+                    if counts[fi, gi] > 0:
+                        total = merge_moments(*total, counts[fi, gi:gi + 1], means[fi, gi:gi + 1], m2[fi, gi:gi + 1])
+                n = total[0][0]
+                if n > 0:
+                    rows.append({"Factor": factor, "Weight_Mean": total[1][0], "Weight_SD": np.sqrt(total[2][0] / (n - 1)) if n > 1 else np.nan})
+        return pd.DataFrame(rows, columns=["Factor", "Weight_Mean", "Weight_SD"]).sort_values("Factor").reset_index(drop=True)
+
+def analyze_sheet_streaming(ws, cr_threshold, max_iter, method='geometric', chunk_rows=STREAM_CHUNK_ROWS, float32=False, spool_dir=None):
+    scan = scan_sheet(ws, chunk_rows)
+    if scan['columns'] is None:
+        raise ValueError(f"'{ws.title}' 시트에 데이터가 없습니다.")
+    comp_cols = scan['columns'][2:]
+    factors, _ = infer_factors_from_columns(comp_cols)
+    results = SpooledSheetResult(comp_cols, factors, float32=float32, spool_dir=spool_dir)
+    acc = SheetAccumulator(factors, method)
+    for chunk_df in iter_sheet_chunks(ws, chunk_rows, dtypes=scan['dtypes']):
+        chunk, _, excl_count, excl_df = process_single_sheet_batched(
+            chunk_df, cr_threshold, max_iter, method, float32=float32, scale=scan['scale'])
+        results.append(chunk)
+        acc.add(chunk, excl_count, excl_df)
+    return acc.info(results)
+
+def analyze_workbook_streaming(source, cr_threshold, max_iter, method='geometric', chunk_rows=STREAM_CHUNK_ROWS,
+                               float32=False, spool_dir=None, progress=None):
+    """엑셀 파일(경로/파일 객체/bytes)을 청크 단위로 분석하여 analyze_hierarchy 와 같은 형태의 결과를 반환합니다.
+    응답자별 long format 테이블 대신 'indiv_stats_df'(요인×그룹 요약), 'factor_stats_df'(요인별 요약)를 제공하며
+    'indiv_df' 는 None 입니다. progress(완료 시트 수, 전체 시트 수) 콜백은 시트를 하나 마칠 때마다 호출됩니다."""
+    wb = open_workbook_stream(source)
+    try:
+        sheet_names = wb.sheetnames
+        sheet_infos = []
+        for i, sn in enumerate(sheet_names):
+            sheet_infos.append(analyze_sheet_streaming(wb[sn], cr_threshold, max_iter, method, chunk_rows, float32, spool_dir))
+            if progress is not None:
+                progress(i + 1, len(sheet_names))
+    finally:
+        wb.close()
+
+    main_info, sub_results_storage, total_excl_df_list = collect_hierarchy_sheets(sheet_names, sheet_infos)
+    unique_groups = sorted(main_info['groups'].keys())
+    stats = IndividualWeightStats(main_info['results'], main_info['factors'], unique_groups)
+    for mf, info in sub_results_storage.items():
+        stats.add_sub_sheet(mf, info['factors'], info['results'])
+
+    result = assemble_hierarchy_result(method, main_info, sub_results_storage, unique_groups)
+    result.update({
+        'total_excl_df_list': total_excl_df_list, 'indiv_df': None, 'anova_df': stats.anova(),
+        'indiv_stats_df': stats.cell_frame(), 'factor_stats_df': stats.factor_frame(), 'streamed': True,
+    })
+    return result
@@ -1,10 +1,10 @@
+import time
+_APP_IMPORT_STARTED = time.perf_counter()
 import streamlit as st
 # Force rebuild 2026-01-29 v5 (Sync & UI Polish)
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
+import hashlib
 import sqlite3
 import datetime
 import re
@@ -12,39 +12,49 @@ import smtplib
 import json
 import platform
 import os
-import matplotlib.font_manager as fm
-from matplotlib import rc
+import logging
 from email.mime.text import MIMEText
-from scipy.stats import gmean, ttest_rel, f_oneway
-from PIL import Image
 import itertools
-from math import pi
 from dateutil.relativedelta import relativedelta
 
+# [최적화 추가] 콜드 스타트 단축: 무거운 라이브러리(plotly, gspread, matplotlib, google-auth, requests 등)는
+# 실제로 사용하는 코드 경로에서만 import 하고, import/부팅 소요 시간은 프로세스 단위로 기록
+from ahp_boot import LazyModule, record_timing, format_boot_report, log_boot_report
+# [최적화 추가] users.db 접근은 연결 풀 + WAL + 단일 writer 큐를 사용하는 데이터 접근 계층을 통해 수행
+from ahp_db import fetch_one, fetch_all, read_frame, write, execute_write, executemany_write, format_db_stats
+from ahp_sheets import SheetsHandleCache, fetch_rows_after
+from ahp_outbox import (
+    create_outbox_schema, enqueue_append, enqueue_update, enqueue_delete, pending_delete_keys,
+    start_outbox_worker, wake_outbox_worker, format_outbox_stats,
+)
+
 # [필수] plotly 라이브러리 (requirements.txt에 plotly 추가 필요)
-import plotly.express as px
-import plotly.graph_objects as go
-from scipy import stats
-import gspread
-from google.oauth2.service_account import Credentials
+px = LazyModule("plotly.express")
+go = LazyModule("plotly.graph_objects")
+gspread = LazyModule("gspread")
+# IP 위치 추적 및 공인 IP 추출을 위한 라이브러리
+requests = LazyModule("requests")
 from signup_agreement import show_agreement_ui, save_agreement_to_sheets, validate_all_agreements
 
-# 1. 추가해야 할 라이브러리 (기존 Credentials 바로 아래 추가)
+# 1. 추가해야 할 라이브러리
 from streamlit_javascript import st_javascript
 import base64
 
-# IP 위치 추적 및 공인 IP 추출을 위한 라이브러리 추가
-import requests
-
 # [최적화 추가] 비동기 처리를 위한 스레딩 라이브러리
 import threading
 
-# ANOVA 및 사후검정을 위한 라이브러리 (없을 경우 예외처리)
-try:
-    from statsmodels.stats.multicomp import pairwise_tukeyhsd
-    STATSMODELS_AVAILABLE = True
-except ImportError:
-    STATSMODELS_AVAILABLE = False
+
+# [구조 개선] AHP 분석 엔진 및 결과 엑셀 생성은 UI 부수효과가 없는 별도 모듈로 분리 (배치 CLI: ahp_batch.py)
+from ahp_core import (
+    create_sample_excel, analyze_hierarchy, load_workbook_frames,
+    workbook_within_row_limit, workbook_needs_streaming, analysis_cache_key, analysis_cache_get, analysis_cache_put
+)
+from ahp_export import ensure_result_export, export_progress
+from ahp_stream import analyze_workbook_streaming, STREAM_ROW_THRESHOLD
+
+record_timing("import app modules", time.perf_counter() - _APP_IMPORT_STARTED)
+
+logger = logging.getLogger("ahp_master")
 
 # =============================================================================
 # 0. 시스템 설정 및 유틸리티
@@ -69,6 +79,7 @@ def fix_base64_padding(data):
 try:
     logo_path = "ahp_master_logo.png"
     if os.path.exists(logo_path):
+        from PIL import Image
         logo_img = Image.open(logo_path)
     else:
         logo_img = "📊"
@@ -101,7 +112,12 @@ seo_tags = """
 st.markdown(seo_tags, unsafe_allow_html=True)
 
 # [폰트 설정]
+# [최적화 추가] matplotlib 은 폰트 설정 시점에만 import 하며, 폰트 탐색/다운로드는 프로세스당 1회만 수행 (boot_once 의 백그라운드 작업)
 def set_font_config():
+    started = time.perf_counter()
+    import matplotlib.pyplot as plt
+    import matplotlib.font_manager as fm
+    from matplotlib import rc
     system_name = platform.system()
     try:
         if system_name == 'Windows':
@@ -123,14 +139,15 @@ def set_font_config():
     except Exception:
         pass
     plt.rcParams['axes.unicode_minus'] = False 
-
-set_font_config()
+    record_timing("font config", time.perf_counter() - started)
 
 # [중요 수정] 구글 시트 연결 헬퍼 함수 - 인증 정보 로드 로직 전면 재검토 및 수정
 # TOML(Dict), JSON String, Base64 Encoded String 등 다양한 포맷에 대응하도록 강화
-def get_gspread_client():
-    scope = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-    
+# [최적화 추가] st.secrets 읽기/오류 표시는 스크립트 스레드에서만 수행하고,
+# 인증(클라이언트 생성)은 읽어 둔 값만 사용하여 백그라운드 스레드에서도 다시 할 수 있도록 분리
+GSPREAD_SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+
+def _load_service_account_info():
     # st.secrets에서 값 가져오기 (없을 경우 에러 처리)
     if "gcp_service_account" not in st.secrets:
         st.error("Secrets에 'gcp_service_account' 설정이 없습니다.")
@@ -189,13 +206,39 @@ def get_gspread_client():
     if missing:
         st.error(f"서비스 계정 정보에 필수 필드가 누락되었습니다: {', '.join(missing)}")
         return None
+    return auth_info
 
-    creds = Credentials.from_service_account_info(auth_info, scopes=scope)
+def _authorize_gspread_client(auth_info):
+    if not auth_info:
+        return None
+    from google.oauth2.service_account import Credentials
+    creds = Credentials.from_service_account_info(auth_info, scopes=GSPREAD_SCOPES)
     return gspread.authorize(creds)
 
+# [최적화 추가] 인증 클라이언트와 스프레드시트/워크시트 핸들을 프로세스 전체에서 재사용 (인증 오류 시 무효화 후 재인증)
+@st.cache_resource(show_spinner=False)
+def get_sheets_cache():
+    auth_info = _load_service_account_info()
+    return SheetsHandleCache(lambda: _authorize_gspread_client(auth_info), st.secrets.get("SPREADSHEET_ID"))
+
+def get_gspread_client():
+    return get_sheets_cache().client()
+
+def open_spreadsheet():
+    return get_sheets_cache().spreadsheet()
+
+def get_worksheet(title, create_header=None):
+    return get_sheets_cache().worksheet(title, create_header)
+
+def report_sheets_error(exc):
+    get_sheets_cache().report_error(exc)
+
 # DB 초기화 및 구글 시트로부터 데이터(회원+방문로그) 복구 로직
 def init_db():
-    conn = sqlite3.connect('users.db')
+    # 스키마 생성/마이그레이션과 관리자 계정 생성을 writer 큐의 한 작업(트랜잭션)으로 처리
+    write(_create_schema)
+
+def _create_schema(conn):
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS users
                   (id TEXT PRIMARY KEY, pw TEXT, role TEXT, signup_date TEXT, expiry_date TEXT)''')
@@ -228,6 +271,13 @@ def init_db():
     
     # [최적화 추가] DB 검색 성능 향상을 위한 인덱스 생성
     c.execute("CREATE INDEX IF NOT EXISTS idx_post_id ON community_comments(post_id)")
+
+    # [최적화 추가] 구글 시트 미러링 outbox 테이블
+    create_outbox_schema(conn)
+
+    # [최적화 추가] 시트 → DB 증분 동기화 워터마크 (시트별 마지막으로 읽은 행 번호와 그 행의 A열 값)
+    c.execute('''CREATE TABLE IF NOT EXISTS sheet_sync_state
+                  (sheet TEXT PRIMARY KEY, last_row INTEGER, last_key TEXT, synced_at TEXT)''')
     
     # 관리자 계정 생성
     try:
@@ -235,130 +285,150 @@ def init_db():
         signup_date_str = kst_now.strftime("%Y-%m-%d")
         c.execute("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", 
                   ('shjeon', '@jsh2143033', 'admin', signup_date_str, '9999-12-31'))
-        conn.commit()
     except sqlite3.IntegrityError:
         pass 
 
-    # [복구 로직 1] 회원 정보 복구
-    c.execute("SELECT COUNT(*) FROM users")
-    if c.fetchone()[0] <= 1:
-        try:
-            client = get_gspread_client()
-            if client:
-                spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-                sheet = spreadsheet.sheet1 
-                all_values = sheet.get_all_values()
-                if len(all_values) > 1:
-                    for row in all_values[1:]:
-                        if row[0] == 'shjeon': continue
-                        c.execute("INSERT OR IGNORE INTO users (id, role, signup_date, pw, expiry_date) VALUES (?, ?, ?, ?, ?)", 
-                                  (row[0], row[1], row[2], row[3], '9999-12-31'))
-                    conn.commit()
-        except Exception:
-            pass
+# [최적화 추가] 구글 시트 기반 복구는 첫 화면 렌더링을 막지 않도록 init_db 에서 분리하여 백그라운드에서 실행
+# (백그라운드 스레드에는 ScriptRunContext 가 없으므로 Streamlit 호출 없이 전달받은 핸들 캐시만 사용)
+def restore_db_from_sheets(sheets):
+    # [복구 로직 1] 회원 정보 복구는 아래 sync_sheets_into_db 가 함께 처리
+    # (DB 가 비어 있으면 워터마크도 없으므로 회원 시트 전체를 한 번 읽음)
 
     # [복구 로직 2] 방문 로그 복구
-    c.execute("SELECT COUNT(*) FROM visit_logs")
-    if c.fetchone()[0] == 0:
+    if fetch_one("SELECT COUNT(*) FROM visit_logs")[0] == 0:
         try:
-            client = get_gspread_client()
-            if client:
-                spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-                try:
-                    visit_sheet = spreadsheet.worksheet("Visit_Logs")
-                    records = visit_sheet.get_all_records()
-                    for row in records:
-                        c.execute("INSERT OR IGNORE INTO visit_logs (ip_address, visit_date) VALUES (?, ?)", 
-                                  (row['IP'], row['Date']))
-                    conn.commit()
-                except gspread.exceptions.WorksheetNotFound:
-                    pass
-        except Exception:
-            pass
+            try:
+                visit_sheet = sheets.worksheet("Visit_Logs")
+                records = visit_sheet.get_all_records()
+                executemany_write("INSERT OR IGNORE INTO visit_logs (ip_address, visit_date) VALUES (?, ?)",
+                                  [(row['IP'], row['Date']) for row in records])
+            except gspread.exceptions.WorksheetNotFound:
+                pass
+        except Exception as e:
+            sheets.report_error(e)
 
-    conn.close()
-    
     # [요청사항 4] 어플 재부팅 시 구글 시트 내용(회원, 게시글, 댓글) 불러오기
-    sync_db_from_sheets()
+    return sync_sheets_into_db(sheets)
+
+# [최적화 추가] 프로세스(컨테이너) 당 1회만 실행되는 부팅 작업
+# - 스키마/관리자 계정 생성만 동기로 처리하고, 폰트 설정과 구글 시트 복구/동기화는 데몬 스레드로 넘겨 첫 화면을 바로 그립니다.
+@st.cache_resource(show_spinner=False)
+def boot_once():
+    started = time.perf_counter()
+    init_db()
+    record_timing("init_db (schema)", time.perf_counter() - started)
+
+    # 백그라운드 스레드에서도 같은 핸들 캐시를 쓰도록 스크립트 스레드에서 미리 만들어 전달
+    # (st.secrets 읽기와 설정 오류 표시는 여기서 끝남)
+    sheets = get_sheets_cache()
+    # 백그라운드 동기화가 끝나면 다음 재실행 때 스크립트 스레드에서 게시판 캐시를 한 번 비움
+    state = {"synced": threading.Event(), "cache_cleared": False}
+
+    def _deferred_boot():
+        set_font_config()
+        # [최적화 추가] 구글 시트 변경 사항은 outbox 워커 1개가 묶어서 전송 (재시작 전 미전송분도 이어서 전송)
+        try:
+            start_outbox_worker(sheets.spreadsheet, on_error=sheets.report_error)
+        except Exception:
+            logger.exception("구글 시트 outbox 워커 시작 실패")
+        sync_started = time.perf_counter()
+        try:
+            if restore_db_from_sheets(sheets) < 0:
+                logger.warning("구글 시트 동기화 실패 (다음 동기화 때 다시 시도)")
+        except Exception:
+            logger.exception("구글 시트 복구 실패")
+        state["synced"].set()
+        record_timing("sheets restore/sync (background)", time.perf_counter() - sync_started)
+        log_boot_report("boot (background done)")
+
+    threading.Thread(target=_deferred_boot, daemon=True).start()
+    record_timing("boot critical path", time.perf_counter() - _APP_IMPORT_STARTED)
+    log_boot_report()
+    return state
 
 # [신규 기능 1 & 요청사항 4] 구글 시트의 내용을 강제로 DB에 동기화하는 함수
-def sync_db_from_sheets():
-    """구글 시트의 데이터를 읽어와 DB에 없는 데이터를 강제로 추가합니다. (회원, 게시글, 댓글)"""
+# [최적화 추가] 매번 시트 전체를 내려받던 방식 대신, 시트별 워터마크 이후에 추가된 행만 읽어 반영 (증분 동기화)
+def _filled_width(row):
+    # 시트 API 는 행 끝의 빈 셀을 돌려주지 않으므로, 마지막으로 값이 있는 열까지를 행의 길이로 봄
+    width = len(row)
+    while width and row[width - 1] == "":
+        width -= 1
+    return width
+
+def _parse_user_row(row):
+    user_id, role, signup_date, pw = row[0], row[1], row[2], row[3]
+    return (user_id, pw, role, signup_date, '9999-12-31')
+
+def _parse_post_row(row):
+    # Header: ID, UserID, Title, Content, RegDate, IsSecret, IsNotice, Likes, NonUserPW, Views
+    sec = int(row[5]) if row[5] else 0
+    notc = int(row[6]) if row[6] else 0
+    lks = int(row[7]) if row[7] else 0
+    npw = row[8] or None
+    vws = int(row[9]) if row[9] else 0
+    return (row[0], row[1], row[2], row[3], row[4], sec, notc, lks, npw, vws)
+
+def _parse_comment_row(row):
+    # Header: ID, PostID, UserID, Content, RegDate, IsSecret
+    sec = int(row[5]) if row[5] else 0
+    return (row[0], row[1], row[2], row[3], row[4], sec)
+
+# (워터마크 이름, 워크시트 이름(None 은 회원 시트), 읽을 열 수, 최소 필드 수, 행 변환 함수, INSERT 문)
+SHEET_SYNC_TARGETS = [
+    ("users", None, 4, 4, _parse_user_row,
+     "INSERT OR IGNORE INTO users (id, pw, role, signup_date, expiry_date) VALUES (?, ?, ?, ?, ?)"),
+    ("Community_Posts", "Community_Posts", 10, 8, _parse_post_row,
+     "INSERT OR IGNORE INTO community_posts (id, user_id, title, content, reg_date, is_secret, is_notice, likes, non_user_pw, views) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"),
+    ("Community_Comments", "Community_Comments", 6, 6, _parse_comment_row,
+     "INSERT OR IGNORE INTO community_comments (id, post_id, user_id, content, reg_date, is_secret) VALUES (?, ?, ?, ?, ?, ?)"),
+]
+
+def sync_sheets_into_db(sheets, full=False):
+    """구글 시트의 데이터를 읽어와 DB에 없는 데이터를 강제로 추가합니다. (회원, 게시글, 댓글)
+    full=True 이면 워터마크를 무시하고 시트 전체를 다시 읽습니다. Streamlit 을 호출하지 않으므로 백그라운드 스레드에서도 사용 가능합니다."""
     try:
-        client = get_gspread_client()
-        if not client: return -1
-        
-        spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        
-        # 1. 회원 정보 동기화
-        try:
-            sheet = spreadsheet.sheet1
-            all_values = sheet.get_all_values()
-            if len(all_values) > 1:
-                for row in all_values[1:]:
-                    if len(row) >= 4:
-                        user_id = row[0]
-                        role = row[1]
-                        signup_date = row[2]
-                        pw = row[3]
-                        expiry_date = '9999-12-31' 
-                        c.execute("INSERT OR IGNORE INTO users (id, pw, role, signup_date, expiry_date) VALUES (?, ?, ?, ?, ?)", 
-                                  (user_id, pw, role, signup_date, expiry_date))
-        except: pass
-
-        # 2. 게시글 동기화 (Community_Posts)
-        try:
-            post_sheet = spreadsheet.worksheet("Community_Posts")
-            posts = post_sheet.get_all_values()
-            # Header: ID, UserID, Title, Content, RegDate, IsSecret, IsNotice, Likes, NonUserPW, Views
-            if len(posts) > 1:
-                for row in posts[1:]:
-                    if len(row) >= 8: # 최소 필드 확보
-                        p_id = row[0]
-                        u_id = row[1]
-                        ttl = row[2]
-                        cnt = row[3]
-                        reg = row[4]
-                        sec = int(row[5]) if row[5] else 0
-                        notc = int(row[6]) if row[6] else 0
-                        lks = int(row[7]) if row[7] else 0
-                        npw = row[8] if len(row) > 8 else None
-                        vws = int(row[9]) if len(row) > 9 and row[9] else 0
-                        
-                        c.execute("INSERT OR IGNORE INTO community_posts (id, user_id, title, content, reg_date, is_secret, is_notice, likes, non_user_pw, views) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                  (p_id, u_id, ttl, cnt, reg, sec, notc, lks, npw, vws))
-        except gspread.exceptions.WorksheetNotFound:
-            pass
-            
-        # 3. 댓글 동기화 (Community_Comments)
-        try:
-            com_sheet = spreadsheet.worksheet("Community_Comments")
-            comments = com_sheet.get_all_values()
-            # Header: ID, PostID, UserID, Content, RegDate, IsSecret
-            if len(comments) > 1:
-                for row in comments[1:]:
-                    if len(row) >= 6:
-                        c_id = row[0]
-                        p_id = row[1]
-                        u_id = row[2]
-                        cnt = row[3]
-                        reg = row[4]
-                        sec = int(row[5]) if row[5] else 0
-                        c.execute("INSERT OR IGNORE INTO community_comments (id, post_id, user_id, content, reg_date, is_secret) VALUES (?, ?, ?, ?, ?, ?)",
-                                  (c_id, p_id, u_id, cnt, reg, sec))
-        except gspread.exceptions.WorksheetNotFound:
-            pass
-
-        conn.commit()
-        conn.close()
-        # [최적화 추가] 게시판 데이터 변경 시 캐시 초기화
-        st.cache_data.clear()
+        spreadsheet = sheets.spreadsheet()
+        watermarks = {name: (last_row, last_key) for name, last_row, last_key in
+                      fetch_all("SELECT sheet, last_row, last_key FROM sheet_sync_state")}
+        # 시트에서 읽은 새 행과 갱신할 워터마크를 모아 두었다가 writer 큐의 한 트랜잭션으로 일괄 반영
+        inserts, new_watermarks = [], []
+        now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
+
+        for name, title, width, min_width, parse_row, insert_sql in SHEET_SYNC_TARGETS:
+            try:
+                ws = spreadsheet.sheet1 if title is None else sheets.worksheet(title)
+            except gspread.exceptions.WorksheetNotFound:
+                continue
+            last_row, last_key = (None, None) if full else watermarks.get(name, (None, None))
+            rows, start_row = fetch_rows_after(ws, width, last_row, last_key)
+            # 기존과 같이 최소 필드가 채워진 행만 반영하고, 워터마크도 마지막 유효 행까지만 전진
+            # (작성 중이던 행 등 뒤쪽의 불완전한 행은 다음 동기화 때 다시 읽음)
+            valid = [(i, row) for i, row in enumerate(rows) if row[0] and _filled_width(row) >= min_width]
+            if not valid:
+                continue
+            # outbox 에서 아직 삭제가 전송되지 않은 행은 되살리지 않음
+            deleting = pending_delete_keys(title)
+            inserts.append((insert_sql, [parse_row(row) for _, row in valid if row[0] not in deleting]))
+            last_index, last_valid = valid[-1]
+            new_watermarks.append((name, start_row + last_index, last_valid[0], now))
+
+        def _apply_sync(conn):
+            for insert_sql, params in inserts:
+                conn.executemany(insert_sql, params)
+            conn.executemany("INSERT OR REPLACE INTO sheet_sync_state (sheet, last_row, last_key, synced_at) VALUES (?, ?, ?, ?)", new_watermarks)
+        if inserts:
+            write(_apply_sync)
         return 1
-    except Exception:
+    except Exception as e:
+        sheets.report_error(e)
         return -1
 
+def sync_db_from_sheets(full=False):
+    result = sync_sheets_into_db(get_sheets_cache(), full)
+    # [최적화 추가] 게시판 데이터 변경 시 캐시 초기화
+    st.cache_data.clear()
+    return result
+
 # 방문자 추적 및 구글 시트 실시간 저장
 def track_visitor():
     js_ip_script = 'await fetch("https://api.ipify.org?format=json").then(r => r.json()).then(d => d.ip)'
@@ -389,31 +459,14 @@ def track_visitor():
             except:
                 pass
 
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute("INSERT OR IGNORE INTO visit_logs (ip_address, visit_date) VALUES (?, ?)", (ip, now_ts))
-        conn.commit()
-        conn.close()
-
-        try:
-            client = get_gspread_client()
-            if client:
-                spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-                try:
-                    visit_sheet = spreadsheet.worksheet("Visit_Logs")
-                except gspread.exceptions.WorksheetNotFound:
-                    visit_sheet = spreadsheet.add_worksheet(title="Visit_Logs", rows="1000", cols="10")
-                    visit_sheet.append_row(["IP", "Date", "Country", "Region", "City", "Latitude", "Longitude"])
-                
-                existing_logs = visit_sheet.get_all_values()
-                if [ip, now_ts] not in [row[:2] for row in existing_logs]:
-                    # [최적화 추가] 방문 로그는 스레드 처리하여 응답성 향상
-                    threading.Thread(target=visit_sheet.append_row, args=([ip, now_ts, country, region, city, lat, lon],)).start()
-                
-                st.session_state.visited = True
-            
-        except Exception:
-            pass
+        # 방문 로그는 결과를 기다릴 필요가 없으므로 writer 큐에 넣기만 함
+        # [최적화 추가] 시트 전체를 읽어 중복을 확인하던 방식 대신, DB 에 새로 기록된 경우에만 같은 트랜잭션에서 outbox 에 추가
+        def _log_visit(conn):
+            cur = conn.execute("INSERT OR IGNORE INTO visit_logs (ip_address, visit_date) VALUES (?, ?)", (ip, now_ts))
+            if cur.rowcount == 1:
+                enqueue_append("Visit_Logs", [ip, now_ts, country, region, city, lat, lon], header=VISIT_LOGS_HEADER, conn=conn)
+        write(_log_visit, wait=False).add_done_callback(lambda _: wake_outbox_worker())
+        st.session_state.visited = True
     except Exception:
         pass
 
@@ -509,628 +562,171 @@ PW: {user_pw}
 
 # --- DB CRUD ---
 
+# [최적화 추가] 구글 시트 반영은 outbox(users.db)에 기록만 하고, 실제 전송은 백그라운드 워커가 묶어서 처리
+# 헤더의 None 항목은 확인하지 않는 열 (회원 시트는 5, 6열 이름만 확인)
+USERS_SHEET_HEADER = [None, None, None, None, "agree_info", "expiry_date"]
+POSTS_SHEET_HEADER = ["ID", "UserID", "Title", "Content", "RegDate", "IsSecret", "IsNotice", "Likes", "NonUserPW", "Views"]
+COMMENTS_SHEET_HEADER = ["ID", "PostID", "UserID", "Content", "RegDate", "IsSecret"]
+VISIT_LOGS_HEADER = ["IP", "Date", "Country", "Region", "City", "Latitude", "Longitude"]
+
 def log_to_sheets(user_id, role, signup_date, pw, agree_info="미동의"):
     try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.sheet1
-            
-            headers = sheet.row_values(1)
-            if "agree_info" not in headers:
-                sheet.update_cell(1, 5, "agree_info")
-            if "expiry_date" not in headers:
-                sheet.update_cell(1, 6, "expiry_date")
-
-            sheet.append_row([user_id, role, str(signup_date), pw, agree_info, "9999-12-31"])
+        enqueue_append(None, [user_id, role, str(signup_date), pw, agree_info, "9999-12-31"], header=USERS_SHEET_HEADER)
     except Exception as e:
         st.error(f"Google Sheets 로깅 오류: {e}")
 
 def add_user(user_id, pw, role, agree_info="미동의"):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     signup_date = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d")
     expiry_date = "9999-12-31"
     try:
-        c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)", 
-                  (user_id, pw, role, signup_date, expiry_date))
-        conn.commit()
-        log_to_sheets(user_id, role, signup_date, pw, agree_info)
-        success = True
+        execute_write("INSERT INTO users VALUES (?, ?, ?, ?, ?)", 
+                      (user_id, pw, role, signup_date, expiry_date))
     except sqlite3.IntegrityError:
-        success = False
-    finally:
-        conn.close()
-    return success
+        return False
+    log_to_sheets(user_id, role, signup_date, pw, agree_info)
+    return True
 
 def check_login(user_id, pw):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT role, expiry_date FROM users WHERE id=? AND pw=?", (user_id, pw))
-    result = c.fetchone()
-    conn.close()
-    return result
+    return fetch_one("SELECT role, expiry_date FROM users WHERE id=? AND pw=?", (user_id, pw))
 
 def get_user_password(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT pw FROM users WHERE id=?", (user_id,))
-    result = c.fetchone()
-    conn.close()
+    result = fetch_one("SELECT pw FROM users WHERE id=?", (user_id,))
     return result[0] if result else None
 
 def change_user_password(user_id, new_pw):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("UPDATE users SET pw=? WHERE id=?", (new_pw, user_id))
-    conn.commit()
-    conn.close()
-
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.sheet1
-            cell = sheet.find(user_id)
-            if cell:
-                sheet.update_cell(cell.row, 4, new_pw)
-    except Exception:
-        pass
+    def _change(conn):
+        conn.execute("UPDATE users SET pw=? WHERE id=?", (new_pw, user_id))
+        enqueue_update(None, user_id, {4: new_pw}, conn=conn)
+    write(_change)
+    wake_outbox_worker()
     return True
 
 def get_all_users():
-    conn = sqlite3.connect('users.db')
-    df = pd.read_sql_query("SELECT * FROM users", conn)
-    conn.close()
-    return df
+    return read_frame("SELECT * FROM users")
 
 def update_user_full_info(user_id, new_pw, new_role, new_expiry):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    if new_pw is not None and new_pw != "":
-        c.execute("UPDATE users SET pw=?, role=?, expiry_date=? WHERE id=?", (new_pw, new_role, new_expiry, user_id))
-    else:
-        c.execute("UPDATE users SET role=?, expiry_date=? WHERE id=?", (new_role, new_expiry, user_id))
-    conn.commit()
-    conn.close()
-    
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.sheet1
-            
-            headers = sheet.row_values(1)
-            if "expiry_date" not in headers:
-                sheet.update_cell(1, 6, "expiry_date")
-
-            cell = sheet.find(user_id)
-            if cell:
-                row_num = cell.row
-                sheet.update_cell(row_num, 2, new_role)
-                sheet.update_cell(row_num, 6, new_expiry)
-                if new_pw is not None and new_pw != "":
-                    sheet.update_cell(row_num, 4, new_pw)
-    except Exception:
-        pass 
+    def _update(conn):
+        cells = {2: new_role, 6: new_expiry}
+        if new_pw is not None and new_pw != "":
+            conn.execute("UPDATE users SET pw=?, role=?, expiry_date=? WHERE id=?", (new_pw, new_role, new_expiry, user_id))
+            cells[4] = new_pw
+        else:
+            conn.execute("UPDATE users SET role=?, expiry_date=? WHERE id=?", (new_role, new_expiry, user_id))
+        enqueue_update(None, user_id, cells, header=[None, None, None, None, None, "expiry_date"], conn=conn)
+    write(_update)
+    wake_outbox_worker()
 
-def delete_user(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM users WHERE id=?", (user_id,))
-    c.execute("DELETE FROM saved_analyses WHERE user_id=?", (user_id,))
-    c.execute("DELETE FROM user_models WHERE user_id=?", (user_id,))
-    conn.commit()
-    conn.close()
+DELETED_USERS_HEADER = ["ID", "Role", "SignupDate", "PW", "DeletedDate"]
 
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.sheet1
-            
-            try:
-                del_sheet = spreadsheet.worksheet("Deleted_Users")
-            except gspread.exceptions.WorksheetNotFound:
-                del_sheet = spreadsheet.add_worksheet(title="Deleted_Users", rows="1000", cols="10")
-                del_sheet.append_row(["ID", "Role", "SignupDate", "PW", "DeletedDate"])
-
-            all_values = sheet.get_all_values()
-            target_row_index = -1
-            row_data = []
-            for i, row in enumerate(all_values):
-                if row[0] == user_id:
-                    target_row_index = i + 1
-                    row_data = row
-                    break
-            
-            if target_row_index != -1:
-                kst_now_ts = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
-                row_data.append(str(kst_now_ts))
-                del_sheet.append_row(row_data)
-                sheet.delete_rows(target_row_index)
-    except Exception:
-        pass
+def delete_user(user_id):
+    # [최적화 추가] 시트 반영(Deleted_Users 에 기록 후 회원 시트에서 삭제)도 outbox 를 거쳐 다른 시트 작업과 같은 순서로 처리
+    kst_now_ts = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
+    def _delete(conn):
+        row = conn.execute("SELECT id, role, signup_date, pw FROM users WHERE id=?", (user_id,)).fetchone()
+        conn.execute("DELETE FROM users WHERE id=?", (user_id,))
+        conn.execute("DELETE FROM saved_analyses WHERE user_id=?", (user_id,))
+        conn.execute("DELETE FROM user_models WHERE user_id=?", (user_id,))
+        if row:
+            enqueue_append("Deleted_Users", list(row) + [kst_now_ts], header=DELETED_USERS_HEADER, conn=conn)
+        enqueue_delete(None, user_id, conn=conn)
+    write(_delete)
+    wake_outbox_worker()
 
 def restore_from_deleted_sheet(user_id):
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            try:
-                del_sheet = spreadsheet.worksheet("Deleted_Users")
-                cell = del_sheet.find(user_id)
-                if cell:
-                    del_sheet.delete_rows(cell.row)
-            except (gspread.exceptions.WorksheetNotFound, gspread.exceptions.CellNotFound):
-                pass
-    except Exception:
-        pass
+    enqueue_delete("Deleted_Users", user_id)
 
 def save_analysis_to_db(user_id, filename, file_data):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     save_date = str(datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S"))
-    c.execute("INSERT INTO saved_analyses (user_id, filename, save_date, file_data) VALUES (?, ?, ?, ?)",
-              (user_id, filename, save_date, file_data))
-    conn.commit()
-    conn.close()
+    execute_write("INSERT INTO saved_analyses (user_id, filename, save_date, file_data) VALUES (?, ?, ?, ?)",
+                  (user_id, filename, save_date, file_data))
 
 def get_user_analyses(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT id, filename, save_date FROM saved_analyses WHERE user_id=? ORDER BY save_date DESC", (user_id,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return fetch_all("SELECT id, filename, save_date FROM saved_analyses WHERE user_id=? ORDER BY save_date DESC", (user_id,))
 
 def get_analysis_file(analysis_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT filename, file_data FROM saved_analyses WHERE id=?", (analysis_id,))
-    result = c.fetchone()
-    conn.close()
-    return result
+    return fetch_one("SELECT filename, file_data FROM saved_analyses WHERE id=?", (analysis_id,))
 
 def delete_analysis(analysis_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM saved_analyses WHERE id=?", (analysis_id,))
-    conn.commit()
-    conn.close()
+    execute_write("DELETE FROM saved_analyses WHERE id=?", (analysis_id,))
 
 def save_user_model(user_id, model_dict):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     model_json = json.dumps(model_dict, ensure_ascii=False)
-    c.execute("INSERT OR REPLACE INTO user_models (user_id, model_data) VALUES (?, ?)", (user_id, model_json))
-    conn.commit()
-    conn.close()
+    execute_write("INSERT OR REPLACE INTO user_models (user_id, model_data) VALUES (?, ?)", (user_id, model_json))
 
 def load_user_model(user_id):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT model_data FROM user_models WHERE user_id=?", (user_id,))
-    result = c.fetchone()
-    conn.close()
+    result = fetch_one("SELECT model_data FROM user_models WHERE user_id=?", (user_id,))
     if result:
         return json.loads(result[0])
     return None
 
-# -----------------------------------------------------------------------------
-# Saaty(1980) AHP Functions
-# -----------------------------------------------------------------------------
-def get_ri(n):
-    ri_dict = {1: 0.00, 2: 0.00, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49}
-    return ri_dict.get(n, 1.49)
-
-def calculate_weights(matrix, method='geometric'):
-    if method == 'arithmetic':
-        col_sum = matrix.sum(axis=0)
-        col_sum[col_sum == 0] = 1
-        normalized_matrix = matrix / col_sum
-        weights = normalized_matrix.mean(axis=1)
-    else:
-        geom_means = gmean(matrix, axis=1)
-        weights = geom_means / geom_means.sum()
-    return weights
-
-def calculate_consistency(matrix, method='geometric'):
-    n = matrix.shape[0]
-    if n <= 2: return 0.0, 0.0, n
-    weights = calculate_weights(matrix, method)
-    weighted_sum = matrix.dot(weights)
-    weights_safe = weights.copy()
-    weights_safe[weights_safe == 0] = 1e-10
-    lambda_values = weighted_sum / weights_safe
-    lambda_max = lambda_values.mean()
-    ci = (lambda_max - n) / (n - 1)
-    ri = get_ri(n)
-    cr = ci / ri if ri > 0 else 0.0
-    return cr, ci, lambda_max
-
-def improve_consistency(matrix, threshold, min_val, max_val, max_iter=500, learning_rate=0.4, method='geometric', allow_even=False):
-    current_matrix = matrix.copy()
-    n = current_matrix.shape[0]
-    cr, ci, _ = calculate_consistency(current_matrix, method)
-    iterations = 0
-    if cr <= threshold: return current_matrix, cr, iterations, False
-    
-    triu_indices = np.triu_indices(n, k=1)
-    
-    for it in range(max_iter):
-        if cr <= threshold: break
-        
-        w = calculate_weights(current_matrix, method)
-        consistent_matrix = np.outer(w, 1/w)
-        
-        new_matrix = (current_matrix * (1 - learning_rate)) + (consistent_matrix * learning_rate)
-        np.fill_diagonal(new_matrix, 1.0)
-        
-        vals = new_matrix[triu_indices]
-        
-        temp_raw = np.where(vals == 1.0, 1.0, 
-                   np.where(vals > 1.0, -np.round(vals), 
-                   np.round(1.0/vals)))
-        
-        temp_raw = np.clip(temp_raw, min_val, max_val)
-        
-        abs_raw = np.abs(temp_raw)
-        signs = np.sign(temp_raw)
-        
-        if not allow_even:
-            abs_raw = np.where((abs_raw % 2 == 0) & (abs_raw != 0), np.maximum(1, abs_raw - 1), abs_raw)
-            
-        temp_raw = np.where(temp_raw == 0, 1, (signs * abs_raw)).astype(int)
-        
-        final_vals = np.where(temp_raw == 0, 1.0,
-                     np.where(temp_raw < 0, np.abs(temp_raw).astype(float),
-                     np.where(temp_raw == 1, 1.0, 1.0 / temp_raw)))
-        
-        new_matrix[triu_indices] = final_vals
-        new_matrix.T[triu_indices] = 1.0 / final_vals
-        
-        current_matrix = new_matrix
-        cr, ci, _ = calculate_consistency(current_matrix, method)
-        iterations += 1
-        
-    was_corrected = iterations > 0
-    return current_matrix, cr, iterations, was_corrected
-
-def parse_input_value(val):
-    if val == 0: return 1.0
-    elif val < 0: return abs(val)
-    elif val == 1: return 1.0
-    else: return 1.0 / val
-
-def infer_factors_from_columns(cols):
-    m = len(cols)
-    delta = 1 + 8 * m
-    n = int((1 + np.sqrt(delta)) / 2)
-    extracted_factors = []
-    seen = set()
-    for c in cols:
-        parts = str(c).split('_')
-        for p in parts:
-            p_str = p.strip()
-            if p_str not in seen:
-                seen.add(p_str)
-                extracted_factors.append(p_str)
-    if len(extracted_factors) == n:
-        factors = extracted_factors 
-    else:
-        factors = [f"F{i+1}" for i in range(n)]
-    return factors, n
-
-def calculate_pairwise_ttest(df, factors):
-    n = len(factors)
-    p_values = pd.DataFrame(index=factors, columns=factors)
-    weight_cols = [f"Weight_{f}" for f in factors]
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                p_values.iloc[i, j] = 1.0
-            else:
-                col1 = weight_cols[i]
-                col2 = weight_cols[j]
-                if col1 in df.columns and col2 in df.columns and len(df) > 1:
-                    try:
-                        _, p = ttest_rel(df[col1], df[col2], nan_policy='omit')
-                        p_values.iloc[i, j] = p
-                    except:
-                        p_values.iloc[i, j] = np.nan
-                else:
-                    p_values.iloc[i, j] = np.nan
-    return p_values
-
-def process_single_sheet(df, cr_threshold, max_iter, method='geometric'):
-    meta_cols = df.columns[:2]
-    comp_cols = df.columns[2:]
-    factors, n = infer_factors_from_columns(comp_cols)
-    
-    all_comp_values = df[comp_cols].values.flatten()
-    sheet_min = int(np.min(all_comp_values))
-    sheet_max = int(np.max(all_comp_values))
-    
-    has_even = np.any((np.abs(all_comp_values) % 2 == 0) & (np.abs(all_comp_values) > 1))
-    
-    results_list = []
-    excluded_list = []
-    excluded_count = 0
-    for idx, row in df.iterrows():
-        respondent_id = row.iloc[0]
-        respondent_type = row.iloc[1]
-        matrix = np.eye(n)
-        
-        raw_values = []
-        col_idx = 0
-        for i in range(n):
-            for j in range(i + 1, n):
-                if col_idx < len(comp_cols):
-                    raw_val = row[comp_cols[col_idx]]
-                    raw_values.append(raw_val)
-                    ahp_val = parse_input_value(raw_val)
-                    matrix[i, j] = ahp_val
-                    matrix[j, i] = 1.0 / ahp_val
-                    col_idx += 1
-        
-        orig_cr, orig_ci, _ = calculate_consistency(matrix, method)
-        final_matrix = matrix.copy()
-        final_cr = orig_cr
-        iterations = 0
-        corrected_flag = False
-        if orig_cr > cr_threshold:
-            final_matrix, final_cr, iterations, corrected_flag = improve_consistency(
-                matrix, cr_threshold, sheet_min, sheet_max, max_iter=max_iter, method=method, allow_even=has_even
-            )
-        
-        if final_cr > cr_threshold:
-            excluded_count += 1
-            ex_res = {"ID": respondent_id, "Type": respondent_type}
-            for k, col_name in enumerate(comp_cols):
-                ex_res[col_name] = raw_values[k]
-            ex_res["CR"] = final_cr
-            excluded_list.append(ex_res)
-            continue
-
-        final_raw_values = []
-        for i in range(n):
-            for j in range(i + 1, n):
-                val = final_matrix[i, j]
-                if val == 1.0: final_raw_val = 1
-                elif val > 1.0: final_raw_val = -int(round(val)) 
-                else: final_raw_val = int(round(1.0/val)) 
-                final_raw_values.append(final_raw_val)
-
-        _, final_ci, _ = calculate_consistency(final_matrix, method)
-        final_weights = calculate_weights(final_matrix, method)
-        
-        res = {
-            "ID": respondent_id,
-            "Type": respondent_type
-        }
-        
-        for k, col_name in enumerate(comp_cols):
-            res[f"Raw_Orig_{col_name}"] = raw_values[k]
-        
-        res["Original_CI"] = orig_ci
-        res["Original_CR"] = orig_cr
-        
-        for k, col_name in enumerate(comp_cols):
-            res[f"Raw_Final_{col_name}"] = final_raw_values[k]
-            
-        res["Final_CI"] = final_ci
-        res["Final_CR"] = final_cr
-        
-        res["Iterations"] = iterations
-        res["Corrected"] = corrected_flag
-        res["Matrix_Object"] = final_matrix 
-        
-        for f_idx, f_name in enumerate(factors):
-            res[f"Weight_{f_name}"] = final_weights[f_idx]
-            
-        results_list.append(res)
-        
-    results_df = pd.DataFrame(results_list)
-    excluded_df = pd.DataFrame(excluded_list)
-    return results_df, factors, excluded_count, excluded_df
-
-def create_sample_excel():
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        main_cols = ["ID", "Type", "거버넌스_계획타당성", "거버넌스_실현가능성", "거버넌스_사업효과", 
-                      "계획타당성_실현가능성", "계획타당성_사업효과", "실현가능성_사업효과"]
-        main_data = [
-            [1, "전문가", 5, -5, 5, 5, -5, 5],               
-            [2, "전문가", 7, 7, -7, -7, 2, -2],       
-            [3, "일반", -5, 5, 5, -5, 5, 5],
-            [4, "일반", 3, -3, 3, -3, 3, -3],
-            [5, "공무원", 9, -9, 9, -9, 9, -9]
-        ]
-        df_main = pd.DataFrame(main_data, columns=main_cols)
-        df_main.to_excel(writer, sheet_name="Main_Criteria", index=False)
-        
-        inconsistent_pattern = [
-            [1, "전문가", 5, -5, 5],
-            [2, "전문가", 7, -7, 7],
-            [3, "일반", 3, -3, 3],
-            [4, "일반", 9, -9, 9],
-            [5, "공무원", 4, -4, 4]
-        ]
-        sub1_cols = ["ID", "Type", "행정지원_지역공동체", "행정지원_총괄사업관리자", "지역공동체_총괄사업관리자"]
-        pd.DataFrame(inconsistent_pattern, columns=sub1_cols).to_excel(writer, sheet_name="거버넌스", index=False)
-        sub2_cols = ["ID", "Type", "현안적정성_대안적정성", "현안적정성_목표구체성", "대안적정성_목표구체성"]
-        pd.DataFrame(inconsistent_pattern, columns=sub2_cols).to_excel(writer, sheet_name="계획타당성", index=False)
-        sub3_cols = ["ID", "Type", "부지확보_사업구체화", "부지확보_사업비적정성", "사업구체화_사업비적정성"]
-        pd.DataFrame(inconsistent_pattern, columns=sub3_cols).to_excel(writer, sheet_name="실현가능성", index=False)
-        sub4_cols = ["ID", "Type", "경제적효과_사회적효과", "경제적효과_성과관리", "사회적효과_성과관리"]
-        pd.DataFrame(inconsistent_pattern, columns=sub4_cols).to_excel(writer, sheet_name="사업효과", index=False)
-    output.seek(0)
-    return output
-
-def calculate_anova_and_posthoc(full_data):
-    results = []
-    unique_factors = full_data['Factor'].unique()
-    
-    for factor in unique_factors:
-        subset = full_data[full_data['Factor'] == factor]
-        groups = [group['Global_Weight'].values for name, group in subset.groupby('Type')]
-        
-        if len(groups) < 2:
-            continue
-            
-        f_stat, p_val = f_oneway(*groups)
-        
-        row = {
-            "요인": factor,
-            "F-값": f_stat,
-            "P-Value": p_val,
-            "유의성": "유의함" if p_val < 0.05 else "유의하지 않음",
-            "사후검정(Tukey HSD)": ""
-        }
-        
-        if p_val < 0.05 and STATSMODELS_AVAILABLE:
-            try:
-                tukey = pairwise_tukeyhsd(endog=subset['Global_Weight'], groups=subset['Type'], alpha=0.05)
-                tukey_df = pd.DataFrame(data=tukey.summary().data[1:], columns=tukey.summary().data[0])
-                sig_pairs = tukey_df[tukey_df['reject'] == True]
-                if not sig_pairs.empty:
-                    pairs_str = []
-                    for _, r in sig_pairs.iterrows():
-                        pairs_str.append(f"{r['group1']} vs {r['group2']}")
-                    row["사후검정(Tukey HSD)"] = ", ".join(pairs_str) + " 차이 있음"
-                else:
-                    row["사후검정(Tukey HSD)"] = "집단 간 구체적 차이 발견 못함"
-            except Exception:
-                row["사후검정(Tukey HSD)"] = "계산 오류"
-        
-        results.append(row)
-        
-    return pd.DataFrame(results)
-
 # -----------------------------------------------------------------------------
 # [신규] 커뮤니티 데이터베이스 및 UI 로직 (구글 시트 연동 포함)
 # -----------------------------------------------------------------------------
 
-def log_community_to_sheets(sheet_name, data):
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            try:
-                work_sheet = spreadsheet.worksheet(sheet_name)
-            except gspread.exceptions.WorksheetNotFound:
-                if sheet_name == "Community_Posts":
-                    work_sheet = spreadsheet.add_worksheet(title="Community_Posts", rows="1000", cols="10")
-                    work_sheet.append_row(["ID", "UserID", "Title", "Content", "RegDate", "IsSecret", "IsNotice", "Likes", "NonUserPW", "Views"])
-                else:
-                    work_sheet = spreadsheet.add_worksheet(title="Community_Comments", rows="1000", cols="10")
-                    work_sheet.append_row(["ID", "PostID", "UserID", "Content", "RegDate", "IsSecret"])
-            
-            # [요청사항 1] 헤더 유무 확인 및 강제 기록 (데이터 꼬임 방지)
-            if sheet_name == "Community_Posts":
-                if not work_sheet.row_values(1):
-                    work_sheet.append_row(["ID", "UserID", "Title", "Content", "RegDate", "IsSecret", "IsNotice", "Likes", "NonUserPW", "Views"])
-            
-            if isinstance(data, list): 
-                # [최적화 추가] 시트 저장을 비동기 처리하여 게시판 응답 속도 향상
-                threading.Thread(target=work_sheet.append_row, args=(data,)).start()
-    except Exception:
-        pass
+def log_community_to_sheets(sheet_name, data, conn=None):
+    # [요청사항 1] 시트가 없거나 헤더가 비어 있으면 워커가 헤더를 먼저 기록 (데이터 꼬임 방지)
+    header = POSTS_SHEET_HEADER if sheet_name == "Community_Posts" else COMMENTS_SHEET_HEADER
+    if isinstance(data, list):
+        enqueue_append(sheet_name, data, header=header, conn=conn)
 
 # [최적화 추가] 게시판 목록 읽기 로직 캐싱 적용
 @st.cache_data(show_spinner=False)
 def get_posts():
-    conn = sqlite3.connect('users.db')
-    df = pd.read_sql_query("SELECT * FROM community_posts ORDER BY is_notice DESC, id DESC", conn)
-    conn.close()
-    return df
+    return read_frame("SELECT * FROM community_posts ORDER BY is_notice DESC, id DESC")
+
+# [최적화 추가] 업로드 엑셀 파싱 캐싱 (파일 내용 해시를 키로 사용, 원본 bytes 는 해시 대상에서 제외)
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_uploaded_workbook(content_hash, _file_bytes):
+    return load_workbook_frames(io.BytesIO(_file_bytes))
 
 # [요청사항 3] 조회수 증가 및 구글 시트 기록 함수
 def increment_views(pid):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("UPDATE community_posts SET views = views + 1 WHERE id=?", (pid,))
-    conn.commit()
-    
-    # 갱신된 조회수 가져오기
-    c.execute("SELECT views FROM community_posts WHERE id=?", (pid,))
-    new_views = c.fetchone()[0]
-    conn.close()
-    
+    # 증가와 갱신된 조회수 조회를 같은 쓰기 작업 안에서 수행
     # [요청사항 1 & 3] 구글 시트 업데이트 (기존 데이터에 덧쓰지 않고 행 업데이트)
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.worksheet("Community_Posts")
-            cell = sheet.find(str(pid))
-            if cell:
-                # Views는 J열(10번째 열)에 위치한다고 가정 (헤더 순서 기반)
-                # [최적화 추가] 비동기 업데이트
-                threading.Thread(target=sheet.update_cell, args=(cell.row, 10, new_views)).start()
-    except: pass
+    # Views는 J열(10번째 열)에 위치한다고 가정 (헤더 순서 기반)
+    def _increment(conn):
+        conn.execute("UPDATE community_posts SET views = views + 1 WHERE id=?", (pid,))
+        new_views = conn.execute("SELECT views FROM community_posts WHERE id=?", (pid,)).fetchone()[0]
+        enqueue_update("Community_Posts", pid, {10: new_views}, conn=conn)
+        return new_views
+    write(_increment)
+    wake_outbox_worker()
     
     # [최적화 추가] 조회수 변경 시 캐시 무효화
     st.cache_data.clear()
 
 def add_post(uid, title, content, is_secret, is_notice, non_user_pw=None):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO community_posts (user_id, title, content, reg_date, is_secret, is_notice, non_user_pw, views) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-              (uid, title, content, now, 1 if is_secret else 0, 1 if is_notice else 0, non_user_pw, 0))
-    post_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    
-    # [요청사항 1] 구글 시트에 새 행으로 추가 (append_row 사용으로 기존 데이터 보존, 정확한 컬럼 매핑)
-    log_community_to_sheets("Community_Posts", [post_id, uid, title, content, now, 1 if is_secret else 0, 1 if is_notice else 0, 0, non_user_pw, 0])
+    def _add(conn):
+        post_id = conn.execute("INSERT INTO community_posts (user_id, title, content, reg_date, is_secret, is_notice, non_user_pw, views) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (uid, title, content, now, 1 if is_secret else 0, 1 if is_notice else 0, non_user_pw, 0)).lastrowid
+        # [요청사항 1] 구글 시트에 새 행으로 추가 (append_row 사용으로 기존 데이터 보존, 정확한 컬럼 매핑)
+        log_community_to_sheets("Community_Posts", [post_id, uid, title, content, now, 1 if is_secret else 0, 1 if is_notice else 0, 0, non_user_pw, 0], conn=conn)
+    write(_add)
+    wake_outbox_worker()
     
     # [최적화 추가] 데이터 추가 시 캐시 무효화
     st.cache_data.clear()
 
 def update_post(pid, title, content, is_secret, is_notice):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("UPDATE community_posts SET title=?, content=?, is_secret=?, is_notice=? WHERE id=?", 
-              (title, content, 1 if is_secret else 0, 1 if is_notice else 0, pid))
-    conn.commit()
-    conn.close()
-    
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.worksheet("Community_Posts")
-            cell = sheet.find(str(pid))
-            if cell:
-                # 덧쓰지 않고 특정 열 범위만 업데이트 (C:Title ~ G:IsNotice)
-                # [최적화 추가] 비동기 처리
-                threading.Thread(target=sheet.update, kwargs={"range_name": f'C{cell.row}:G{cell.row}', "values": [[title, content, "", 1 if is_secret else 0, 1 if is_notice else 0]]}).start()
-    except: pass
+    def _update(conn):
+        conn.execute("UPDATE community_posts SET title=?, content=?, is_secret=?, is_notice=? WHERE id=?", 
+                     (title, content, 1 if is_secret else 0, 1 if is_notice else 0, pid))
+        # 덧쓰지 않고 변경된 열만 업데이트 (C:Title, D:Content, F:IsSecret, G:IsNotice / E:RegDate 는 유지)
+        enqueue_update("Community_Posts", pid, {3: title, 4: content, 6: 1 if is_secret else 0, 7: 1 if is_notice else 0}, conn=conn)
+    write(_update)
+    wake_outbox_worker()
     
     # [최적화 추가] 캐시 무효화
     st.cache_data.clear()
 
 def delete_post(pid):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM community_posts WHERE id=?", (pid,))
-    c.execute("DELETE FROM community_comments WHERE post_id=?", (pid,))
-    conn.commit()
-    conn.close()
-    
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.worksheet("Community_Posts")
-            cell = sheet.find(str(pid))
-            if cell: 
-                # [최적화 추가] 비동기 삭제
-                threading.Thread(target=sheet.delete_rows, args=(cell.row,)).start()
-    except: pass
+    def _delete(conn):
+        conn.execute("DELETE FROM community_posts WHERE id=?", (pid,))
+        conn.execute("DELETE FROM community_comments WHERE post_id=?", (pid,))
+        enqueue_delete("Community_Posts", pid, conn=conn)
+    write(_delete)
+    wake_outbox_worker()
     
     # [최적화 추가] 캐시 무효화
     st.cache_data.clear()
@@ -1138,43 +734,29 @@ def delete_post(pid):
 # [최적화 추가] 댓글 읽기 캐싱 적용
 @st.cache_data(show_spinner=False)
 def get_comments(pid):
-    conn = sqlite3.connect('users.db')
-    df = pd.read_sql_query(f"SELECT * FROM community_comments WHERE post_id={pid} ORDER BY id ASC", conn)
-    conn.close()
-    return df
+    return read_frame("SELECT * FROM community_comments WHERE post_id=? ORDER BY id ASC", (pid,))
 
 def add_comment(pid, uid, content, is_secret):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))).strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO community_comments (post_id, user_id, content, reg_date, is_secret) VALUES (?, ?, ?, ?, ?)",
-              (pid, uid, content, now, 1 if is_secret else 0))
-    com_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    log_community_to_sheets("Community_Comments", [com_id, pid, uid, content, now, 1 if is_secret else 0])
+    def _add(conn):
+        com_id = conn.execute("INSERT INTO community_comments (post_id, user_id, content, reg_date, is_secret) VALUES (?, ?, ?, ?, ?)",
+                              (pid, uid, content, now, 1 if is_secret else 0)).lastrowid
+        log_community_to_sheets("Community_Comments", [com_id, pid, uid, content, now, 1 if is_secret else 0], conn=conn)
+    write(_add)
+    wake_outbox_worker()
     
     # [최적화 추가] 캐시 무효화
     st.cache_data.clear()
 
 def like_post(pid):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("UPDATE community_posts SET likes = likes + 1 WHERE id=?", (pid,))
-    conn.commit()
-    conn.close()
-    
-    try:
-        client = get_gspread_client()
-        if client:
-            spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
-            sheet = spreadsheet.worksheet("Community_Posts")
-            cell = sheet.find(str(pid))
-            if cell:
-                curr_likes = sheet.cell(cell.row, 8).value
-                # [최적화 추가] 비동기 처리
-                threading.Thread(target=sheet.update_cell, args=(cell.row, 8, int(curr_likes or 0) + 1)).start()
-    except: pass
+    # 시트의 현재 값을 읽어 +1 하던 방식 대신 DB 의 좋아요 수를 그대로 시트에 반영 (H열)
+    def _like(conn):
+        conn.execute("UPDATE community_posts SET likes = likes + 1 WHERE id=?", (pid,))
+        row = conn.execute("SELECT likes FROM community_posts WHERE id=?", (pid,)).fetchone()
+        if row:
+            enqueue_update("Community_Posts", pid, {8: row[0]}, conn=conn)
+    write(_like)
+    wake_outbox_worker()
     
     # [최적화 추가] 캐시 무효화
     st.cache_data.clear()
@@ -1380,7 +962,10 @@ def show_community_board():
 # 2. Setup & Layout
 # -----------------------------------------------------------------------------
 
-init_db()
+boot_state = boot_once()
+if boot_state["synced"].is_set() and not boot_state["cache_cleared"]:
+    boot_state["cache_cleared"] = True
+    st.cache_data.clear()
 
 st.markdown("""
 <style>
@@ -1573,10 +1158,11 @@ with st.sidebar:
 
     st.markdown("---")
     st.header("분석 설정")
-    mean_method_label = st.radio("평균 산출 방식", ('기하평균 (Geometric)', '산술평균 (Arithmetic)'), index=0)
-    mean_method = 'geometric' if '기하' in mean_method_label else 'arithmetic'
+    mean_method_label = st.radio("평균 산출 방식", ('기하평균 (Geometric)', '산술평균 (Arithmetic)', '고유벡터 (Eigenvector)'), index=0)
+    mean_method = 'geometric' if '기하' in mean_method_label else ('eigenvector' if '고유' in mean_method_label else 'arithmetic')
     cr_threshold = st.selectbox("일관성 비율(CR) 임계값", [0.1, 0.2], index=0)
     max_iter = st.number_input("최대 보정 반복 횟수", min_value=10, max_value=500, value=500, step=50)
+    parallel_mode = st.checkbox("시트 병렬 분석 (멀티코어)", value=False)
 
     st.markdown("---")
     with st.expander("💡 사용자 권한 안내", expanded=False):
@@ -1615,13 +1201,16 @@ else:
                     st.rerun()
                 else:
                     st.error("동기화 중 오류가 발생했습니다.")
+        with col_sync2:
+            st.caption(f"⏱️ 부팅/임포트 소요 시간: {format_boot_report()}")
+            st.caption(f"🗄️ DB 쓰기 큐/잠금 대기: {format_db_stats()}")
+            st.caption(f"📤 구글 시트 전송 대기열: {format_outbox_stats()}")
         
         try:
             client = get_gspread_client()
             if client:
-                spreadsheet = client.open_by_key(st.secrets["SPREADSHEET_ID"])
                 try:
-                    visit_sheet = spreadsheet.worksheet("Visit_Logs")
+                    visit_sheet = get_worksheet("Visit_Logs")
                     visit_data_gs = visit_sheet.get_all_records()
                     daily_df_logs = pd.DataFrame(visit_data_gs)
                     if not daily_df_logs.empty:
@@ -1664,6 +1253,7 @@ else:
                 else:
                     st.info("방문 기록이 없습니다.")
         except Exception as e:
+            report_sheets_error(e)
             st.error(f"통계 오류: {e}")
         st.divider()
         
@@ -1818,106 +1408,14 @@ else:
 
     st.markdown("---")
 
-    def write_custom_ahp_table(writer, sheet_name, df, title_text, start_row, formats, excluded_df=None):
-        workbook = writer.book
-        if sheet_name in writer.sheets: worksheet = writer.sheets[sheet_name]
-        else:
-            worksheet = workbook.add_worksheet(sheet_name)
-            writer.sheets[sheet_name] = worksheet
-        
-        header_fmt = formats['header']
-        merge_fmt = formats['merge']
-        body_fmt = formats['body']
-        num_fmt = formats['num']
-        sum_row_fmt = formats['sum_row']
-        
-        if excluded_df is not None:
-            worksheet.write(start_row, 0, f"※ 분석 제외 사례수: {len(excluded_df)}건", workbook.add_format({'bold': True, 'font_color': 'red'}))
-            start_row += 1
-            if not excluded_df.empty:
-                worksheet.write(start_row, 0, "▶ 제외된 응답 데이터 (보정 실패)", workbook.add_format({'bold': True}))
-                start_row += 1
-                excluded_df.to_excel(writer, sheet_name=sheet_name, startrow=start_row, index=False)
-                start_row += len(excluded_df) + 2
-
-        worksheet.merge_range(start_row, 0, start_row, 6, title_text, workbook.add_format({'bold': True, 'font_size': 12}))
-        start_row += 1
-        
-        headers = ["대분류", "가중치(a)", "중분류", "가중치(b)", "종합 가중치(a x b)", "종합 순위", "비고"]
-        for col, h in enumerate(headers):
-            worksheet.write(start_row, col, h, header_fmt)
-        start_row += 1
-        
-        main_criteria = df['대분류'].unique()
-        current_row = start_row
-        
-        for main_c in main_criteria:
-            sub_df = df[df['대분류'] == main_c]
-            n_subs = len(sub_df)
-            main_w = sub_df.iloc[0]['대분류 가중치']
-            sub_cr = sub_df.iloc[0]['CR(중분류)']
-            sum_sub_w = sub_df['중분류 가중치'].sum()
-            
-            merge_span = n_subs + 2 
-            if merge_span > 1:
-                worksheet.merge_range(current_row, 0, current_row + merge_span - 1, 0, main_c, merge_fmt)
-                worksheet.merge_range(current_row, 1, current_row + merge_span - 1, 1, main_w, num_fmt)
-            else:
-                worksheet.write(current_row, 0, main_c, merge_fmt)
-                worksheet.write(current_row, 1, main_w, num_fmt)
-                
-            for idx, row in sub_df.iterrows():
-                worksheet.write(current_row, 2, row['중분류'], body_fmt)
-                worksheet.write(current_row, 3, row['중분류 가중치'], num_fmt)
-                worksheet.write(current_row, 4, row['Global Weight'], num_fmt)
-                worksheet.write(current_row, 5, row['Global Rank'], body_fmt)
-                worksheet.write(current_row, 6, "", body_fmt)
-                current_row += 1
-            
-            worksheet.write(current_row, 2, "합계", sum_row_fmt)
-            worksheet.write(current_row, 3, sum_sub_w, formats['sum_val'])
-            worksheet.write_blank(current_row, 4, "", sum_row_fmt)
-            worksheet.write_blank(current_row, 5, "", sum_row_fmt)
-            worksheet.write_blank(current_row, 6, "", sum_row_fmt)
-            current_row += 1
-            
-            worksheet.write(current_row, 2, "일관성 비율(CR)", sum_row_fmt)
-            worksheet.write(current_row, 3, sub_cr, formats['num_sum'])
-            worksheet.write_blank(current_row, 4, "", sum_row_fmt)
-            worksheet.write_blank(current_row, 5, "", sum_row_fmt)
-            worksheet.write_blank(current_row, 6, "", sum_row_fmt)
-            current_row += 1
-
-        worksheet.write(current_row, 0, "합계", sum_row_fmt)
-        worksheet.write(current_row, 1, 1, formats['sum_val'])
-        worksheet.write(current_row, 2, "합계", sum_row_fmt)
-        worksheet.write_blank(current_row, 3, "", sum_row_fmt)
-        worksheet.write(current_row, 4, 1, formats['sum_val'])
-        worksheet.write_blank(current_row, 5, "", sum_row_fmt)
-        worksheet.write_blank(current_row, 6, "", sum_row_fmt)
-        
-        worksheet.set_column('A:A', 15)
-        worksheet.set_column('B:B', 12)
-        worksheet.set_column('C:C', 25)
-        worksheet.set_column('D:F', 12)
-        return current_row + 2
-
-    def add_borders_to_data(worksheet, start_row, start_col, df, border_fmt, has_header=True, has_index=False):
-        rows = len(df) + (1 if has_header else 0)
-        cols = len(df.columns) + (1 if has_index else 0)
-        worksheet.conditional_format(start_row, start_col, start_row+rows-1, start_col+cols-1,
-                                      {'type': 'formula', 'criteria': '=TRUE', 'format': border_fmt})
-
     st.subheader("2. 데이터 업로드 및 분석")
     uploaded_file = st.file_uploader("작성된 엑셀 파일 업로드 (.xlsx)", type=['xlsx', 'xls'])
 
     if uploaded_file:
         try:
-            excel_obj = pd.ExcelFile(uploaded_file)
-            sheet_names = excel_obj.sheet_names
-            df_main = pd.read_excel(uploaded_file, sheet_name=sheet_names[0])
-            main_cols_names = df_main.columns[2:]
-            main_factors, n_main = infer_factors_from_columns(main_cols_names)
+            # [최적화 추가] 업로드 파일은 내용 해시 기준으로 시트당 한 번만 파싱 (재실행 시 캐시 재사용)
+            file_bytes = uploaded_file.getvalue()
+            file_hash = hashlib.sha256(file_bytes).hexdigest()
 
             permission_granted = False
             message = ""
@@ -1933,329 +1431,56 @@ else:
                         permission_granted = False
                         message = "⛔ 이용 기간이 만료되었습니다."
             else: 
-                rows_ok = True
-                for sn in sheet_names:
-                    if len(pd.read_excel(uploaded_file, sheet_name=sn)) > 5:
-                        rows_ok = False
-                        break
+                # [최적화 추가] xlsx 메타데이터/행 스트리밍으로 먼저 확인하여 대용량 파일은 파싱 없이 즉시 거절
+                rows_ok = workbook_within_row_limit(file_bytes, 5)
+                if rows_ok is None:
+                    # xls 등 스트리밍 확인이 불가능한 형식은 파싱 후 확인
+                    rows_ok = all(len(df) <= 5 for df in load_uploaded_workbook(file_hash, file_bytes).values())
                 if rows_ok: permission_granted = True
                 else: message = f"⛔ **무료사용자**는 시트당 최대 5개 표본까지만 분석 가능합니다."
 
             if permission_granted:
                 with st.spinner("계층 분석 수행 중..."):
-                    main_results_df, main_factors, main_excluded, main_excluded_df = process_single_sheet(df_main, cr_threshold, max_iter, mean_method)
-                    
-                    total_excluded = main_excluded
+                    # [최적화 추가] 같은 파일(내용 해시) + 같은 분석 조건이면 분석 결과와 결과 엑셀을 캐시에서 재사용
+                    # (탭 전환, 다른 위젯 조작으로 인한 재실행 시 재계산하지 않음)
+                    cache_key = analysis_cache_key(file_hash, cr_threshold, max_iter, mean_method)
+                    cache_entry = analysis_cache_get(cache_key)
+                    if cache_entry is None:
+                        if workbook_needs_streaming(file_bytes, STREAM_ROW_THRESHOLD):
+                            # [최적화 추가] 대용량 파일은 시트 전체를 DataFrame 으로 만들지 않고 청크 단위로 스트리밍 분석
+                            result = analyze_workbook_streaming(io.BytesIO(file_bytes), cr_threshold, max_iter, mean_method)
+                        else:
+                            workbook_frames = load_uploaded_workbook(file_hash, file_bytes)
+                            # [최적화 추가] 대분류/세부항목 시트는 서로 독립적이므로 프로세스 풀에서 동시에 분석
+                            result = analyze_hierarchy(workbook_frames, cr_threshold, max_iter, mean_method, parallel=parallel_mode)
+                        cache_entry = {'result': result}
+                        analysis_cache_put(cache_key, cache_entry)
+                    # [최적화 추가] 결과 엑셀은 지연 생성: 정식 사용자 결과 보관용 사본만 백그라운드에서 바로 생성 후 저장
+                    # 분석 캐시는 사용자와 무관하게 공유되므로, 보관 여부는 (사용자, 분석 키) 단위로 세션마다 한 번씩 판단
+                    # (같은 세션의 재실행마다 중복 저장되지 않도록 함)
+                    archived = st.session_state.setdefault('archived_analyses', set())
+                    archive_user_id = st.session_state.user_id
+                    if st.session_state.user_role == 'official' and (archive_user_id, cache_key) not in archived:
+                        archived.add((archive_user_id, cache_key))
+                        archive_name = f"{uploaded_file.name.split('.')[0]}_Result.xlsx"
+                        def _archive_export(f, user_id=archive_user_id, filename=archive_name):
+                            if f.exception() is None:
+                                save_analysis_to_db(user_id, filename, f.result())
+                        ensure_result_export(cache_entry).add_done_callback(_archive_export)
+                    result = cache_entry['result']
+
+                    main_results = result['main_results']
+                    main_factors = result['main_factors']
+                    sub_results_storage = result['sub_results_storage']
+                    final_df = result['final_df']
+                    comparison_df = result['comparison_df']
+                    anova_df = result['anova_df']
+                    indiv_df = result['indiv_df']
+
+                    total_excluded = result['main_excluded']
                     st.markdown(f"**분석 제외: {total_excluded}건**")
 
-                    main_sig_df = calculate_pairwise_ttest(main_results_df, main_factors)
-                    main_weight_cols = [f"Weight_{f}" for f in main_factors]
-                    
-                    if mean_method == 'arithmetic':
-                        group_main_weights = main_results_df[main_weight_cols].mean(axis=0)
-                    else:
-                        group_main_weights = gmean(main_results_df[main_weight_cols].values, axis=0)
-                    group_main_weights = group_main_weights / group_main_weights.sum()
-                    main_cr_final_avg = main_results_df['Final_CR'].mean()
-                    
-                    main_matrices = np.stack(main_results_df['Matrix_Object'].values)
-                    main_group_matrix = np.mean(main_matrices, axis=0) if mean_method == 'arithmetic' else gmean(main_matrices, axis=0)
-                    main_grp_cr, main_grp_ci, _ = calculate_consistency(main_group_matrix, mean_method)
-                    
-                    indiv_global_data = []
-                    all_ids = main_results_df['ID'].unique()
-                    
-                    sub_results_storage = {} 
-                    total_excl_df_list = [main_excluded_df]
-                    for i, sub_sheet_name in enumerate(sheet_names[1:]):
-                        parent_factor = main_factors[i]
-                        df_sub = pd.read_excel(uploaded_file, sheet_name=sub_sheet_name)
-                        sub_res_df, sub_facts, sub_excl, sub_excl_df = process_single_sheet(df_sub, cr_threshold, max_iter, mean_method)
-                        sub_sig_df = calculate_pairwise_ttest(sub_res_df, sub_facts)
-                        sub_w_cols = [f"Weight_{f}" for f in sub_facts]
-                        group_sub_w = sub_res_df[sub_w_cols].mean(axis=0) if mean_method == 'arithmetic' else gmean(sub_res_df[sub_w_cols].values, axis=0)
-                        group_sub_w = group_sub_w / group_sub_w.sum()
-                        sub_cr_final_avg = sub_res_df['Final_CR'].mean()
-                        sub_matrices = np.stack(sub_res_df['Matrix_Object'].values)
-                        sub_group_matrix = np.mean(sub_matrices, axis=0) if mean_method == 'arithmetic' else gmean(sub_matrices, axis=0)
-                        sub_grp_cr, _, _ = calculate_consistency(sub_group_matrix, method=mean_method)
-                        sub_results_storage[parent_factor] = {
-                            'weights': group_sub_w, 'factors': sub_facts, 'cr': sub_cr_final_avg,
-                            'df': sub_res_df, 'group_matrix': sub_group_matrix, 'group_cr': sub_grp_cr, 'sig_df': sub_sig_df
-                        }
-                        if not sub_excl_df.empty:
-                            sub_excl_df['Sheet'] = sub_sheet_name
-                            total_excl_df_list.append(sub_excl_df)
-
-                    for uid in all_ids:
-                        u_main = main_results_df[main_results_df['ID'] == uid]
-                        if u_main.empty: continue
-                        u_type = u_main['Type'].values[0]
-                        for mf in main_factors:
-                            m_w = u_main[f"Weight_{mf}"].values[0]
-                            s_row_df = sub_results_storage[mf]['df']
-                            u_sub = s_row_df[s_row_df['ID'] == uid]
-                            if u_sub.empty: continue
-                            for sf in sub_results_storage[mf]['factors']:
-                                s_w = u_sub[f"Weight_{sf}"].values[0]
-                                indiv_global_data.append({
-                                    "ID": uid, "Type": str(u_type), "Factor": sf, "Global_Weight": m_w * s_w
-                                })
-                    indiv_df = pd.DataFrame(indiv_global_data)
-                    
-                    anova_df = pd.DataFrame()
-                    if not indiv_df.empty and len(indiv_df['Type'].unique()) >= 2:
-                        anova_df = calculate_anova_and_posthoc(indiv_df)
-
-                    summary_rows = []
-                    for idx, main_f in enumerate(main_factors):
-                        m_weight = group_main_weights[idx]
-                        sub_info = sub_results_storage[main_f]
-                        for s_idx, sub_f in enumerate(sub_info['factors']):
-                            s_weight = sub_info['weights'][s_idx]
-                            global_w = m_weight * s_weight
-                            summary_rows.append({
-                                "대분류": main_f, "대분류 가중치": m_weight, "중분류": sub_f, "중분류 가중치": s_weight,
-                                "Global Weight": global_w, "CR(대분류)": main_cr_final_avg, "CR(중분류)": sub_info['cr']
-                            })
-                    
-                    final_df = pd.DataFrame(summary_rows)
-                    final_df['Global Rank'] = final_df['Global Weight'].rank(ascending=False, method='min').astype(int)
-                    cols_order = ["대분류", "대분류 가중치", "중분류", "중분류 가중치", "Global Weight", "Global Rank", "CR(대분류)", "CR(중분류)"]
-                    final_df = final_df[cols_order]
-
-                    unique_groups = sorted(main_results_df['Type'].astype(str).unique())
-                    group_analysis_results = {}
-                    group_full_dfs = {} 
-                    
-                    for grp in unique_groups:
-                        grp_main_df = main_results_df[main_results_df['Type'].astype(str) == grp]
-                        if grp_main_df.empty: continue
-                        g_main_w = grp_main_df[main_weight_cols].mean(axis=0) if mean_method == 'arithmetic' else gmean(grp_main_df[main_weight_cols].values, axis=0)
-                        g_main_w = g_main_w / g_main_w.sum()
-                        g_main_mats = np.stack(grp_main_df['Matrix_Object'].values)
-                        g_main_mat_obj = np.mean(g_main_mats, axis=0) if mean_method == 'arithmetic' else gmean(g_main_mats, axis=0)
-                        g_main_cr, _, _ = calculate_consistency(g_main_mat_obj, method=mean_method)
-                        
-                        grp_rows = []
-                        for idx, main_f in enumerate(main_factors):
-                            m_w = g_main_w[idx]
-                            full_sub_df = sub_results_storage[main_f]['df']
-                            grp_sub_df = full_sub_df[full_sub_df['Type'].astype(str) == grp]
-                            sub_facts_list = sub_results_storage[main_f]['factors']
-                            if grp_sub_df.empty: continue
-                            s_w_cols = [f"Weight_{f}" for f in sub_facts_list]
-                            g_sub_w = grp_sub_df[s_w_cols].mean(axis=0) if mean_method == 'arithmetic' else gmean(grp_sub_df[s_w_cols].values, axis=0)
-                            g_sub_w = g_sub_w / g_sub_w.sum()
-                            g_sub_mats = np.stack(grp_sub_df['Matrix_Object'].values)
-                            g_sub_mat_obj = np.mean(g_sub_mats, axis=0) if mean_method == 'arithmetic' else gmean(g_sub_mats, axis=0)
-                            g_sub_cr, _, _ = calculate_consistency(g_sub_mat_obj, method=mean_method)
-                            for s_idx, sf in enumerate(sub_facts_list):
-                                grp_rows.append({
-                                    "대분류": main_f, "대분류 가중치": m_w, "중분류": sf, "중분류 가중치": g_sub_w[s_idx],
-                                    "Global Weight": m_w * g_sub_w[s_idx], "CR(대분류)": g_main_cr, "CR(중분류)": g_sub_cr
-                                })
-                        g_df = pd.DataFrame(grp_rows)
-                        if not g_df.empty:
-                            g_df['Global Rank'] = g_df['Global Weight'].rank(ascending=False, method='min').astype(int)
-                            group_full_dfs[grp] = g_df[cols_order]
-                            group_analysis_results[grp] = group_full_dfs[grp][['중분류', 'Global Weight']]
-
-                    comparison_df = final_df[['중분류', 'Global Weight']].copy()
-                    comparison_df.rename(columns={'Global Weight': 'Overall'}, inplace=True)
-                    for grp, df_res in group_analysis_results.items():
-                        temp_df = df_res.rename(columns={'Global Weight': grp})
-                        comparison_df = comparison_df.merge(temp_df, on='중분류', how='left')
-
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        workbook = writer.book
-                        formats = {
-                            'header': workbook.add_format({'bold': True, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#000000', 'font_color': '#FFFFFF', 'border': 1}),
-                            'merge': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1}),
-                            'body': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1}),
-                            'num': workbook.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1, 'num_format': '0.000'}),
-                            'sum_row': workbook.add_format({'bold': True, 'bg_color': '#D3D3D3', 'align': 'center', 'valign': 'vcenter', 'border': 1}),
-                            'sum_val': workbook.add_format({'num_format': '0', 'bg_color': '#D3D3D3', 'border': 1, 'align':'center'}),
-                            'num_sum': workbook.add_format({'num_format': '0.000', 'bg_color': '#D3D3D3', 'border': 1, 'align':'center'}),
-                            'yellow': workbook.add_format({'bg_color': 'yellow', 'border': 1, 'align': 'center', 'num_format': '0.000'})
-                        }
-                        border_fmt = workbook.add_format({'border': 1})
-                        fmt_float_no_border = workbook.add_format({'num_format': '0.000', 'align': 'center', 'valign': 'vcenter', 'border': 1})
-                        fmt_diagonal = workbook.add_format({'num_format': '0', 'align': 'center', 'valign': 'vcenter', 'bg_color': '#E7E6E6', 'border': 1})
-
-                        total_excluded_df = pd.concat(total_excl_df_list, ignore_index=True)
-                        current_row = write_custom_ahp_table(writer, '종합분석', final_df, "1) 전체_종합결과", 1, formats, excluded_df=total_excluded_df)
-                        for grp in unique_groups:
-                            if grp in group_full_dfs:
-                                current_row = write_custom_ahp_table(writer, '종합분석', group_full_dfs[grp], f"▶ [그룹: {grp}] 분석 결과", current_row, formats)
-
-                        if len(unique_groups) >= 1:
-                            ws_comp = workbook.add_worksheet('Group_Comparison')
-                            writer.sheets['Group_Comparison'] = ws_comp
-                            s_row = 1
-                            ws_comp.write_string(s_row, 0, "그룹 간 비교(일원배치 분산분석: ANOVA)", workbook.add_format({'bold': True, 'font_size': 12}))
-                            s_row += 1
-                            
-                            if not anova_df.empty:
-                                anova_for_merge = anova_df.rename(columns={'요인': '중분류'})
-                                integrated_df = comparison_df.merge(anova_for_merge, on='중분류', how='left')
-                            else:
-                                integrated_df = comparison_df
-                            
-                            integrated_df.to_excel(writer, sheet_name='Group_Comparison', startrow=s_row, index=False)
-                            add_borders_to_data(ws_comp, s_row, 0, integrated_df, border_fmt)
-                            
-                            num_format_3 = workbook.add_format({'num_format': '0.000', 'border': 1, 'align': 'center'})
-                            for r in range(len(integrated_df)):
-                                for c in range(1, len(integrated_df.columns)):
-                                    val = integrated_df.iloc[r, c]
-                                    if pd.notnull(val) and isinstance(val, (int, float)):
-                                        ws_comp.write_number(s_row + 1 + r, c, val, num_format_3)
-                                    elif pd.notnull(val):
-                                        ws_comp.write(s_row + 1 + r, c, val, border_fmt)
-
-                            guide_start_row = s_row + len(integrated_df) + 3
-                            bold_fmt = workbook.add_format({'bold': True, 'font_size': 11, 'valign': 'vcenter', 'align': 'left', 'bg_color': '#F2F2F2', 'border': 1})
-                            text_fmt = workbook.add_format({'font_size': 10, 'text_wrap': True, 'valign': 'top', 'align': 'left', 'border': 1})
-                            ws_comp.set_column('A:G', 20) 
-                            ws_comp.merge_range(guide_start_row, 0, guide_start_row, 6, "※ 그룹 간 중요도의 차이가 있지만 통계적으로 유의하지 않게 나타나는 이유", bold_fmt)
-
-                            guide_content = [
-                                ("1. 그룹 내 편차(분산)가 너무 큰 경우", "ANOVA는 '그룹 간의 차이'와 '그룹 내의 차이'를 비교합니다.\n\n■ 원리: 그룹 간 평균 차이가 크더라도, 각 그룹 내부 데이터들이 서로 들쭉날쭉(분산이 큼)하다면 통계적으로는 '이 차이가 우연히 발생했을 가능성이 높다'고 판단합니다.\n■ 분석: 현재 데이터에서 평균값의 절대적인 차이는 커 보일 수 있지만, 각 그룹(A~D)에 속한 개별 응답자들의 값들이 평균에서 멀리 떨어져 있다면 F-값이 낮아지고 P-Value는 올라가게 됩니다."),
-                                ("2. 표본 크기(Sample Size)의 부족", "통계적 유의성은 표본의 수에 매우 민감합니다.\n\n■ 현상: 각 그룹의 데이터 개수(표본수)가 너무 적다면(예: 그룹당 3~5개 미만) 아무리 평균 차이가 커도 통계적 힘(Power)이 부족하여 유의미한 차이를 찾아내지 못합니다.\n■ 확인 사항: 현재 분석에 사용된 각 그룹의 n수(표본수)가 충분한지 검토가 필요합니다."),
-                                ("3. 데이터의 단위(Scale)와 변동성", "표에 나타난 수치들이 대부분 0.1 미만 혹은 0.2 수준의 매우 작은 소수점 단위입니다.\n\n■ 분석: 수치 자체가 작기 때문에 시각적으로는 0.05와 0.15가 3배 차이로 커 보일 수 있지만, 실제 계산 과정에서 발생하는 표준오차(Standard Error) 범위 안에 해당 수치들이 포함되어 있다면 통계적으로는 '측정 오차 범위 내의 흔들림'으로 간주됩니다.")
-                            ]
-
-                            current_row_comp = guide_start_row + 1
-                            for title, body in guide_content:
-                                ws_comp.set_row(current_row_comp, 25)
-                                ws_comp.merge_range(current_row_comp, 0, current_row_comp, 6, title, bold_fmt)
-                                ws_comp.set_row(current_row_comp + 1, 120)
-                                ws_comp.merge_range(current_row_comp + 1, 0, current_row_comp + 1, 6, body, text_fmt)
-                                current_row_comp += 2
-
-                        def write_detailed_sheet(sheet_name, matrix_data, detail_data_df, matrix_title, row_labels, group_matrices=None, sheet_excl_count=0):
-                            ws = workbook.add_worksheet(sheet_name)
-                            writer.sheets[sheet_name] = ws
-                            s_row_det = 0
-                            
-                            ws.write(s_row_det, 0, f"분석 제외 사례수: {sheet_excl_count}건", workbook.add_format({'bold': True, 'font_color': 'red'}))
-                            s_row_det += 1
-                            
-                            ws.write_string(s_row_det, 0, matrix_title)
-                            s_row_det += 1
-                            m_df_obj = pd.DataFrame(matrix_data, index=row_labels, columns=row_labels)
-                            m_df_obj.to_excel(writer, sheet_name=sheet_name, startrow=s_row_det)
-                            add_borders_to_data(ws, s_row_det, 0, m_df_obj, border_fmt, has_header=True, has_index=True)
-                            for r in range(len(matrix_data)):
-                                for c in range(len(matrix_data)):
-                                    val = 1 if r==c else matrix_data[r][c]
-                                    ws.write(s_row_det+r+1, c+1, val, border_fmt if r!=c else fmt_diagonal)
-                                    if r!=c: ws.write(s_row_det+r+1, c+1, val, fmt_float_no_border)
-                            
-                            s_row_det += len(matrix_data) + 3
-                            
-                            if group_matrices:
-                                for g_name, g_mat in group_matrices.items():
-                                    ws.write_string(s_row_det, 0, f"] 그룹 종합 행렬: {g_name}")
-                                    s_row_det += 1
-                                    gm_df_obj = pd.DataFrame(g_mat, index=row_labels, columns=row_labels)
-                                    gm_df_obj.to_excel(writer, sheet_name=sheet_name, startrow=s_row_det)
-                                    add_borders_to_data(ws, s_row_det, 0, gm_df_obj, border_fmt, has_header=True, has_index=True)
-                                    for r in range(len(g_mat)):
-                                        for c in range(len(g_mat)):
-                                            val = 1 if r==c else g_mat[r][c]
-                                            ws.write(s_row_det+r+1, c+1, val, border_fmt if r!=c else fmt_diagonal)
-                                            if r!=c: ws.write(s_row_det+r+1, c+1, val, fmt_float_no_border)
-                                    s_row_det += len(g_mat) + 3
-                            
-                            detail_data_df.to_excel(writer, sheet_name=sheet_name, startrow=s_row_det, index=False)
-                            
-                            for c_idx, col_val in enumerate(detail_data_df.columns):
-                                ws.write(s_row_det, c_idx, col_val, formats['header'])
-                            
-                            for r_idx in range(len(detail_data_df)):
-                                orig_cr_val = detail_data_df.iloc[r_idx]['Original_CR']
-                                final_cr_val = detail_data_df.iloc[r_idx]['Final_CR']
-                                row_pos = s_row_det + 1 + r_idx
-                                
-                                for c_idx, col_name in enumerate(detail_data_df.columns):
-                                    val = detail_data_df.iloc[r_idx, c_idx]
-                                    current_fmt = border_fmt
-                                    
-                                    if col_name == 'Original_CR' and orig_cr_val > 0.1:
-                                        current_fmt = formats['yellow']
-                                    elif col_name == 'Final_CR' and final_cr_val > 0.1:
-                                        current_fmt = formats['yellow']
-                                    elif isinstance(val, (float, np.float64)):
-                                        current_fmt = formats['num']
-                                    else:
-                                        current_fmt = formats['body']
-                                        
-                                    if pd.isnull(val):
-                                        ws.write_blank(row_pos, c_idx, "", current_fmt)
-                                    else:
-                                        ws.write(row_pos, c_idx, val, current_fmt)
-
-                        main_group_mats = {}
-                        for grp in unique_groups:
-                            g_df_m = main_results_df[main_results_df['Type'].astype(str) == grp]
-                            if not g_df_m.empty:
-                                mats_stack = np.stack(g_df_m['Matrix_Object'].values)
-                                main_group_mats[grp] = np.mean(mats_stack, axis=0) if mean_method == 'arithmetic' else gmean(mats_stack, axis=0)
-
-                        out_main = main_results_df.drop(columns=['Matrix_Object'], errors='ignore')
-                        write_detailed_sheet('Result_Main', main_group_matrix, out_main, f"[1] 전체 종합 행렬", main_factors, group_matrices=main_group_mats, sheet_excl_count=main_excluded)
-                        for mf, info in sub_results_storage.items():
-                            safe_name = f"Result_{mf}"[:31]
-                            sub_grp_mats = {}
-                            for grp in unique_groups:
-                                g_sub_df = info['df'][info['df']['Type'].astype(str) == grp]
-                                if not g_sub_df.empty:
-                                    mats_stack = np.stack(g_sub_df['Matrix_Object'].values)
-                                    sub_grp_mats[grp] = np.mean(mats_stack, axis=0) if mean_method == 'arithmetic' else gmean(mats_stack, axis=0)
-                            out_sub = info['df'].drop(columns=['Matrix_Object'], errors='ignore')
-                            
-                            sub_excl_val = 0
-                            for df_ex in total_excl_df_list:
-                                if 'Sheet' in df_ex.columns and not df_ex.empty:
-                                     if df_ex['Sheet'].iloc[0] == mf or (mf in df_ex['Sheet'].unique()):
-                                          sub_excl_val = len(df_ex[df_ex['Sheet'] == mf])
-                                          
-                            write_detailed_sheet(safe_name, info['group_matrix'], out_sub, f"[1] 전체 종합 행렬", info['factors'], group_matrices=sub_grp_mats, sheet_excl_count=sub_excl_val)
-
-                        theory_ws = workbook.add_worksheet("Consistency_Theory")
-                        theory_title_fmt = workbook.add_format({'bold': True, 'font_size': 14, 'font_name': 'NanumGothic'})
-                        theory_body_fmt = workbook.add_format({'text_wrap': True, 'valign': 'top', 'font_name': 'NanumGothic'})
-                        theory_text = [
-                            ["의사결정론적 관점에서의 AHP 일관성 보정 원리 및 학술적 근거"],
-                            [""],
-                            ["1. 서론: 계층분석과정(AHP)의 일관성 문제"],
-                            ["Saaty(1980)에 의해 제안된 계층분석과정(Analytic Hierarchy Process, AHP)은 인간의 주관적 판단을 정량화하는 강력한 다기준 의사결정 도구이다. 그러나 의사결정자의 인지적 한계로 인해 쌍대비교 행렬에서 이행성(Transitivity)이 결여된 비일관적 판단이 발생할 수 있다. 본 시스템은 이러한 비일관성을 수학적으로 교정하여 분석의 신뢰성을 확보한다."],
-                            [""],
-                            ["2. 보정 알고리즘: 반복 수렴 조정법(Iterative Adjustment Method)"],
-                            ["본 시스템에 적용된 보정 로직은 '반복적 선형 결합 수렴법'에 근거한다. 비일관적 행렬 A가 주어졌을 때, 일관성 비율(Consistency Ratio, CR)이 임계값(0.1 또는 0.2)을 초과할 경우 다음과 같은 프로세스를 수행한다."],
-                            ["    가. 고유벡터법(Eigenvector Method) 또는 기하평균법을 통해 현재 행렬의 가중치 벡터 w를 도출한다."],
-                            ["    나. 가중치 벡터 w를 기반으로 완벽한 일관성을 가진 행렬 W = [wi/wj]를 생성한다. 이를 '이상적 일관 행렬'이라 정의한다."],
-                            ["    다. 원본 행렬 A와 이상적 행렬 W를 특정 학습률(Learning Rate, α=0.4)에 따라 선형 결합(Linear Combination)한다: A_new = (1-α)A + αW."],
-                            ["    라. 교정된 행렬 A_new의 역수성(Reciprocity)을 재설정하고, CR이 임계값 이하로 수렴할 때까지 위 과정을 최대 500회 반복한다."],
-                            [""],
-                            ["3. 학술적 근거 및 효과"],
-                            ["첫째, 최소 판단 왜곡의 원리(Principle of Minimal Distortion): Cao et al.(2008)에 따르면, 원본 행렬과 일관 행렬의 가중 평균을 이용한 조정은 의사결정자의 원래 선호 경향성을 최대한 보존하면서 수학적 일관성만을 선택적으로 향상시키는 효과가 입증되었다."],
-                            ["둘째, 수렴 안정성: 반복적 조정 프로세스는 행렬의 최대 고유값(λmax)을 차원 수 n에 수렴하게 함으로써 일관성 지수(CI)를 통계적으로 유의미한 수준으로 감소시킨다."],
-                            ["셋째, 실무적 유용성: 설문 응답자에게 재설문을 요구하기 어려운 연구 환경에서, 본 보정법은 데이터의 대푯값을 훼손하지 않는 범위 내에서 분석의 논리적 타당성을 부여하는 학술적 대안으로 활용된다."],
-                            [""],
-                            ["본 시스템의 분석 결과는 위와 같은 엄밀한 수치적 보정을 거쳐 산출되었으므로, 학술 연구 및 정책 의사결정의 기초 자료로 활용하기에 적합한 신뢰도를 보유함을 확인한다."]
-                        ]
-                        theory_ws.set_column('A:A', 100)
-                        for r_idx, row_content in enumerate(theory_text):
-                            fmt = theory_title_fmt if r_idx == 0 else theory_body_fmt
-                            theory_ws.write(r_idx, 0, row_content[0], fmt)
-
                     st.success("분석이 완료되었습니다.")
-                    if st.session_state.user_role == 'official':
-                        save_analysis_to_db(st.session_state.user_id, f"{uploaded_file.name.split('.')[0]}_Result.xlsx", output.getvalue())
 
                     tab1, tab2, tab3, tab4, tab5 = st.tabs(["🌐 종합 분석 (Global)", "👨‍👩‍👧‍👦 그룹별 분석", "🧪 통계 검정 (ANOVA)", "📊 시각화 센터", "📑 상세 데이터"])
                     with tab1:
@@ -2277,19 +1502,12 @@ else:
                             st.plotly_chart(fig_bar, use_container_width=True)
                         with col_chart2:
                             st.write("**그룹별 중요도 패턴 (Radar)**")
-                            indiv_global_radar = []
-                            all_ids_r = main_results_df['ID'].unique()
-                            for rid in all_ids_r:
-                                m_row_r = main_results_df[main_results_df['ID'] == rid].iloc[0]
-                                rtype_r = m_row_r['Type']
-                                for m_f in main_factors:
-                                    mw_indiv = m_row_r[f"Weight_{m_f}"]
-                                    s_row_df_r = sub_results_storage[m_f]['df']
-                                    s_row_r = s_row_df_r[s_row_df_r['ID'] == rid].iloc[0]
-                                    for s_f in sub_results_storage[m_f]['factors']:
-                                        indiv_global_radar.append({"Type": rtype_r, "Factor": s_f, "Global_Weight": mw_indiv * s_row_r[f"Weight_{s_f}"]})
-                            radar_indiv_df = pd.DataFrame(indiv_global_radar)
-                            radar_plot_df = radar_indiv_df.groupby(['Type', 'Factor'])['Global_Weight'].mean().reset_index()
+                            # [최적화 추가] 응답자별 전역 가중치는 분석 단계에서 한 번만 계산된 long format 테이블을 재사용
+                            if indiv_df is not None:
+                                radar_plot_df = indiv_df.groupby(['Type', 'Factor'])['Global_Weight'].mean().reset_index()
+                            else:
+                                # 스트리밍 분석 결과는 요인×그룹 요약값만 보관
+                                radar_plot_df = result['indiv_stats_df'][['Type', 'Factor', 'Global_Weight']]
                             fig_radar = go.Figure()
                             for t in radar_plot_df['Type'].unique():
                                 t_data = radar_plot_df[radar_plot_df['Type'] == t]
@@ -2297,18 +1515,22 @@ else:
                             st.plotly_chart(fig_radar, use_container_width=True)
                         st.markdown("---")
                         st.write("**3. 일관성 비율(CR) 분포도 (Violin/Box Plot)**")
-                        cr_dist_data = main_results_df[['ID', 'Type', 'Final_CR']].copy()
+                        # 스트리밍 분석 결과는 응답자 CR 의 균등 표본을 사용
+                        cr_dist_data = main_results.cr_frame()
                         cr_dist_data['Level'] = '대분류'
                         for m_f in main_factors:
-                            temp_cr = sub_results_storage[m_f]['df'][['ID', 'Type', 'Final_CR']].copy()
+                            temp_cr = sub_results_storage[m_f]['results'].cr_frame()
                             temp_cr['Level'] = f'중분류({m_f})'
                             cr_dist_data = pd.concat([cr_dist_data, temp_cr])
                         fig_cr_dist = px.violin(cr_dist_data, y="Final_CR", x="Level", color="Level", box=True, points="all", title="응답자별 일관성 지수 분포")
                         st.plotly_chart(fig_cr_dist, use_container_width=True)
                         st.markdown("---")
                         st.write("**4. 항목별 우선순위 산점도 (중요도 vs. 합의도)**")
-                        scatter_df = radar_indiv_df.groupby('Factor')['Global_Weight'].agg(['mean', 'std']).reset_index()
-                        scatter_df.columns = ['Factor', 'Weight_Mean', 'Weight_SD']
+                        if indiv_df is not None:
+                            scatter_df = indiv_df.groupby('Factor')['Global_Weight'].agg(['mean', 'std']).reset_index()
+                            scatter_df.columns = ['Factor', 'Weight_Mean', 'Weight_SD']
+                        else:
+                            scatter_df = result['factor_stats_df']
                         fig_scatter = px.scatter(scatter_df, x="Weight_Mean", y="Weight_SD", text="Factor", size="Weight_Mean", color="Weight_Mean",
                                                  labels={'Weight_Mean': '중요도(평균)', 'Weight_SD': '의견차이(표준편차)'},
                                                  title="중요도-합의도 분석 (우측 하단일수록 중요하고 합의된 항목)")
@@ -2316,8 +1538,30 @@ else:
                         st.plotly_chart(fig_scatter, use_container_width=True)
 
                     with tab5:
-                        st.download_button("📥 결과 파일 다운로드 (Excel)", data=output.getvalue(), file_name="AHP_Result.xlsx")
-                        st.dataframe(radar_indiv_df, use_container_width=True)
+                        # [최적화 추가] 결과 엑셀은 요청 시(또는 보관용으로 이미 시작된 경우)에만 생성하며 진행률을 표시
+                        export_future = cache_entry.get('export_future')
+                        if export_future is not None or st.button("📦 결과 파일 생성 (Excel)"):
+                            export_future = ensure_result_export(cache_entry)
+                            if not export_future.done():
+                                export_bar = st.progress(0.0, text="결과 엑셀 파일 생성 중...")
+                                while not export_future.done():
+                                    export_bar.progress(export_progress(cache_entry), text="결과 엑셀 파일 생성 중...")
+                                    time.sleep(0.2)
+                                export_bar.empty()
+                            if export_future.exception() is None:
+                                output_bytes = export_future.result()
+                                if 'output_bytes' not in cache_entry:
+                                    # 생성된 파일 크기를 캐시 바이트 예산에 반영
+                                    cache_entry['output_bytes'] = output_bytes
+                                    analysis_cache_put(cache_key, cache_entry)
+                                st.download_button("📥 결과 파일 다운로드 (Excel)", data=output_bytes, file_name="AHP_Result.xlsx")
+                            else:
+                                st.error(f"결과 파일 생성 중 오류가 발생했습니다: {export_future.exception()}")
+                        if indiv_df is not None:
+                            st.dataframe(indiv_df, use_container_width=True)
+                        else:
+                            st.caption("대용량 파일은 응답자별 전역 가중치 대신 요인×그룹별 요약을 표시합니다.")
+                            st.dataframe(result['indiv_stats_df'], use_container_width=True)
             else:
                 st.warning(message)
         except Exception as e:
@@ -0,0 +1,134 @@
+# AHP 분석 엔진 회귀 테스트 (벡터화한 계산을 기존 행 단위 계산 / numpy·scipy 기준값과 비교)
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALE = [-9, -7, -5, -4, -3, -2, 1, 2, 3, 4, 5, 7, 9]
+GROUPS = ["공무원", "일반", "전문가"]
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    # 응답자 보정 캐시/RI 캐시를 사용자 캐시 폴더 대신 임시 폴더에 기록
+    monkeypatch.setenv("AHP_CACHE_DIR", str(tmp_path / "cache"))
+
+def survey_frame(factors, rows, seed):
+    rng = np.random.default_rng(seed)
+    comp_cols = [f"{a}_{b}" for i, a in enumerate(factors) for b in factors[i + 1:]]
+    data = {"ID": np.arange(1, rows + 1), "Type": rng.choice(GROUPS, rows)}
+    for col in comp_cols:
+        data[col] = rng.choice(SCALE, rows)
+    return pd.DataFrame(data)
+
+def survey_workbook(rows=40, seed=0):
+    main = ["가", "나", "다", "라"]
+    frames = {"Main": survey_frame(main, rows, seed)}
+    for k, name in enumerate(main):
+        frames[name] = survey_frame([f"{name}{j}" for j in range(1, 4)], rows, seed + k + 1)
+    return frames
+
+def reciprocal_matrices(count, n, seed):
+    rng = np.random.default_rng(seed)
+    iu, ju = np.triu_indices(n, k=1)
+    mats = np.tile(np.eye(n), (count, 1, 1))
+    upper = rng.choice([1/9, 1/7, 1/5, 1/3, 1/2, 1, 2, 3, 5, 7, 9], (count, len(iu)))
+    mats[:, iu, ju] = upper
+    mats[:, ju, iu] = 1.0 / upper
+    return mats
+
+@pytest.mark.parametrize("method", ["geometric", "arithmetic", "eigenvector"])
+def test_batched_sheet_matches_row_by_row(method):
+    from ahp_core import process_single_sheet
+    df = survey_frame(["A", "B", "C", "D", "E"], 60, seed=3)
+    batched, factors, excluded, excluded_df = process_single_sheet(df, 0.1, 100, method, batched=True, use_cache=False)
+    rowwise, factors_r, excluded_r, excluded_df_r = process_single_sheet(df, 0.1, 100, method, batched=False)
+
+    assert factors == factors_r
+    assert excluded == excluded_r
+    assert list(batched.ids) == list(rowwise.ids)
+    assert list(excluded_df["ID"]) == list(excluded_df_r["ID"])
+    np.testing.assert_allclose(batched.weights, rowwise.weights, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(batched.orig_cr, rowwise.orig_cr, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(batched.final_cr, rowwise.final_cr, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(batched.final_raw(), rowwise.final_raw())
+    np.testing.assert_array_equal(batched.iterations, rowwise.iterations)
+
+def test_eigenvector_weights_match_numpy_eig():
+    from ahp_core import calculate_weights, power_iteration_batch
+    mats = reciprocal_matrices(200, 6, seed=7)
+    weights, lambda_max = power_iteration_batch(mats)
+    for mat, w, lam in zip(mats, weights, lambda_max):
+        values, vectors = np.linalg.eig(mat)
+        top = np.argmax(values.real)
+        expected = np.abs(vectors[:, top].real)
+        np.testing.assert_allclose(w, expected / expected.sum(), rtol=1e-7, atol=1e-9)
+        assert lam == pytest.approx(values[top].real, rel=1e-8)
+    np.testing.assert_allclose(calculate_weights(mats[0], 'eigenvector'), weights[0])
+
+def test_pairwise_ttest_matches_scipy():
+    from ahp_core import calculate_pairwise_ttest
+    rng = np.random.default_rng(11)
+    factors = ["A", "B", "C", "D"]
+    df = pd.DataFrame(rng.dirichlet(np.ones(4), 30), columns=[f"Weight_{f}" for f in factors])
+    df.iloc[[2, 5], 1] = np.nan
+    p_matrix = calculate_pairwise_ttest(df, factors)
+    for i, a in enumerate(factors):
+        for b in factors[i + 1:]:
+            expected = stats.ttest_rel(df[f"Weight_{a}"], df[f"Weight_{b}"], nan_policy='omit').pvalue
+            assert p_matrix.loc[a, b] == pytest.approx(float(expected), rel=1e-9)
+            assert p_matrix.loc[b, a] == p_matrix.loc[a, b]
+
+def test_anova_and_tukey_match_scipy():
+    from ahp_core import calculate_anova_and_posthoc
+    rng = np.random.default_rng(5)
+    rows = []
+    for factor, shift in (("X", 0.0), ("Y", 0.15), ("Z", 0.4)):
+        for g, grp in enumerate(["가", "나", "다"]):
+            size = 12 + 3 * g
+            for value in rng.normal(0.3 + shift * g, 0.1, size):
+                rows.append({"ID": len(rows), "Type": grp, "Factor": factor, "Global_Weight": value})
+    data = pd.DataFrame(rows)
+    anova = calculate_anova_and_posthoc(data).set_index("요인")
+
+    for factor, sub in data.groupby("Factor"):
+        samples = [g["Global_Weight"].to_numpy() for _, g in sub.groupby("Type")]
+        f_stat, p_val = stats.f_oneway(*samples)
+        assert anova.loc[factor, "F-값"] == pytest.approx(f_stat, rel=1e-9)
+        assert anova.loc[factor, "P-Value"] == pytest.approx(p_val, rel=1e-7, abs=1e-15)
+        if p_val < 0.05:
+            names = sorted(sub["Type"].unique())
+            tukey = stats.tukey_hsd(*samples).pvalue
+            expected = [f"{names[i]} vs {names[j]}" for i in range(len(names)) for j in range(i + 1, len(names)) if tukey[i, j] < 0.05]
+            posthoc = anova.loc[factor, "사후검정(Tukey HSD)"]
+            if expected:
+                assert posthoc == ", ".join(expected) + " 차이 있음"
+            else:
+                assert posthoc == "집단 간 구체적 차이 발견 못함"
+
+def test_streaming_matches_in_memory():
+    from ahp_core import analyze_hierarchy
+    from ahp_stream import analyze_workbook_streaming
+    frames = survey_workbook(rows=45, seed=21)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine='xlsxwriter') as writer:
+        for name, df in frames.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+    in_memory = analyze_hierarchy(frames, 0.1, 100, parallel=False)
+    streamed = analyze_workbook_streaming(buf.getvalue(), 0.1, 100, chunk_rows=7)
+
+    assert streamed['main_excluded'] == in_memory['main_excluded']
+    pd.testing.assert_frame_equal(streamed['final_df'], in_memory['final_df'], rtol=1e-9)
+    pd.testing.assert_frame_equal(streamed['comparison_df'], in_memory['comparison_df'], rtol=1e-9)
+    streamed_weights = np.vstack([chunk.weights for chunk in streamed['main_results'].iter_chunks()])
+    np.testing.assert_allclose(streamed_weights, in_memory['main_results'].weights, rtol=1e-9)
+    anova_s, anova_m = streamed['anova_df'], in_memory['anova_df']
+    assert list(anova_s["요인"]) == list(anova_m["요인"])
+    np.testing.assert_allclose(anova_s["F-값"], anova_m["F-값"], rtol=1e-7)
+    np.testing.assert_allclose(anova_s["P-Value"], anova_m["P-Value"], rtol=1e-6, atol=1e-12)
@@ -0,0 +1,37 @@
+# 결과 엑셀 내보내기 테스트 (constant_memory 모드에서 병합 영역과 셀 값이 함께 기록되는지 확인)
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+openpyxl = pytest.importorskip("openpyxl")
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("AHP_CACHE_DIR", str(tmp_path / "cache"))
+
+def test_summary_blocks_are_merged_with_their_values(tmp_path):
+    from ahp_core import analyze_hierarchy, create_sample_excel, load_workbook_frames
+    from ahp_export import export_result_workbook
+    result = analyze_hierarchy(load_workbook_frames(create_sample_excel()), 0.1, 100, parallel=False)
+    path = export_result_workbook(result, str(tmp_path / "result.xlsx"))
+
+    ws = openpyxl.load_workbook(path)["종합분석"]
+    merges = sorted((r for r in ws.merged_cells.ranges if r.min_col == r.max_col), key=lambda r: (r.min_row, r.min_col))
+    blocks = list(result['final_df'].groupby('대분류', sort=False))
+    col_a = [r for r in merges if r.min_col == 1][:len(blocks)]
+    col_b = [r for r in merges if r.min_col == 2][:len(blocks)]
+    assert len(col_a) == len(col_b) == len(blocks)
+
+    for rng_a, rng_b, (main_c, sub_df) in zip(col_a, col_b, blocks):
+        assert (rng_a.min_row, rng_a.max_row) == (rng_b.min_row, rng_b.max_row)
+        assert rng_a.max_row - rng_a.min_row + 1 == len(sub_df) + 2
+        row = rng_a.min_row
+        # 병합 영역의 첫 행에 기록된 다른 열의 값도 유실되지 않아야 함
+        assert ws.cell(row, 1).value == main_c
+        assert ws.cell(row, 2).value == pytest.approx(sub_df['대분류 가중치'].iloc[0])
+        assert ws.cell(row, 3).value == sub_df['중분류'].iloc[0]
+        assert ws.cell(row, 4).value == pytest.approx(sub_df['중분류 가중치'].iloc[0])
+        assert ws.cell(rng_a.max_row, 3).value == "일관성 비율(CR)"
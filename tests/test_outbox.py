@@ -0,0 +1,255 @@
+# 구글 시트 outbox 워커 / 행 색인 테스트 (가짜 시트 클라이언트 사용, 네트워크 불필요)
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POSTS_HEADER = ["ID", "UserID", "Title", "Content", "RegDate", "IsSecret", "IsNotice", "Likes", "NonUserPW", "Views"]
+
+@pytest.fixture(scope="module", autouse=True)
+def _db_dir(tmp_path_factory):
+    # ahp_db 는 작업 디렉터리의 users.db 를 사용하므로 임시 디렉터리에서 실행
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("outbox"))
+    from ahp_db import write
+    from ahp_outbox import create_outbox_schema
+    write(create_outbox_schema)
+    yield
+    os.chdir(cwd)
+
+@pytest.fixture
+def client():
+    from ahp_db import execute_write
+    from ahp_fake_sheets import FakeSheetsClient
+    execute_write("DELETE FROM sheets_outbox")
+    return FakeSheetsClient()
+
+def make_worker(client, **kwargs):
+    from ahp_outbox import SheetsOutboxWorker, TokenBucket
+    kwargs.setdefault("bucket", TokenBucket(10000, 10000))
+    return SheetsOutboxWorker(lambda: client.open_by_key("test"), **kwargs)
+
+def post_row(pid, likes=0, views=0):
+    return [pid, "u", f"title{pid}", "content", "2026-01-01", 0, 0, likes, None, views]
+
+def posts_sheet(client):
+    return client.open_by_key("test").worksheet("Community_Posts")
+
+def pending():
+    from ahp_db import fetch_all
+    return fetch_all("SELECT op, attempts, next_attempt_at, dead FROM sheets_outbox ORDER BY id")
+
+def drain(worker, rounds=10):
+    for _ in range(rounds):
+        if worker.run_once() is None:
+            return
+
+def seed_posts(client, worker, count):
+    from ahp_outbox import enqueue_append
+    for pid in range(1, count + 1):
+        enqueue_append("Community_Posts", post_row(pid), header=POSTS_HEADER)
+    drain(worker)
+    client.calls.clear()
+
+def test_appends_and_updates_are_coalesced(client):
+    from ahp_outbox import enqueue_append, enqueue_update
+    worker = make_worker(client)
+    for pid in range(1, 6):
+        enqueue_append("Community_Posts", post_row(pid), header=POSTS_HEADER)
+    for pid in (2, 4, 5):
+        enqueue_update("Community_Posts", pid, {10: pid * 10})
+    drain(worker)
+
+    assert client.calls.count("append_rows") == 1
+    assert client.calls.count("batch_update") == 1
+    rows = posts_sheet(client).rows
+    assert rows[0] == POSTS_HEADER
+    assert [r[0] for r in rows[1:]] == [1, 2, 3, 4, 5]
+    assert [r[9] for r in rows[1:]] == [0, 20, 0, 40, 50]
+    assert pending() == []
+
+def test_header_created_for_new_worksheet(client):
+    from ahp_outbox import enqueue_append
+    worker = make_worker(client)
+    enqueue_append("Visit_Logs", ["1.2.3.4", "2026-01-01 00:00:00"], header=["IP", "Date"])
+    drain(worker)
+    ws = client.open_by_key("test").worksheet("Visit_Logs")
+    assert ws.rows == [["IP", "Date"], ["1.2.3.4", "2026-01-01 00:00:00"]]
+
+def test_partial_header_only_fills_named_columns(client):
+    from ahp_outbox import enqueue_append
+    worker = make_worker(client)
+    sheet1 = client.open_by_key("test").sheet1
+    sheet1.rows = [["ID", "Role", "SignupDate", "PW"]]
+    enqueue_append(None, ["u1", "user", "2026-01-01", "pw", "Y", "9999-12-31"],
+                   header=[None, None, None, None, "agree_info", "expiry_date"])
+    drain(worker)
+    assert sheet1.rows[0] == ["ID", "Role", "SignupDate", "PW", "agree_info", "expiry_date"]
+    assert sheet1.rows[1][0] == "u1"
+
+def test_index_follows_own_appends_and_deletes(client):
+    from ahp_outbox import enqueue_append, enqueue_delete, enqueue_update
+    worker = make_worker(client)
+    seed_posts(client, worker, 5)
+    enqueue_update("Community_Posts", 1, {8: 1})
+    drain(worker)
+    assert client.calls.count("col_values") == 1
+
+    client.calls.clear()
+    enqueue_delete("Community_Posts", 2)
+    enqueue_append("Community_Posts", post_row(6), header=POSTS_HEADER)
+    enqueue_update("Community_Posts", 6, {8: 7})
+    enqueue_update("Community_Posts", 5, {8: 3})
+    drain(worker)
+
+    # 자신의 추가/삭제는 색인에 직접 반영되므로 A열을 다시 읽지 않음
+    assert client.calls.count("col_values") == 0
+    rows = posts_sheet(client).rows
+    assert [r[0] for r in rows[1:]] == [1, 3, 4, 5, 6]
+    assert {r[0]: r[7] for r in rows[1:]} == {1: 1, 3: 0, 4: 0, 5: 3, 6: 7}
+
+def test_updates_write_to_indexed_rows_without_reading_them(client):
+    from ahp_outbox import enqueue_update
+    worker = make_worker(client)
+    seed_posts(client, worker, 5)
+    for pid in (1, 3, 5):
+        enqueue_update("Community_Posts", pid, {10: pid})
+        drain(worker)
+
+    # 색인 확인 주기 안의 갱신은 A열을 다시 읽지 않고 색인의 행에 바로 기록
+    assert client.calls.count("col_values") == 1
+    assert "batch_get" not in client.calls
+    assert {r[0]: r[9] for r in posts_sheet(client).rows[1:]} == {1: 1, 2: 0, 3: 3, 4: 0, 5: 5}
+
+def test_update_after_out_of_band_delete_targets_right_row(client):
+    from ahp_outbox import enqueue_update
+    # 확인 주기가 돌아온 상태를 만들기 위해 매번 대조
+    worker = make_worker(client, row_check_interval=0)
+    seed_posts(client, worker, 6)
+    enqueue_update("Community_Posts", 1, {10: 1})
+    drain(worker)
+
+    # 워커 밖에서 행이 삭제되어 색인의 행 번호가 어긋난 상태
+    posts_sheet(client).delete_rows(3)
+    enqueue_update("Community_Posts", 4, {10: 99})
+    drain(worker)
+
+    views = {r[0]: r[9] for r in posts_sheet(client).rows[1:]}
+    assert views[4] == 99
+    assert views[5] == 0
+    assert 2 not in views
+
+def test_delete_after_out_of_band_delete_removes_right_row(client):
+    from ahp_outbox import enqueue_delete, enqueue_update
+    worker = make_worker(client)
+    seed_posts(client, worker, 6)
+    enqueue_update("Community_Posts", 1, {10: 1})
+    drain(worker)
+
+    posts_sheet(client).delete_rows(2)
+    enqueue_delete("Community_Posts", 4)
+    drain(worker)
+
+    assert [r[0] for r in posts_sheet(client).rows[1:]] == [2, 3, 5, 6]
+
+def test_update_for_unknown_key_is_skipped(client):
+    from ahp_outbox import enqueue_update
+    worker = make_worker(client)
+    seed_posts(client, worker, 2)
+    enqueue_update("Community_Posts", 999, {10: 5})
+    drain(worker)
+    assert pending() == []
+    assert "batch_update" not in client.calls
+
+def test_failure_backs_off_then_retries_in_order(client):
+    from ahp_outbox import enqueue_append
+    worker = make_worker(client, base_delay=0.05, max_delay=0.05)
+    seed_posts(client, worker, 1)
+    enqueue_append("Community_Posts", post_row(2))
+    enqueue_append("Community_Posts", post_row(3))
+    client.fail_next(1)
+
+    assert worker.run_once() == 0
+    state = pending()
+    assert [s[1] for s in state] == [1, 1]
+    assert all(s[2] > time.time() for s in state)
+    # 재시도 시각 전에는 전송하지 않고 남은 대기 시간을 돌려줌
+    assert 0 < worker.run_once() <= 0.1
+
+    time.sleep(0.1)
+    drain(worker)
+    assert pending() == []
+    assert [r[0] for r in posts_sheet(client).rows[1:]] == [1, 2, 3]
+    assert worker.stats["failures"] == 1
+
+def test_repeated_failures_become_dead_letters(client):
+    from ahp_outbox import enqueue_append, outbox_stats
+    worker = make_worker(client, base_delay=0.0, max_delay=0.0, max_attempts=3)
+    enqueue_append("Community_Posts", post_row(1), header=POSTS_HEADER)
+    client.fail_next(100)
+    for _ in range(3):
+        worker.run_once()
+    client.fail_next(0)
+
+    assert pending()[0][3] == 1
+    stats = outbox_stats()
+    assert stats["queue_depth"] == 0
+    assert stats["dead_letters"] >= 1
+    assert worker.run_once() is None
+
+def test_pending_rows_survive_worker_restart(client):
+    from ahp_outbox import enqueue_append
+    enqueue_append("Community_Posts", post_row(1), header=POSTS_HEADER)
+    make_worker(client)  # 전송하지 않고 버려진 워커
+    worker = make_worker(client).start()
+    try:
+        deadline = time.time() + 5
+        while pending() and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        worker.stop(1)
+    assert [r[0] for r in posts_sheet(client).rows[1:]] == [1]
+
+def test_token_bucket_limits_burst():
+    from ahp_outbox import TokenBucket
+    bucket = TokenBucket(rate=50, capacity=2)
+    waited = sum(bucket.acquire() for _ in range(4))
+    assert waited >= 0.03
+
+def test_row_index_tracks_append_response_and_delete():
+    from ahp_fake_sheets import FakeSheetsClient
+    from ahp_sheets import SheetRowIndex
+    ws = FakeSheetsClient().open_by_key("k").sheet1
+    ws.rows = [["ID"], ["a"], ["b"], ["c"]]
+    index = SheetRowIndex()
+    assert index.lookup(ws, "b") == 3
+    index.appended(["d", "e"], ws.append_rows([["d"], ["e"]]))
+    ws.delete_rows(2)
+    index.deleted(2)
+    assert {k: index.lookup(ws, k) for k in "bcde"} == {"b": 2, "c": 3, "d": 4, "e": 5}
+    assert index.stats["builds"] == 1
+
+def test_delete_on_missing_worksheet_does_not_create_it(client):
+    from ahp_outbox import enqueue_delete
+    worker = make_worker(client)
+    enqueue_delete("Deleted_Users", "someone@example.com")
+    drain(worker)
+    assert pending() == []
+    assert "add_worksheet" not in client.calls
+
+def test_user_move_is_applied_in_queue_order(client):
+    from ahp_outbox import enqueue_append, enqueue_delete, pending_delete_keys
+    worker = make_worker(client)
+    sheet1 = client.open_by_key("test").sheet1
+    sheet1.rows = [["ID", "Role", "SignupDate", "PW"], ["a", "user", "d", "p"], ["b", "user", "d", "p"]]
+    enqueue_append(None, ["c", "user", "d", "p"])
+    enqueue_append("Deleted_Users", ["a", "user", "d", "p", "now"], header=["ID", "Role", "SignupDate", "PW", "DeletedDate"])
+    enqueue_delete(None, "a")
+    assert pending_delete_keys(None) == {"a"}
+    drain(worker)
+    assert [r[0] for r in sheet1.rows] == ["ID", "b", "c"]
+    assert client.open_by_key("test").worksheet("Deleted_Users").rows[1][0] == "a"
+    assert pending_delete_keys(None) == set()